@@ -4,10 +4,14 @@ import os
 import streamlit as st
 from config.constants import APP_DB, PRIMARY
 from db.database import DB
+from geocoding.gazetteer import gazetteer
 from pages.admin_dashboard import admin_dashboard_page
 from pages.auth import auth_page
 from pages.driver import driver_current_page, driver_earnings_page, driver_jobs_page
 from pages.users import user_book_page, user_feedback_page, user_history_page, user_live_page
+from services.matcher import batch_matcher
+from services.rollups import rollup_worker
+from services.simulation import simulation_engine
 
 
 if "pending_estimate" not in st.session_state:
@@ -192,9 +196,20 @@ def route_to_page(db: DB):
 # Main
 
 
+def session_db() -> DB:
+    # One connection per browser session; the schema is migrated once per process
+    if "db" not in st.session_state:
+        st.session_state.db = DB(APP_DB)
+    return st.session_state.db
+
+
 def main():
     st.set_page_config(page_title="Taxi App", page_icon="🚖", layout="wide")
-    db = DB(APP_DB)
+    db = session_db()
+    simulation_engine(APP_DB)
+    batch_matcher(APP_DB)
+    rollup_worker(APP_DB)
+    gazetteer()
     header()
     route_to_page(db)
 
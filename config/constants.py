@@ -7,3 +7,83 @@ USER_AGENT = {"User-Agent": "TaxiStreamlit/1.0 (edu-demo)"}
 FARE_TIERS = {"Basic": 1.0, "Advanced": 1.2, "Premium": 1.5}
 DEFAULT_CENTER = (24.8607, 67.0011)
 APP_DB = os.environ.get("TAXI_DB", "taxi_streamlit.db")
+
+# Local cache for geocoding/routing lookups (kept apart from the app DB)
+CACHE_DB = os.environ.get("TAXI_CACHE_DB", "taxi_cache.db")
+GEOCODE_CACHE_TTL_S = float(os.environ.get("TAXI_GEOCODE_TTL_S", 30 * 24 * 3600))
+GEOCODE_CACHE_MEMORY = 2048
+GEOCODE_CACHE_MAX_ROWS = 100_000
+
+# Route cache: OD pairs are snapped to a grid of ROUTE_SNAP_M metres
+ROUTE_SNAP_M = float(os.environ.get("TAXI_ROUTE_SNAP_M", 50))
+ROUTE_CACHE_TTL_S = 7 * 24 * 3600
+ROUTE_CACHE_STALE_S = 30 * 24 * 3600
+ROUTE_CACHE_MEMORY_BYTES = 16 * 1024 * 1024
+ROUTE_CACHE_MAX_ROWS = 50_000
+
+# Geocoder backend: "auto" tries the offline gazetteer index before Nominatim,
+# "local" never leaves the machine and "nominatim" ignores the index.
+# Build the index with `python -m geocoding.gazetteer build places.csv`.
+GEOCODER_BACKEND = os.environ.get("TAXI_GEOCODER", "auto")
+GAZETTEER_PATH = os.environ.get("TAXI_GAZETTEER", "gazetteer.idx")
+
+# Address autocomplete: suggestions per field, shortest text looked up, and how often the
+# index is rebuilt from booked rides and the geocode cache
+AUTOCOMPLETE_LIMIT = 6
+AUTOCOMPLETE_MIN_CHARS = 2
+AUTOCOMPLETE_REFRESH_S = 300.0
+
+# Router backend: "auto" asks OSRM and falls back to the local road graph, "local" only
+# uses the graph and "osrm" ignores it; points further than ROUTER_MAX_SNAP_M from any
+# graph node are off the graph. Build it with `python -m geocoding.roadgraph build city.osm`.
+ROUTER_BACKEND = os.environ.get("TAXI_ROUTER", "auto")
+ROAD_GRAPH_PATH = os.environ.get("TAXI_ROAD_GRAPH", "roads.graph")
+ROUTER_MAX_SNAP_M = 500.0
+
+# Outbound HTTP (Nominatim / OSRM)
+HTTP_POOL_SIZE = 16
+GEOCODE_WORKERS = 8
+# (connect, read) timeouts in seconds, retry counts, overall deadline per call and breaker settings per upstream
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_TIMEOUT = (3.05, 5.0)
+NOMINATIM_RETRIES = 2
+NOMINATIM_DEADLINE_S = 6.0
+OSRM_TIMEOUT = (2.0, 3.0)
+OSRM_RETRIES = 1
+OSRM_DEADLINE_S = 5.0
+RETRY_BACKOFF_S = 0.25
+BREAKER_FAILURES = 5
+BREAKER_RESET_S = 30.0
+
+# SQLite connection tuning (applied to every connection from db.database.connect)
+SQLITE_BUSY_TIMEOUT_S = 5.0
+SQLITE_MMAP_BYTES = 256 * 1024 * 1024
+SQLITE_CACHE_KIB = 64 * 1024
+
+# Background ride simulation
+SIMULATION_TICK_S = 1.0
+
+# How often the cached vehicle catalog re-reads its version stamp
+VEHICLE_CATALOG_CHECK_S = 5.0
+
+# Driver spatial index: side of a grid bucket
+DRIVER_INDEX_CELL_KM = 1.0
+
+# Batch matcher for unclaimed Assigned rides
+MATCH_INTERVAL_S = 5.0
+MATCH_CANDIDATES = 32
+MATCH_MAX_PICKUP_KM = 15.0
+# Wall-clock budget of one pass, candidate generation included
+MATCH_BUDGET_S = 0.8
+
+# Analytics rollups: how often new ride events are folded in, and events per transaction
+ROLLUP_INTERVAL_S = 30.0
+ROLLUP_BATCH = 20_000
+
+# Route geometry: Douglas-Peucker tolerance for fetched routes (also the stored ride
+# tracks) and for drawn polylines
+ROUTE_SIMPLIFY_M = 5.0
+MAP_SIMPLIFY_M = 15.0
+
+# Static route maps kept in memory (one per ride or estimate)
+MAP_CACHE_ENTRIES = 256
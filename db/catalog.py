@@ -0,0 +1,67 @@
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+from config.constants import APP_DB, VEHICLE_CATALOG_CHECK_S
+from model.vehicle import VEHICLES, Vehicle, VehicleCatalog
+from services.worker import PathRegistry
+
+VERSION_SQL = "SELECT value FROM meta WHERE key='vehicles_version'"
+VEHICLES_SQL = "SELECT code, name, capacity, base_per_km, per_min FROM vehicles ORDER BY capacity, code"
+
+
+class _CatalogSource:
+    """Keeps the current VehicleCatalog for one database and reloads it when the version stamp moves.
+
+    The stamp is read at most once per `check_s`, so renders in between cost a
+    dict lookup. Until the database is migrated the built-in VEHICLES are served.
+    """
+
+    def __init__(self, path: str, check_s: float):
+        self.path = path
+        self.check_s = check_s
+        self._conn: Optional[sqlite3.Connection] = None
+        self._catalog = VehicleCatalog(VEHICLES, version=0)
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _read(self) -> Tuple[int, Optional[list]]:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        row = self._conn.execute(VERSION_SQL).fetchone()
+        version = row[0] if row else 0
+        if version == self._catalog.version:
+            return version, None
+        return version, [Vehicle(*r) for r in self._conn.execute(VEHICLES_SQL)]
+
+    def get(self) -> VehicleCatalog:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_s:
+            return self._catalog
+        with self._lock:
+            if now - self._checked_at >= self.check_s:
+                try:
+                    version, rows = self._read()
+                    if rows:
+                        self._catalog = VehicleCatalog(rows, version)
+                except sqlite3.Error:
+                    pass  # not migrated yet (or unreadable): keep serving the last catalog
+                self._checked_at = now
+            return self._catalog
+
+    def invalidate(self):
+        self._checked_at = float("-inf")
+
+
+_sources: PathRegistry[_CatalogSource] = PathRegistry(lambda path: _CatalogSource(path, VEHICLE_CATALOG_CHECK_S))
+
+
+def vehicle_catalog(path: str = APP_DB) -> VehicleCatalog:
+    """Current vehicle catalog for the database at `path`."""
+    return _sources.get(path).get()
+
+
+def invalidate_vehicle_catalog(path: str = APP_DB):
+    """Re-check the version stamp on the next lookup instead of waiting out the check interval."""
+    _sources.get(path).invalidate()
@@ -1,90 +1,494 @@
 
+import json
+import os
 import sqlite3
-from typing import Optional, List
-from config.constants import APP_DB
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Sequence, Tuple
+from config.constants import APP_DB, SQLITE_BUSY_TIMEOUT_S, SQLITE_CACHE_KIB, SQLITE_MMAP_BYTES
+from db.tracks import pack_track, track_len
 from model.vehicle import VEHICLES
 from utils.helper import now_ts
 
-class DB:
-    def __init__(self, path: str = APP_DB):
-        self.conn = sqlite3.connect(path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
-        self._migrate()
 
-    def _migrate(self):
-        c = self.conn.cursor()
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT, email TEXT UNIQUE, password TEXT
-            )
-            """
+def _schema_v1(c: sqlite3.Cursor):
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT, email TEXT UNIQUE, password TEXT
         )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS drivers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT, email TEXT UNIQUE, password TEXT,
-                car_make TEXT, car_model TEXT, car_plate TEXT,
-                is_available INTEGER DEFAULT 1
-            )
-            """
+        """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS drivers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT, email TEXT UNIQUE, password TEXT,
+            car_make TEXT, car_model TEXT, car_plate TEXT,
+            is_available INTEGER DEFAULT 1
         )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS admins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT, email TEXT UNIQUE, password TEXT
-            )
-            """
+        """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS admins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT, email TEXT UNIQUE, password TEXT
         )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS vehicles (
-                code TEXT PRIMARY KEY, name TEXT, capacity INTEGER, base_per_km REAL, per_min REAL
-            )
-            """
+        """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vehicles (
+            code TEXT PRIMARY KEY, name TEXT, capacity INTEGER, base_per_km REAL, per_min REAL
         )
-        c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS rides (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                driver_id INTEGER,
-                pickup_text TEXT, dropoff_text TEXT,
-                pickup_lat REAL, pickup_lon REAL,
-                drop_lat REAL, drop_lon REAL,
-                scheduled_at TEXT, created_at TEXT,
-                vehicle_code TEXT, fare_tier TEXT, pax INTEGER,
-                est_km REAL, est_minutes REAL, est_price REAL,
-                status TEXT,
-                tracking_json TEXT,
-                track_idx INTEGER DEFAULT 0,
-                last_update_at TEXT
-            )
-            """
+        """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS rides (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            driver_id INTEGER,
+            pickup_text TEXT, dropoff_text TEXT,
+            pickup_lat REAL, pickup_lon REAL,
+            drop_lat REAL, drop_lon REAL,
+            scheduled_at TEXT, created_at TEXT,
+            vehicle_code TEXT, fare_tier TEXT, pax INTEGER,
+            est_km REAL, est_minutes REAL, est_price REAL,
+            status TEXT,
+            tracking_json TEXT,
+            track_idx INTEGER DEFAULT 0,
+            last_update_at TEXT
         )
+        """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER, ride_id INTEGER,
+            rating INTEGER, comments TEXT, created_at TEXT
+        )
+        """
+    )
+
+    for v in VEHICLES:
         c.execute(
-            """
-            CREATE TABLE IF NOT EXISTS feedback (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER, ride_id INTEGER,
-                rating INTEGER, comments TEXT, created_at TEXT
-            )
-            """
+            "INSERT OR IGNORE INTO vehicles(code,name,capacity,base_per_km,per_min) VALUES(?,?,?,?,?)",
+            (v.code, v.name, v.capacity, v.base_per_km, v.per_min),
+        )
+
+    c.execute(
+        "INSERT OR IGNORE INTO admins(id,name,email,password) VALUES(1,'Admin','admin@local','admin')"
+    )
+
+
+def _schema_v2(c: sqlite3.Cursor):
+    # created_at is stored as "%Y-%m-%d %H:%M:%S", which sorts correctly as text
+    c.execute("CREATE INDEX IF NOT EXISTS idx_rides_user_created ON rides(user_id, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_rides_status_driver_created ON rides(status, driver_id, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_rides_driver_status ON rides(driver_id, status)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_rides_created ON rides(created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_feedback_ride_rating ON feedback(ride_id, rating)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_feedback_created ON feedback(created_at)")
+
+
+def _schema_v3(c: sqlite3.Cursor):
+    # Widen the per-driver index so earnings can be summed from the index alone
+    c.execute("DROP INDEX IF EXISTS idx_rides_driver_status")
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_rides_driver_status_created "
+        "ON rides(driver_id, status, created_at, est_price)"
+    )
+
+
+def _schema_v4(c: sqlite3.Cursor):
+    # Route polylines move out of rides.tracking_json into packed float32 BLOBs
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ride_tracks (
+            ride_id INTEGER PRIMARY KEY,
+            n_points INTEGER NOT NULL,
+            coords BLOB NOT NULL
         )
-     
-        for v in VEHICLES:
+        """
+    )
+    rows = c.execute("SELECT id, tracking_json FROM rides WHERE tracking_json IS NOT NULL").fetchall()
+    for ride_id, tracking_json in rows:
+        try:
+            coords = json.loads(tracking_json or "[]")
+        except ValueError:
+            coords = []
+        if coords:
+            blob = pack_track(coords)
             c.execute(
-                "INSERT OR IGNORE INTO vehicles(code,name,capacity,base_per_km,per_min) VALUES(?,?,?,?,?)",
-                (v.code, v.name, v.capacity, v.base_per_km, v.per_min),
+                "INSERT OR REPLACE INTO ride_tracks(ride_id, n_points, coords) VALUES (?,?,?)",
+                (ride_id, track_len(blob), blob),
             )
-     
+    c.execute("UPDATE rides SET tracking_json=NULL WHERE tracking_json IS NOT NULL")
+
+
+def _schema_v5(c: sqlite3.Cursor):
+    # Last known driver position, used by the dispatch spatial index
+    c.execute("ALTER TABLE drivers ADD COLUMN lat REAL")
+    c.execute("ALTER TABLE drivers ADD COLUMN lon REAL")
+    c.execute("ALTER TABLE drivers ADD COLUMN pos_updated_at TEXT")
+
+
+def _schema_v6(c: sqlite3.Cursor):
+    # Version stamp bumped by any change to vehicles, so readers can cache the catalog
+    c.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    c.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('vehicles_version', 1)")
+    for op in ("INSERT", "UPDATE", "DELETE"):
         c.execute(
-            "INSERT OR IGNORE INTO admins(id,name,email,password) VALUES(1,'Admin','admin@local','admin')"
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_vehicles_{op.lower()}_version AFTER {op} ON vehicles
+            BEGIN
+                UPDATE meta SET value = value + 1 WHERE key = 'vehicles_version';
+            END
+            """
         )
-        self.conn.commit()
+
+
+
+def _schema_v7(c: sqlite3.Cursor):
+    # Keyset pagination of the admin rides list filtered by status or by driver alone
+    c.execute("CREATE INDEX IF NOT EXISTS idx_rides_status_created ON rides(status, created_at)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_rides_driver_created ON rides(driver_id, created_at)")
+
+
+# Keep driver_stats current on ride completion/deletion, new feedback and driver deletion
+# A completed ride adds 1 and its price to its driver's row, a rating adds to the rated ride's driver.
+# Every change that moves either is reversed by subtracting the OLD contribution and adding the NEW
+# one, so the table stays equal to rebuild_driver_stats() (which only counts existing drivers).
+DRIVER_STATS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_driver_stats_ride_inserted
+    AFTER INSERT ON rides
+    WHEN NEW.status = 'Completed' AND NEW.driver_id IS NOT NULL
+    BEGIN
+        INSERT INTO driver_stats(driver_id, rides_completed, earnings_total)
+        SELECT NEW.driver_id, 1, COALESCE(NEW.est_price, 0) WHERE NEW.driver_id IN (SELECT id FROM drivers)
+        ON CONFLICT(driver_id) DO UPDATE SET
+            rides_completed = rides_completed + 1,
+            earnings_total = earnings_total + excluded.earnings_total;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_driver_stats_ride_completed
+    AFTER UPDATE OF status, driver_id, est_price ON rides
+    WHEN (OLD.status IS NOT NEW.status OR OLD.driver_id IS NOT NEW.driver_id OR OLD.est_price IS NOT NEW.est_price)
+        AND ((OLD.status = 'Completed' AND OLD.driver_id IS NOT NULL)
+             OR (NEW.status = 'Completed' AND NEW.driver_id IS NOT NULL))
+    BEGIN
+        UPDATE driver_stats SET
+            rides_completed = rides_completed - 1,
+            earnings_total = earnings_total - COALESCE(OLD.est_price, 0)
+        WHERE driver_id = OLD.driver_id AND OLD.status = 'Completed';
+        INSERT INTO driver_stats(driver_id, rides_completed, earnings_total)
+        SELECT NEW.driver_id, 1, COALESCE(NEW.est_price, 0)
+        WHERE NEW.status = 'Completed' AND NEW.driver_id IN (SELECT id FROM drivers)
+        ON CONFLICT(driver_id) DO UPDATE SET
+            rides_completed = rides_completed + 1,
+            earnings_total = earnings_total + excluded.earnings_total;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_driver_stats_ride_reassigned
+    AFTER UPDATE OF driver_id ON rides
+    WHEN OLD.driver_id IS NOT NEW.driver_id
+        AND EXISTS (SELECT 1 FROM feedback WHERE ride_id = NEW.id AND rating IS NOT NULL)
+    BEGIN
+        UPDATE driver_stats SET
+            rating_sum = rating_sum - (SELECT SUM(rating) FROM feedback WHERE ride_id = OLD.id),
+            rating_count = rating_count - (SELECT COUNT(rating) FROM feedback WHERE ride_id = OLD.id)
+        WHERE driver_id = OLD.driver_id;
+        INSERT INTO driver_stats(driver_id, rating_sum, rating_count)
+        SELECT NEW.driver_id, SUM(rating), COUNT(rating) FROM feedback
+        WHERE ride_id = NEW.id AND NEW.driver_id IN (SELECT id FROM drivers) HAVING COUNT(rating) > 0
+        ON CONFLICT(driver_id) DO UPDATE SET
+            rating_sum = rating_sum + excluded.rating_sum,
+            rating_count = rating_count + excluded.rating_count;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_driver_stats_ride_deleted
+    AFTER DELETE ON rides
+    WHEN OLD.driver_id IS NOT NULL
+    BEGIN
+        UPDATE driver_stats SET
+            rides_completed = rides_completed - (OLD.status = 'Completed'),
+            earnings_total = earnings_total - CASE WHEN OLD.status = 'Completed' THEN COALESCE(OLD.est_price, 0) ELSE 0 END,
+            rating_sum = rating_sum - (SELECT COALESCE(SUM(rating), 0) FROM feedback WHERE ride_id = OLD.id),
+            rating_count = rating_count - (SELECT COUNT(rating) FROM feedback WHERE ride_id = OLD.id)
+        WHERE driver_id = OLD.driver_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_driver_stats_feedback_added
+    AFTER INSERT ON feedback
+    WHEN NEW.rating IS NOT NULL
+    BEGIN
+        INSERT INTO driver_stats(driver_id, rating_sum, rating_count)
+        SELECT driver_id, NEW.rating, 1 FROM rides
+        WHERE id = NEW.ride_id AND driver_id IN (SELECT id FROM drivers)
+        ON CONFLICT(driver_id) DO UPDATE SET
+            rating_sum = rating_sum + excluded.rating_sum,
+            rating_count = rating_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_driver_stats_feedback_changed
+    AFTER UPDATE OF rating, ride_id ON feedback
+    WHEN OLD.rating IS NOT NEW.rating OR OLD.ride_id IS NOT NEW.ride_id
+    BEGIN
+        UPDATE driver_stats SET rating_sum = rating_sum - OLD.rating, rating_count = rating_count - 1
+        WHERE OLD.rating IS NOT NULL AND driver_id = (SELECT driver_id FROM rides WHERE id = OLD.ride_id);
+        INSERT INTO driver_stats(driver_id, rating_sum, rating_count)
+        SELECT driver_id, NEW.rating, 1 FROM rides
+        WHERE NEW.rating IS NOT NULL AND id = NEW.ride_id AND driver_id IN (SELECT id FROM drivers)
+        ON CONFLICT(driver_id) DO UPDATE SET
+            rating_sum = rating_sum + excluded.rating_sum,
+            rating_count = rating_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_driver_stats_feedback_removed
+    AFTER DELETE ON feedback
+    WHEN OLD.rating IS NOT NULL
+    BEGIN
+        UPDATE driver_stats SET rating_sum = rating_sum - OLD.rating, rating_count = rating_count - 1
+        WHERE driver_id = (SELECT driver_id FROM rides WHERE id = OLD.ride_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_driver_stats_driver_deleted
+    AFTER DELETE ON drivers
+    BEGIN
+        DELETE FROM driver_stats WHERE driver_id = OLD.id;
+    END
+    """,
+]
+
+
+def rebuild_driver_stats(c: sqlite3.Cursor):
+    """Recompute driver_stats from rides and feedback (backfill or repair)."""
+    c.execute("DELETE FROM driver_stats")
+    c.execute(
+        """
+        INSERT INTO driver_stats(driver_id, rides_completed, earnings_total, rating_sum, rating_count)
+        SELECT driver_id, SUM(rides), SUM(earnings), SUM(rating_sum), SUM(rating_count) FROM (
+            SELECT driver_id, COUNT(*) AS rides, COALESCE(SUM(est_price), 0) AS earnings,
+                   0 AS rating_sum, 0 AS rating_count
+            FROM rides WHERE status='Completed' AND driver_id IS NOT NULL GROUP BY driver_id
+            UNION ALL
+            SELECT r.driver_id, 0, 0, COALESCE(SUM(f.rating), 0), COUNT(f.rating)
+            FROM feedback f JOIN rides r ON r.id = f.ride_id
+            WHERE r.driver_id IS NOT NULL GROUP BY r.driver_id
+        )
+        WHERE driver_id IN (SELECT id FROM drivers)
+        GROUP BY driver_id
+        """
+    )
+
+
+def _schema_v8(c: sqlite3.Cursor):
+    # Per-driver aggregates kept current by triggers, so earnings and ratings read one row per driver
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS driver_stats (
+            driver_id INTEGER PRIMARY KEY,
+            rides_completed INTEGER NOT NULL DEFAULT 0,
+            earnings_total REAL NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            rating_count INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    for trigger in DRIVER_STATS_TRIGGERS:
+        c.execute(trigger)
+    rebuild_driver_stats(c)
+
+
+# Ride lifecycle as an append-only log for the analytics rollups: insert, status change, delete
+RIDE_EVENT_COLUMNS = "ride_id, created_at, vehicle_code, fare_tier, est_price, est_km, est_minutes, old_status, new_status"
+RIDE_EVENT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ride_events_insert AFTER INSERT ON rides
+    BEGIN
+        INSERT INTO ride_events({RIDE_EVENT_COLUMNS})
+        VALUES (NEW.id, NEW.created_at, NEW.vehicle_code, NEW.fare_tier, NEW.est_price, NEW.est_km, NEW.est_minutes,
+                NULL, NEW.status);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ride_events_status AFTER UPDATE OF status ON rides
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        INSERT INTO ride_events({RIDE_EVENT_COLUMNS})
+        VALUES (NEW.id, NEW.created_at, NEW.vehicle_code, NEW.fare_tier, NEW.est_price, NEW.est_km, NEW.est_minutes,
+                OLD.status, NEW.status);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ride_events_delete AFTER DELETE ON rides
+    BEGIN
+        INSERT INTO ride_events({RIDE_EVENT_COLUMNS})
+        VALUES (OLD.id, OLD.created_at, OLD.vehicle_code, OLD.fare_tier, OLD.est_price, OLD.est_km, OLD.est_minutes,
+                OLD.status, NULL);
+    END
+    """,
+]
+
+
+def _schema_v9(c: sqlite3.Cursor):
+    # Hourly/daily analytics rollups, fed from ride_events by services.rollups
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ride_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            ride_id INTEGER, created_at TEXT, vehicle_code TEXT, fare_tier TEXT,
+            est_price REAL, est_km REAL, est_minutes REAL,
+            old_status TEXT, new_status TEXT
+        )
+        """
+    )
+    for table in ("rollup_hourly", "rollup_daily"):
+        c.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket TEXT NOT NULL, vehicle_code TEXT NOT NULL, fare_tier TEXT NOT NULL, status TEXT NOT NULL,
+                rides INTEGER NOT NULL DEFAULT 0,
+                price_sum REAL NOT NULL DEFAULT 0, km_sum REAL NOT NULL DEFAULT 0, minutes_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, vehicle_code, fare_tier, status)
+            ) WITHOUT ROWID
+            """
+        )
+    c.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('rollup_seq', 0)")
+    for trigger in RIDE_EVENT_TRIGGERS:
+        c.execute(trigger)
+    # Existing rides enter the log as inserts so the first rollup pass backfills them
+    c.execute(
+        f"""
+        INSERT INTO ride_events({RIDE_EVENT_COLUMNS})
+        SELECT id, created_at, vehicle_code, fare_tier, est_price, est_km, est_minutes, NULL, status
+        FROM rides ORDER BY id
+        """
+    )
+
+
+def _schema_v10(c: sqlite3.Cursor):
+    # v8's triggers ignored rides leaving Completed and edits after completion; replace them all
+    for (name,) in c.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg\\_driver\\_stats\\_%' ESCAPE '\\'"
+    ).fetchall():
+        c.execute(f"DROP TRIGGER {name}")
+    for trigger in DRIVER_STATS_TRIGGERS:
+        c.execute(trigger)
+    rebuild_driver_stats(c)
+
+
+def _schema_v11(c: sqlite3.Cursor):
+    # Earnings since a date are counted by completion time: last_update_at of Completed rides
+    c.execute(
+        "CREATE INDEX IF NOT EXISTS idx_rides_driver_status_updated "
+        "ON rides(driver_id, status, last_update_at, est_price)"
+    )
+
+
+# Append-only: position N brings a database from user_version N to N+1
+MIGRATIONS = [
+    _schema_v1,
+    _schema_v2,
+    _schema_v3,
+    _schema_v4,
+    _schema_v5,
+    _schema_v6,
+    _schema_v7,
+    _schema_v8,
+    _schema_v9,
+    _schema_v10,
+    _schema_v11,
+]
+
+# Ride rows without the route; track_len is the number of points in ride_tracks
+RIDE_COLUMNS = """
+    r.id, r.user_id, r.driver_id, r.pickup_text, r.dropoff_text,
+    r.pickup_lat, r.pickup_lon, r.drop_lat, r.drop_lon,
+    r.scheduled_at, r.created_at, r.vehicle_code, r.fare_tier, r.pax,
+    r.est_km, r.est_minutes, r.est_price, r.status, r.track_idx, r.last_update_at,
+    COALESCE(t.n_points, 0) AS track_len
+"""
+RIDES_FROM = "rides r LEFT JOIN ride_tracks t ON t.ride_id = r.id"
+
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def connect(path: str = APP_DB) -> sqlite3.Connection:
+    """New tuned connection. WAL lets readers run alongside the single writer."""
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=SQLITE_BUSY_TIMEOUT_S)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_BYTES)}")
+    conn.execute(f"PRAGMA cache_size=-{int(SQLITE_CACHE_KIB)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+@contextmanager
+def synchronous_full(conn: sqlite3.Connection):
+    """Commits made inside the block are flushed with synchronous=FULL.
+
+    Ride status transitions use it so they survive a power loss; the pragma
+    cannot change inside a transaction, so enter the block before writing.
+    """
+    conn.execute("PRAGMA synchronous=FULL")
+    try:
+        yield conn
+    finally:
+        conn.execute("PRAGMA synchronous=NORMAL")
+
+
+class DB:
+    """One connection plus the query helpers.
+
+    Create one per session or thread; migrations run only for the first DB
+    opened on a given file in this process. In-memory databases and URIs are
+    not a file every connection shares, so they are checked on every open.
+    """
+
+    def __init__(self, path: str = APP_DB):
+        self.path = path
+        self.conn = connect(path)
+        if path in ("", ":memory:") or path.startswith("file:"):
+            self._migrate()
+            return
+        key = os.path.abspath(path)
+        with _migrate_lock:
+            if key not in _migrated:
+                self._migrate()
+                _migrated.add(key)
+
+    def _migrate(self):
+        """Apply pending MIGRATIONS, tracking progress in PRAGMA user_version."""
+        c = self.conn.cursor()
+        if c.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+            return
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            version = c.execute("PRAGMA user_version").fetchone()[0]
+            for n, step in enumerate(MIGRATIONS[version:], start=version + 1):
+                step(c)
+                c.execute(f"PRAGMA user_version={n}")
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
 
     # users
     def create_user(self, name, email, password) -> Optional[int]:
@@ -123,6 +527,17 @@ class DB:
         self.conn.execute("UPDATE drivers SET is_available=? WHERE id=?", (1 if available else 0, driver_id))
         self.conn.commit()
 
+    def set_driver_location(self, driver_id: int, lat: float, lon: float):
+        self.conn.execute("UPDATE drivers SET lat=?, lon=?, pos_updated_at=? WHERE id=?",
+                          (lat, lon, now_ts(), driver_id))
+        self.conn.commit()
+
+    def list_driver_locations(self) -> List[sqlite3.Row]:
+        """Positions of available drivers that have reported one."""
+        cur = self.conn.cursor()
+        cur.execute("SELECT id, lat, lon FROM drivers WHERE is_available=1 AND lat IS NOT NULL AND lon IS NOT NULL")
+        return cur.fetchall()
+
     # admins
     def get_admin(self, email, password) -> Optional[sqlite3.Row]:
         cur = self.conn.cursor()
@@ -130,51 +545,173 @@ class DB:
         return cur.fetchone()
 
     # rides
-    def add_ride(self, **kw) -> int:
+    def add_ride(self, track: Optional[Sequence[Sequence[float]]] = None, **kw) -> int:
         cur = self.conn.cursor()
         cols = ",".join(kw.keys())
         q = f"INSERT INTO rides ({cols}) VALUES ({','.join(['?']*len(kw))})"
         cur.execute(q, tuple(kw.values()))
+        ride_id = cur.lastrowid
+        if track:
+            self.set_ride_track(ride_id, track, commit=False)
         self.conn.commit()
-        return cur.lastrowid
+        return ride_id
 
     def list_user_rides(self, user_id: int) -> List[sqlite3.Row]:
         cur = self.conn.cursor()
-        cur.execute("SELECT * FROM rides WHERE user_id=? ORDER BY datetime(created_at) DESC", (user_id,))
+        cur.execute(f"SELECT {RIDE_COLUMNS} FROM {RIDES_FROM} WHERE r.user_id=? ORDER BY r.created_at DESC", (user_id,))
         return cur.fetchall()
 
     def list_driver_queue(self) -> List[sqlite3.Row]:
        
         cur = self.conn.cursor()
-        cur.execute("SELECT * FROM rides WHERE status='Assigned' AND driver_id IS NULL ORDER BY datetime(created_at) ASC")
+        cur.execute(
+            f"SELECT {RIDE_COLUMNS} FROM {RIDES_FROM} "
+            "WHERE r.status='Assigned' AND r.driver_id IS NULL ORDER BY r.created_at ASC"
+        )
         return cur.fetchall()
 
     def get_ride(self, ride_id: int) -> Optional[sqlite3.Row]:
         cur = self.conn.cursor()
-        cur.execute("SELECT * FROM rides WHERE id=?", (ride_id,))
+        cur.execute(f"SELECT {RIDE_COLUMNS} FROM {RIDES_FROM} WHERE r.id=?", (ride_id,))
         return cur.fetchone()
 
-    def set_ride_driver(self, ride_id: int, driver_id: int):
-        self.conn.execute("UPDATE rides SET driver_id=?, status='In-Progress', last_update_at=? WHERE id=?",
-                          (driver_id, now_ts(), ride_id))
-        self.conn.commit()
+    def set_ride_track(self, ride_id: int, coords: Sequence[Sequence[float]], commit: bool = True):
+        blob = pack_track(coords)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO ride_tracks(ride_id, n_points, coords) VALUES (?,?,?)",
+            (ride_id, track_len(blob), blob),
+        )
+        if commit:
+            self.conn.commit()
+
+    def get_ride_track(self, ride_id: int) -> Optional[bytes]:
+        """Packed route for a ride (see db.tracks), or None if it has none yet."""
+        row = self.conn.execute("SELECT coords FROM ride_tracks WHERE ride_id=?", (ride_id,)).fetchone()
+        return row[0] if row else None
+
+    def claim_ride(self, ride_id: int, driver_id: int, track: Optional[Sequence[Sequence[float]]] = None) -> bool:
+        """Compare-and-set claim of an unclaimed Assigned ride.
+
+        False if someone else got it first or the driver already has an active
+        ride. The ride's route is set to `track` in the same transaction unless
+        it already has one.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self.conn.execute(
+                "UPDATE rides SET driver_id=?, status='In-Progress', track_idx=0, last_update_at=? "
+                "WHERE id=? AND status='Assigned' AND driver_id IS NULL AND NOT EXISTS ("
+                "SELECT 1 FROM rides r WHERE r.driver_id=? AND r.status IN ('Assigned', 'In-Progress'))",
+                (driver_id, now_ts(), ride_id, driver_id),
+            )
+            claimed = cur.rowcount == 1
+            if claimed and track:
+                blob = pack_track(track)
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO ride_tracks(ride_id, n_points, coords) VALUES (?,?,?)",
+                    (ride_id, track_len(blob), blob),
+                )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return claimed
+
+    def set_ride_driver(self, ride_id: int, driver_id: int) -> bool:
+        return self.claim_ride(ride_id, driver_id)
 
     def update_ride_tracking(self, ride_id: int, idx: int, status: Optional[str] = None):
-        if status:
+        """Driver-initiated position/status change, committed at once.
+
+        Routine position updates are written by the simulation engine in one
+        transaction per tick. A status change is committed with
+        synchronous=FULL so it survives a power loss.
+        """
+        if not status:
+            self.conn.execute("UPDATE rides SET track_idx=?, last_update_at=? WHERE id=? AND status!='Completed'",
+                              (idx, now_ts(), ride_id))
+            self.conn.commit()
+            return
+        with synchronous_full(self.conn):
             self.conn.execute("UPDATE rides SET track_idx=?, last_update_at=?, status=? WHERE id=?",
                               (idx, now_ts(), status, ride_id))
-        else:
-            self.conn.execute("UPDATE rides SET track_idx=?, last_update_at=? WHERE id=?",
-                              (idx, now_ts(), ride_id))
-        self.conn.commit()
+            self.conn.commit()
+
+    def get_active_ride_for_driver(self, driver_id: int) -> Optional[sqlite3.Row]:
+        cur = self.conn.cursor()
+        cur.execute(
+            """
+            SELECT id, status, pickup_lat, pickup_lon, drop_lat, drop_lon, track_idx
+            FROM rides
+            WHERE driver_id=? AND status IN ('In-Progress', 'Assigned')
+            ORDER BY created_at DESC LIMIT 1
+            """,
+            (driver_id,),
+        )
+        return cur.fetchone()
+
+    def driver_earnings_summary(self, driver_id: int, since: Optional[str] = None) -> sqlite3.Row:
+        """Completed ride count and fare total for a driver, optionally for rides completed from `since`.
+
+        `since` is a now_ts() string compared against last_update_at, which is
+        stamped when the ride is marked Completed and not moved afterwards.
+        """
+        cur = self.conn.cursor()
+        if since is None:
+            cur.execute(
+                """
+                SELECT COALESCE(MAX(rides_completed), 0) AS rides, COALESCE(MAX(earnings_total), 0) AS earnings
+                FROM driver_stats WHERE driver_id=?
+                """,
+                (driver_id,),
+            )
+            return cur.fetchone()
+        cur.execute(
+            """
+            SELECT COUNT(*) AS rides, COALESCE(SUM(est_price), 0) AS earnings
+            FROM rides
+            WHERE driver_id=? AND status='Completed' AND last_update_at>=?
+            """,
+            (driver_id, since),
+        )
+        return cur.fetchone()
 
     def list_all_rides(self) -> List[sqlite3.Row]:
         cur = self.conn.cursor()
-        cur.execute("SELECT * FROM rides ORDER BY datetime(created_at) DESC")
+        cur.execute(f"SELECT {RIDE_COLUMNS} FROM {RIDES_FROM} ORDER BY r.created_at DESC")
         return cur.fetchall()
 
+    def list_rides_page(self, limit: int = 50, after: Optional[Tuple[str, int]] = None,
+                        status: Optional[str] = None, user_id: Optional[int] = None,
+                        driver_id: Optional[int] = None, since: Optional[str] = None,
+                        until: Optional[str] = None) -> List[sqlite3.Row]:
+        """Up to `limit` rides, newest first, strictly after the (created_at, id) cursor `after`.
+
+        `since` is inclusive and `until` exclusive, both compared against created_at text.
+        """
+        where, args = [], []
+        if after is not None:
+            where.append("(r.created_at, r.id) < (?, ?)")
+            args += [after[0], after[1]]
+        for clause, value in (("r.status=?", status), ("r.user_id=?", user_id), ("r.driver_id=?", driver_id),
+                              ("r.created_at>=?", since), ("r.created_at<?", until)):
+            if value is not None:
+                where.append(clause)
+                args.append(value)
+        sql = f"SELECT {RIDE_COLUMNS} FROM {RIDES_FROM}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.created_at DESC, r.id DESC LIMIT ?"
+        return self.conn.execute(sql, (*args, limit)).fetchall()
+
+    def delete_ride(self, ride_id: int):
+        self.conn.execute("DELETE FROM ride_tracks WHERE ride_id=?", (ride_id,))
+        self.conn.execute("DELETE FROM rides WHERE id=?", (ride_id,))
+        self.conn.commit()
+
     # feedback
     def add_feedback(self, user_id: int, ride_id: int, rating: int, comments: str):
+        # The driver's rating_sum/rating_count move in the same transaction (trigger on feedback)
         self.conn.execute(
             "INSERT INTO feedback(user_id,ride_id,rating,comments,created_at) VALUES (?,?,?,?,?)",
             (user_id, ride_id, rating, comments, now_ts()),
@@ -0,0 +1,86 @@
+import sqlite3
+from typing import Dict, Optional, Sequence
+
+import pandas as pd
+
+# Rows per fetch; each chunk is converted to the target dtypes before the next is read
+EXPORT_CHUNK_ROWS = 10_000
+
+USERS_SQL = "SELECT id, name, email FROM users ORDER BY id DESC"
+USERS_DTYPES = {"id": "int64", "name": "string", "email": "string"}
+
+DRIVERS_SQL = """
+    SELECT id, name, email,
+           COALESCE(car_make, '') || ' ' || COALESCE(car_model, '') || ' (' || COALESCE(car_plate, '') || ')' AS car,
+           is_available
+    FROM drivers ORDER BY id DESC
+"""
+DRIVERS_DTYPES = {"id": "int64", "name": "string", "email": "string", "car": "string", "is_available": "boolean"}
+
+FEEDBACK_SQL = """
+    SELECT f.id, f.created_at,
+           COALESCE(u.name, CAST(f.user_id AS TEXT)) AS user,
+           COALESCE(d.name, CAST(r.driver_id AS TEXT), '—') AS driver,
+           r.pickup_text || ' → ' || r.dropoff_text AS ride,
+           f.rating, f.comments
+    FROM feedback f
+    LEFT JOIN rides r ON f.ride_id = r.id
+    LEFT JOIN drivers d ON r.driver_id = d.id
+    LEFT JOIN users u ON f.user_id = u.id
+    ORDER BY f.created_at DESC
+"""
+FEEDBACK_DTYPES = {
+    "id": "int64", "created_at": "string", "user": "string", "driver": "string",
+    "ride": "string", "rating": "Int8", "comments": "string",
+}
+
+DRIVER_RATINGS_SQL = """
+    SELECT d.id AS driver_id, d.name, CAST(s.rating_sum AS REAL) / s.rating_count AS avg_rating,
+           s.rating_count AS count
+    FROM driver_stats s JOIN drivers d ON d.id = s.driver_id
+    WHERE s.rating_count > 0
+    ORDER BY avg_rating DESC
+"""
+DRIVER_RATINGS_DTYPES = {"driver_id": "int64", "name": "string", "avg_rating": "float64", "count": "int64"}
+
+ROLLUP_SQL = """
+    SELECT bucket, vehicle_code, fare_tier, status, rides, price_sum, km_sum, minutes_sum
+    FROM {table} WHERE bucket >= ? AND bucket < ?
+    ORDER BY bucket
+"""
+ROLLUP_DTYPES = {
+    "bucket": "string", "vehicle_code": "string", "fare_tier": "string", "status": "string",
+    "rides": "int64", "price_sum": "float64", "km_sum": "float64", "minutes_sum": "float64",
+}
+ROLLUP_TABLES = {"hour": "rollup_hourly", "day": "rollup_daily"}
+
+
+def read_frame(conn: sqlite3.Connection, sql: str, dtypes: Dict[str, str],
+               params: Optional[Sequence] = None, chunk_rows: int = EXPORT_CHUNK_ROWS) -> pd.DataFrame:
+    """Query result as a DataFrame with the given column dtypes, read in chunks of `chunk_rows`."""
+    chunks = pd.read_sql(sql, conn, params=params, dtype=dtypes, chunksize=chunk_rows)
+    frames = list(chunks)
+    if not frames:
+        return pd.DataFrame({col: pd.Series(dtype=dt) for col, dt in dtypes.items()})
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def users_frame(conn: sqlite3.Connection) -> pd.DataFrame:
+    return read_frame(conn, USERS_SQL, USERS_DTYPES)
+
+
+def drivers_frame(conn: sqlite3.Connection) -> pd.DataFrame:
+    return read_frame(conn, DRIVERS_SQL, DRIVERS_DTYPES)
+
+
+def feedback_frame(conn: sqlite3.Connection) -> pd.DataFrame:
+    return read_frame(conn, FEEDBACK_SQL, FEEDBACK_DTYPES)
+
+
+def driver_ratings_frame(conn: sqlite3.Connection) -> pd.DataFrame:
+    return read_frame(conn, DRIVER_RATINGS_SQL, DRIVER_RATINGS_DTYPES)
+
+
+def rollup_frame(conn: sqlite3.Connection, grain: str, since: str, until: str) -> pd.DataFrame:
+    """Rollup rows for buckets in [since, until); `grain` is "hour" or "day"."""
+    return read_frame(conn, ROLLUP_SQL.format(table=ROLLUP_TABLES[grain]), ROLLUP_DTYPES, params=(since, until))
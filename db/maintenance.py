@@ -0,0 +1,38 @@
+"""Maintenance commands for the app database.
+
+    python -m db.maintenance rebuild-stats [--db PATH]
+"""
+import argparse
+import sys
+
+from config.constants import APP_DB
+from db.database import DB, rebuild_driver_stats
+
+
+def rebuild_stats(path: str) -> int:
+    """Recompute driver_stats in one transaction; returns the number of driver rows."""
+    db = DB(path)
+    c = db.conn.cursor()
+    c.execute("BEGIN IMMEDIATE")
+    try:
+        rebuild_driver_stats(c)
+        db.conn.commit()
+    except Exception:
+        db.conn.rollback()
+        raise
+    return c.execute("SELECT COUNT(*) FROM driver_stats").fetchone()[0]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m db.maintenance")
+    parser.add_argument("--db", default=APP_DB, help="database file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild-stats", help="recompute the driver_stats aggregates from rides and feedback")
+    args = parser.parse_args(argv)
+    if args.command == "rebuild-stats":
+        print(f"driver_stats rebuilt: {rebuild_stats(args.db)} drivers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import sys
+from array import array
+from typing import List, Sequence, Tuple
+
+# Tracks are stored as little-endian float32 lat, lon, lat, lon, ... (8 bytes per point)
+POINT_BYTES = 8
+_NATIVE_LE = sys.byteorder == "little"
+
+
+def pack_track(coords: Sequence[Sequence[float]]) -> bytes:
+    a = array("f", (c for pt in coords for c in pt[:2]))
+    if not _NATIVE_LE:
+        a.byteswap()
+    return a.tobytes()
+
+
+def track_len(blob: bytes) -> int:
+    return len(blob or b"") // POINT_BYTES
+
+
+def track_view(blob: bytes):
+    """Flat float view over a packed track: a zero-copy memoryview on little-endian hosts."""
+    if _NATIVE_LE:
+        return memoryview(blob).cast("f")
+    a = array("f")
+    a.frombytes(blob)
+    a.byteswap()
+    return a
+
+
+def track_point(blob: bytes, idx: int) -> Tuple[float, float]:
+    v = track_view(blob)
+    return v[2 * idx], v[2 * idx + 1]
+
+
+def track_points(blob: bytes) -> List[Tuple[float, float]]:
+    if not blob:
+        return []
+    v = track_view(blob)
+    return list(zip(v[0::2], v[1::2]))
+
+
+def track_array(blob: bytes):
+    """(n, 2) float32 NumPy array sharing memory with `blob`."""
+    import numpy as np
+
+    return np.frombuffer(blob, dtype="<f4").reshape(-1, 2)
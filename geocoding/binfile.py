@@ -0,0 +1,61 @@
+import json
+import mmap
+import struct
+from typing import Any, Dict, Union
+
+import numpy as np
+
+# File layout: MAGIC, u32 header length, JSON header, then 8-byte aligned sections.
+# The header maps each section name to its offset, length, dtype and shape.
+MAGIC = b"TAXIBIN1"
+ALIGN = 8
+
+
+def write_sections(path: str, kind: str, sections: Dict[str, Union[np.ndarray, bytes]], **meta: Any):
+    """Write named arrays/byte strings to `path` so SectionFile can map them without copying.
+
+    Section offsets are relative to the first aligned byte after the header.
+    """
+    arrays = {
+        name: np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray)) else np.ascontiguousarray(data)
+        for name, data in sections.items()
+    }
+    table, offset = {}, 0
+    for name, a in arrays.items():
+        table[name] = {"offset": offset, "nbytes": a.nbytes, "dtype": a.dtype.str, "shape": list(a.shape)}
+        offset += -(-a.nbytes // ALIGN) * ALIGN
+    header = json.dumps({"kind": kind, "meta": meta, "sections": table}).encode()
+    start = -(-(len(MAGIC) + 4 + len(header)) // ALIGN) * ALIGN
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        f.write(b"\0" * (start - f.tell()))
+        for name, a in arrays.items():
+            f.write(a.tobytes())
+            f.write(b"\0" * (-a.nbytes % ALIGN))
+
+
+class SectionFile:
+    """Read-only memory map of a file written by write_sections; arrays are views into the map."""
+
+    def __init__(self, path: str, kind: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: not an index file")
+        (n,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        header = json.loads(self._mm[len(MAGIC) + 4:len(MAGIC) + 4 + n])
+        if header["kind"] != kind:
+            raise ValueError(f"{path}: expected a {kind} index, found {header['kind']}")
+        self.meta: Dict[str, Any] = header["meta"]
+        self._sections = header["sections"]
+        self._base = -(-(len(MAGIC) + 4 + n) // ALIGN) * ALIGN
+
+    def array(self, name: str) -> np.ndarray:
+        s = self._sections[name]
+        dtype = np.dtype(s["dtype"])
+        a = np.frombuffer(self._mm, dtype=dtype, count=s["nbytes"] // dtype.itemsize, offset=self._base + s["offset"])
+        return a.reshape(s["shape"])
+
+    def bytes(self, name: str) -> memoryview:
+        s = self._sections[name]
+        return memoryview(self._mm)[self._base + s["offset"]:self._base + s["offset"] + s["nbytes"]]
@@ -0,0 +1,206 @@
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.constants import CACHE_DB
+
+# How many disk writes between two trims of the backing table
+TRIM_EVERY = 256
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a free-text address so "  Saddar,Karachi" and "saddar, karachi" share a key."""
+    q = unicodedata.normalize("NFKC", query or "").casefold()
+    q = re.sub(r"\s*,\s*", ", ", q)
+    q = re.sub(r"\s+", " ", q)
+    return q.strip(" ,.;")
+
+
+def _nbytes(encoded: Any) -> int:
+    return len(encoded) if isinstance(encoded, (str, bytes, bytearray, memoryview)) else 64
+
+
+class PersistentCache:
+    """Two-level cache: an in-process LRU in front of a SQLite table.
+
+    Entries expire `ttl` seconds after they were stored; with `stale` > 0 they
+    stay readable through `get_entry` for that much longer so callers can serve
+    them while refreshing. The memory layer holds at most `max_memory` decoded
+    values and, if `max_bytes` is set, at most that many bytes as measured by
+    `sizeof` on the decoded value (the encoded length if not given); the table
+    is trimmed to `max_rows`, oldest first. Disk errors only disable the second
+    level, lookups never raise.
+    """
+
+    def __init__(self, table: str, path: str = CACHE_DB, ttl: float = 3600.0,
+                 max_memory: int = 1024, max_rows: int = 10_000,
+                 encode: Callable[[Any], Any] = lambda v: v,
+                 decode: Callable[[Any], Any] = lambda v: v,
+                 stale: float = 0.0, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.table = table
+        self.ttl = ttl
+        self.stale = stale
+        self.max_memory = max_memory
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self._encode = encode
+        self._decode = decode
+        self._sizeof = sizeof
+        self._mem: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        try:
+            self._conn: Optional[sqlite3.Connection] = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value BLOB, stored_at REAL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_stored ON {table}(stored_at)")
+            self._conn.commit()
+        except sqlite3.Error:
+            self._conn = None
+
+    def _size(self, value: Any, encoded: Any) -> int:
+        return self._sizeof(value) if self._sizeof is not None else _nbytes(encoded)
+
+    def _remember(self, key: str, value: Any, stored_at: float, nbytes: int):
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= old[2]
+        self._mem[key] = (value, stored_at, nbytes)
+        self._mem_bytes += nbytes
+        while self._mem and (len(self._mem) > self.max_memory
+                             or (self.max_bytes is not None and self._mem_bytes > self.max_bytes)):
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= evicted[2]
+
+    def _lookup(self, key: str, now: float) -> Optional[Tuple[Any, float]]:
+        horizon = self.ttl + self.stale
+        entry = self._mem.get(key)
+        if entry is not None:
+            if now - entry[1] <= horizon:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+            self._mem_bytes -= entry[2]
+            del self._mem[key]
+        row = None
+        if self._conn is not None:
+            try:
+                row = self._conn.execute(
+                    f"SELECT value, stored_at FROM {self.table} WHERE key=? AND stored_at>=?",
+                    (key, now - horizon),
+                ).fetchone()
+            except sqlite3.Error:
+                row = None
+        if row is None:
+            self.misses += 1
+            return None
+        value = self._decode(row[0])
+        self._remember(key, value, row[1], self._size(value, row[0]))
+        self.hits += 1
+        self.disk_hits += 1
+        return value, row[1]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Fresh value for `key`, or None."""
+        entry = self.get_entry(key)
+        if entry is None or entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, age in seconds) for `key`, including entries in the stale window."""
+        now = time.time()
+        with self._lock:
+            found = self._lookup(key, now)
+            if found is None:
+                return None
+            age = now - found[1]
+            if age > self.ttl:
+                self.stale_hits += 1
+            return found[0], age
+
+    def put(self, key: str, value: Any):
+        now = time.time()
+        encoded = self._encode(value)
+        with self._lock:
+            self._remember(key, value, now, self._size(value, encoded))
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table}(key, value, stored_at) VALUES (?,?,?)",
+                    (key, encoded, now),
+                )
+                self._writes += 1
+                if self._writes % TRIM_EVERY == 0:
+                    self._trim(now)
+                self._conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def _trim(self, now: float):
+        self._conn.execute(f"DELETE FROM {self.table} WHERE stored_at<?", (now - self.ttl - self.stale,))
+        self._conn.execute(
+            f"""
+            DELETE FROM {self.table} WHERE key IN (
+                SELECT key FROM {self.table} ORDER BY stored_at ASC
+                LIMIT max(0, (SELECT COUNT(*) FROM {self.table}) - ?)
+            )
+            """,
+            (self.max_rows,),
+        )
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """Fresh (key, value) pairs stored on disk, oldest first; empty if the disk level is off."""
+        with self._lock:
+            if self._conn is None:
+                return []
+            try:
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE stored_at>=? ORDER BY stored_at",
+                    (time.time() - self.ttl,),
+                ).fetchall()
+            except sqlite3.Error:
+                return []
+        out = []
+        for key, value in rows:
+            try:
+                out.append((key, self._decode(value)))
+            except (TypeError, ValueError):
+                continue
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+            if self._conn is not None:
+                try:
+                    self._conn.execute(f"DELETE FROM {self.table}")
+                    self._conn.commit()
+                except sqlite3.Error:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "memory_entries": len(self._mem),
+                "memory_bytes": self._mem_bytes,
+            }
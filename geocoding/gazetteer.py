@@ -0,0 +1,351 @@
+"""Offline geocoder over a prebuilt gazetteer index.
+
+    python -m geocoding.gazetteer build places.csv [--out gazetteer.idx]
+    python -m geocoding.gazetteer query "saddar karachi" [--index gazetteer.idx]
+
+The input is a CSV (or TSV, optionally gzipped) with a header naming at least
+name, lat and lon. OSMNames-style exports work as is: display_name is preferred
+over name when present, and importance ranks places that match equally well.
+"""
+import argparse
+import csv
+import gzip
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.constants import GAZETTEER_PATH
+from geocoding.binfile import SectionFile, write_sections
+from geocoding.cache import normalize_query
+from services.worker import PathRegistry
+
+Place = Tuple[str, float, float]
+
+KIND = "gazetteer"
+# Most vocabulary tokens one trailing prefix expands to
+PREFIX_MAX_TOKENS = 64
+# Misspelt tokens match up to this many vocabulary tokens at this trigram similarity or better
+FUZZY_MAX_TOKENS = 4
+FUZZY_MIN_SIMILARITY = 0.4
+# First slice of the rarest posting list probed for a multi-token query (doubles each round)
+SCAN_CHUNK = 256
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize_query(text))
+
+
+def trigrams(token: str) -> List[str]:
+    """Distinct trigrams of the token padded like pg_trgm ("  ab " -> "  a", " ab", "ab ")."""
+    padded = f"  {token} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def _pack_strings(strings: Sequence[str]) -> Tuple[np.ndarray, bytes]:
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, b"".join(encoded)
+
+
+def _pack_lists(lists: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(lists) + 1, dtype=np.uint64)
+    np.cumsum([len(v) for v in lists], out=offsets[1:])
+    values = np.fromiter((x for v in lists for x in v), dtype=np.uint32, count=int(offsets[-1]))
+    return offsets, values
+
+
+def build(places: Iterable[Tuple[str, float, float, float]], out: str) -> int:
+    """Write the index for (name, lat, lon, importance) rows to `out`; returns the number of places.
+
+    Places are numbered by descending importance, so every posting list is
+    already in rank order and the best matches are the smallest ids.
+    """
+    rows = sorted((p for p in places if tokenize(p[0])), key=lambda p: -p[3])
+    postings: Dict[str, List[int]] = defaultdict(list)
+    for i, (name, _, _, _) in enumerate(rows):
+        for token in dict.fromkeys(tokenize(name)):
+            postings[token].append(i)
+    vocab = sorted(postings)
+    gram_postings: Dict[str, List[int]] = defaultdict(list)
+    n_grams = []
+    for t, token in enumerate(vocab):
+        grams = trigrams(token)
+        n_grams.append(len(grams))
+        for g in grams:
+            gram_postings[g].append(t)
+    grams = sorted(gram_postings)
+
+    name_off, names = _pack_strings([r[0] for r in rows])
+    tok_off, tok_str = _pack_strings(vocab)
+    post_off, post = _pack_lists([postings[t] for t in vocab])
+    tri_off, tri_str = _pack_strings(grams)
+    tri_post_off, tri_post = _pack_lists([gram_postings[g] for g in grams])
+    write_sections(
+        out, KIND,
+        {
+            "lat": np.array([r[1] for r in rows], dtype=np.float64),
+            "lon": np.array([r[2] for r in rows], dtype=np.float64),
+            "name_off": name_off, "names": names,
+            "tok_off": tok_off, "tok_str": tok_str, "post_off": post_off, "post": post,
+            "tok_grams": np.array(n_grams, dtype=np.uint16),
+            "tri_off": tri_off, "tri_str": tri_str, "tri_post_off": tri_post_off, "tri_post": tri_post,
+        },
+        places=len(rows), tokens=len(vocab), trigrams=len(grams),
+    )
+    return len(rows)
+
+
+def read_places(path: str) -> Iterator[Tuple[str, float, float, float]]:
+    """(name, lat, lon, importance) rows of a CSV/TSV gazetteer; rows without coordinates are skipped."""
+    opener = gzip.open if path.endswith(".gz") else open
+    delimiter = "\t" if path.removesuffix(".gz").endswith(".tsv") else ","
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f, delimiter=delimiter):
+            name = (row.get("display_name") or row.get("name") or "").strip()
+            try:
+                lat, lon = float(row["lat"]), float(row["lon"])
+                importance = float(row.get("importance") or 0.0)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if name:
+                yield name, lat, lon, importance
+
+
+class _Strings:
+    """Sequence view of a packed string table: entry i is blob[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview):
+        self._off = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._off) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return bytes(self._blob[self._off[i]:self._off[i + 1]])
+
+
+class _SortedStrings(_Strings):
+    """String table sorted as UTF-8 bytes, searchable by bisection."""
+
+    def find(self, key: bytes) -> int:
+        i = _bisect(self, key)
+        return i if i < len(self) and self[i] == key else -1
+
+    def prefix_range(self, key: bytes) -> Tuple[int, int]:
+        # 0xff never occurs in UTF-8, so it sorts after every string starting with `key`
+        return _bisect(self, key), _bisect(self, key + b"\xff")
+
+
+def _bisect(seq: _SortedStrings, key: bytes) -> int:
+    lo, hi = 0, len(seq)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if seq[mid] < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _contains(sorted_ids: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    """Mask of the `ids` present in the sorted array `sorted_ids`."""
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=bool)
+    at = np.searchsorted(sorted_ids, ids)
+    at[at == len(sorted_ids)] = 0
+    return sorted_ids[at] == ids
+
+
+def _first_common(required: List[np.ndarray], any_of: List[np.ndarray], limit: int) -> List[int]:
+    """The `limit` smallest ids found in every array of `required` and in at least one of `any_of`.
+
+    Ids are ranks, so the scan walks the smallest array in growing chunks and
+    stops as soon as it has enough; only a few hundred ids are usually probed.
+    """
+    if not any_of:
+        return []
+    if not required:
+        return np.unique(np.concatenate([p[:limit] for p in any_of]))[:limit].tolist()
+    required = sorted(required, key=len)
+    if sum(len(p) for p in any_of) < len(required[0]):
+        required = [any_of[0] if len(any_of) == 1 else np.unique(np.concatenate(any_of))] + required
+        any_of = []
+    driver, rest = required[0], required[1:]
+    out: List[int] = []
+    start, chunk = 0, SCAN_CHUNK
+    while start < len(driver) and len(out) < limit:
+        ids = driver[start:start + chunk]
+        for other in rest:
+            ids = ids[_contains(other, ids)]
+        if any_of and len(ids):
+            hit = np.zeros(len(ids), dtype=bool)
+            for p in any_of:
+                hit |= _contains(p, ids)
+            ids = ids[hit]
+        out.extend(ids[:limit - len(out)].tolist())
+        start += chunk
+        chunk *= 2
+    return out
+
+
+class Gazetteer:
+    """Memory-mapped gazetteer index: token postings plus a trigram index over the vocabulary."""
+
+    def __init__(self, path: str):
+        self.path = path
+        f = SectionFile(path, KIND)
+        self.meta = f.meta
+        self._lat = f.array("lat")
+        self._lon = f.array("lon")
+        self._names = _Strings(f.array("name_off"), f.bytes("names"))
+        self._tokens = _SortedStrings(f.array("tok_off"), f.bytes("tok_str"))
+        self._post_off = f.array("post_off")
+        self._post = f.array("post")
+        self._tok_grams = f.array("tok_grams")
+        self._grams = _SortedStrings(f.array("tri_off"), f.bytes("tri_str"))
+        self._gram_off = f.array("tri_post_off")
+        self._gram_post = f.array("tri_post")
+
+    def __len__(self) -> int:
+        return len(self._lat)
+
+    def _postings(self, token_id: int) -> np.ndarray:
+        return self._post[self._post_off[token_id]:self._post_off[token_id + 1]]
+
+    def _similar(self, token: str) -> List[int]:
+        """Vocabulary ids closest to a token that is not in the index, best first."""
+        query = trigrams(token)
+        found = []
+        for g in query:
+            i = self._grams.find(g.encode())
+            if i >= 0:
+                found.append(self._gram_post[self._gram_off[i]:self._gram_off[i + 1]])
+        if not found:
+            return []
+        counts = np.bincount(np.concatenate(found), minlength=len(self._tokens))
+        ids = np.flatnonzero(counts)
+        shared = counts[ids]
+        sim = shared / (len(query) + self._tok_grams[ids].astype(np.int64) - shared)
+        best = np.argsort(-sim, kind="stable")[:FUZZY_MAX_TOKENS]
+        return [int(ids[k]) for k in best if sim[k] >= FUZZY_MIN_SIMILARITY]
+
+    def _match(self, token: str, prefix: bool) -> List[int]:
+        """Vocabulary ids a query token stands for: itself, then (if `prefix`) its completions, else near spellings."""
+        key = token.encode()
+        if prefix:
+            lo, hi = self._tokens.prefix_range(key)
+            if hi > lo:
+                return list(range(lo, min(hi, lo + PREFIX_MAX_TOKENS)))
+        i = self._tokens.find(key)
+        return [i] if i >= 0 else self._similar(token)
+
+    def search(self, query: str, limit: int = 5) -> List[Place]:
+        """Up to `limit` places matching every token of `query`, the last one as a prefix.
+
+        Places whose names contain the last token in full rank before those that
+        only complete it; within each group the more important place wins.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or limit <= 0:
+            return []
+        *head, last = tokens
+        required = []
+        for token in head:
+            ids = self._match(token, prefix=False)
+            if not ids:
+                return []
+            required.append(self._postings(ids[0]) if len(ids) == 1 else np.unique(
+                np.concatenate([self._postings(t) for t in ids])))
+        exact, completions = [], []
+        for t in self._match(last, prefix=True):
+            (exact if self._tokens[t] == last.encode() else completions).append(self._postings(t))
+        found = _first_common(required, exact, limit)
+        if len(found) < limit:
+            seen = set(found)
+            found += [i for i in _first_common(required, completions, limit) if i not in seen]
+        return [self.place(i) for i in found[:limit]]
+
+    def geocode(self, query: str) -> Optional[Place]:
+        hits = self.search(query, limit=1)
+        return hits[0] if hits else None
+
+    def place(self, i: int) -> Place:
+        return self._names[i].decode(), float(self._lat[i]), float(self._lon[i])
+
+
+class _IndexFile:
+    """The Gazetteer mapped from one path, remapped whenever the file's mtime changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._index: Optional[Gazetteer] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[Gazetteer]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            mtime = None
+        with self._lock:
+            if mtime != self._mtime:
+                self._mtime, self._index = mtime, None
+                if mtime is not None:
+                    try:
+                        self._index = Gazetteer(self.path)
+                    except (OSError, ValueError):
+                        pass
+            return self._index
+
+
+_indexes: PathRegistry[_IndexFile] = PathRegistry(_IndexFile)
+
+
+def gazetteer(path: str = GAZETTEER_PATH) -> Optional[Gazetteer]:
+    """The mapped index at `path`, or None when there is no usable index there.
+
+    The file is stat'ed on every call, so an index built (or rebuilt) while the
+    app is running is picked up without a restart; a missing file is not cached.
+    """
+    return _indexes.get(path).get()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m geocoding.gazetteer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="build the index from a CSV/TSV gazetteer")
+    p.add_argument("source", help="CSV or TSV file (optionally .gz) with name/display_name, lat, lon[, importance]")
+    p.add_argument("--out", default=GAZETTEER_PATH, help="index file (default: %(default)s)")
+    p = sub.add_parser("query", help="look up an address in a built index")
+    p.add_argument("query")
+    p.add_argument("--index", default=GAZETTEER_PATH, help="index file (default: %(default)s)")
+    p.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        tmp = args.out + ".tmp"
+        n = build(read_places(args.source), tmp)
+        os.replace(tmp, args.out)
+        print(f"{args.out}: {n} places, {os.path.getsize(args.out) / 1e6:.1f} MB")
+    elif args.command == "query":
+        index = Gazetteer(args.index)
+        started = time.perf_counter()
+        hits = index.search(args.query, args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+        for name, lat, lon in hits:
+            print(f"{lat:.6f},{lon:.6f}  {name}")
+        print(f"{len(hits)} result(s) in {elapsed:.2f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,175 @@
+import json
 import math
-import requests
-from typing import List, Tuple, Optional
-from config.constants import AVERAGE_SPEED_KMH, USER_AGENT, OSRM_URL
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Tuple, Optional, Union
+
+import numpy as np
+
+from config.constants import (
+    AVERAGE_SPEED_KMH, GEOCODER_BACKEND, NOMINATIM_URL, OSRM_URL,
+    GEOCODE_CACHE_TTL_S, GEOCODE_CACHE_MEMORY, GEOCODE_CACHE_MAX_ROWS,
+    GEOCODE_WORKERS, ROUTE_SNAP_M, ROUTE_CACHE_TTL_S, ROUTE_CACHE_STALE_S, ROUTE_CACHE_MEMORY_BYTES, ROUTE_CACHE_MAX_ROWS,
+    ROUTE_SIMPLIFY_M, ROUTER_BACKEND,
+)
+from geocoding import polyline
+from geocoding.cache import PersistentCache, normalize_query
+from geocoding.gazetteer import gazetteer
+from geocoding.roadgraph import road_graph
+from geocoding.http import NOMINATIM, OSRM
+from geocoding.simplify import douglas_peucker
+
+Route = Tuple[float, float, List[Tuple[float, float]]]
+
+_cache_lock = threading.Lock()
+_geocode_cache: Optional[PersistentCache] = None
+_route_cache: Optional[PersistentCache] = None
+_revalidating = set()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def executor() -> ThreadPoolExecutor:
+    global _executor
+    with _cache_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=GEOCODE_WORKERS, thread_name_prefix="geo")
+        return _executor
+
+
+def geocode_cache() -> PersistentCache:
+    global _geocode_cache
+    with _cache_lock:
+        if _geocode_cache is None:
+            _geocode_cache = PersistentCache(
+                "geocode_cache",
+                ttl=GEOCODE_CACHE_TTL_S,
+                max_memory=GEOCODE_CACHE_MEMORY,
+                max_rows=GEOCODE_CACHE_MAX_ROWS,
+                encode=json.dumps,
+                decode=lambda s: tuple(json.loads(s)),
+            )
+        return _geocode_cache
+
+
+def _encode_route(route: Route) -> bytes:
+    km, minutes, coords = route
+    return struct.pack("<dd", km, minutes) + polyline.encode(coords).encode("ascii")
+
+
+def _decode_route(blob: bytes) -> Route:
+    km, minutes = struct.unpack_from("<dd", blob)
+    return km, minutes, polyline.decode(bytes(blob[16:]).decode("ascii"))
+
+
+def _route_nbytes(route: Route) -> int:
+    # A decoded point is a list slot, a 2-tuple and two floats: 8 + 56 + 2 * 24 bytes
+    return 200 + 112 * len(route[2])
+
+
+def route_cache() -> PersistentCache:
+    global _route_cache
+    with _cache_lock:
+        if _route_cache is None:
+            _route_cache = PersistentCache(
+                "route_cache",
+                ttl=ROUTE_CACHE_TTL_S,
+                stale=ROUTE_CACHE_STALE_S,
+                max_memory=ROUTE_CACHE_MAX_ROWS,
+                max_bytes=ROUTE_CACHE_MEMORY_BYTES,
+                sizeof=_route_nbytes,
+                max_rows=ROUTE_CACHE_MAX_ROWS,
+                encode=_encode_route,
+                decode=_decode_route,
+            )
+        return _route_cache
+
+
+def route_key(p1: Tuple[float, float], p2: Tuple[float, float], grid_m: float = ROUTE_SNAP_M) -> str:
+    """Cache key for an OD pair, with both ends snapped to a grid of `grid_m` metres."""
+    step = grid_m / 111_320.0
+    cells = (round(c / step) for c in (p1[0], p1[1], p2[0], p2[1]))
+    return f"{grid_m:g}:" + ":".join(str(c) for c in cells)
+
 
 def geocode(query: str) -> Optional[Tuple[str, float, float]]:
+    key = normalize_query(query)
+    if not key:
+        return None
+    cache = geocode_cache()
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    # The offline index answers in well under a millisecond, so its results are not cached
+    if GEOCODER_BACKEND != "nominatim":
+        index = gazetteer()
+        res = index.geocode(query) if index is not None else None
+        if res is not None or GEOCODER_BACKEND == "local":
+            return res
+    res = _geocode_remote(query)
+    if res is not None:
+        cache.put(key, res)
+    return res
+
+
+def _geocode_remote(query: str) -> Optional[Tuple[str, float, float]]:
+    params = {"q": query, "format": "json", "limit": 1}
+    data = NOMINATIM.get_json(NOMINATIM_URL, params=params)
+    if not data:
+        return None
     try:
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {"q": query, "format": "json", "limit": 1}
-        r = requests.get(url, params=params, headers=USER_AGENT, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        if not data:
-            return None
         item = data[0]
         return item["display_name"], float(item["lat"]), float(item["lon"])
-    except Exception:
+    except (KeyError, IndexError, TypeError, ValueError):
         return None
 
 
-def route_osrm(p1: Tuple[float, float], p2: Tuple[float, float]) -> Optional[Tuple[float, float, List[Tuple[float, float]]]]:
+def route_osrm(p1: Tuple[float, float], p2: Tuple[float, float]) -> Optional[Route]:
+    """OSRM route served from the route cache when possible.
+
+    Entries past their TTL are still returned during the stale window while a
+    background thread fetches a fresh copy.
+    """
+    key = route_key(p1, p2)
+    cache = route_cache()
+    entry = cache.get_entry(key)
+    if entry is not None:
+        route, age = entry
+        if age > cache.ttl:
+            _revalidate_route(key, p1, p2)
+        return route
+    r = _route_osrm_remote(p1, p2)
+    if r is not None:
+        cache.put(key, r)
+    return r
+
+
+def _revalidate_route(key: str, p1: Tuple[float, float], p2: Tuple[float, float]):
+    with _cache_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+
+    def refresh():
+        try:
+            r = _route_osrm_remote(p1, p2)
+            if r is not None:
+                route_cache().put(key, r)
+        finally:
+            with _cache_lock:
+                _revalidating.discard(key)
+
+    executor().submit(refresh)
+
+
+def _route_osrm_remote(p1: Tuple[float, float], p2: Tuple[float, float]) -> Optional[Route]:
+    lat1, lon1 = p1
+    lat2, lon2 = p2
+    url = OSRM_URL.format(lat1=lat1, lon1=lon1, lat2=lat2, lon2=lon2)
+    data = OSRM.get_json(url)
+    if not data:
+        return None
     try:
-        lat1, lon1 = p1
-        lat2, lon2 = p2
-        url = OSRM_URL.format(lat1=lat1, lon1=lon1, lat2=lat2, lon2=lon2)
-        r = requests.get(url, headers=USER_AGENT, timeout=10)
-        r.raise_for_status()
-        data = r.json()
         routes = data.get("routes") or []
         if not routes:
             return None
@@ -33,8 +177,8 @@ def route_osrm(p1: Tuple[float, float], p2: Tuple[float, float]) -> Optional[Tup
         km = rt["distance"] / 1000.0
         minutes = rt["duration"] / 60.0
         coords = [(lat, lon) for lon, lat in rt["geometry"]["coordinates"]]
-        return km, minutes, coords
-    except Exception:
+        return km, minutes, douglas_peucker(coords, ROUTE_SIMPLIFY_M)
+    except (AttributeError, KeyError, TypeError, ValueError):
         return None
 
 
@@ -50,6 +194,50 @@ def haversine_km(p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
     return R * c
 
 
+def _latlon(points) -> np.ndarray:
+    """(n, 2) float64 view of lat/lon pairs given as a sequence, array or flat float buffer."""
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def _haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    # The formula of haversine_km over arrays; NumPy's sin/arctan2 and the squaring
+    # by product can differ from libm in the last ulp, so results agree to ~1e-15.
+    R = 6371.0
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(lat2 - lat1)
+    dlmb = np.radians(lon2 - lon1)
+    s_phi, s_lmb = np.sin(dphi / 2), np.sin(dlmb / 2)
+    a = s_phi * s_phi + np.cos(phi1) * np.cos(phi2) * s_lmb * s_lmb
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return R * c
+
+
+def haversine_pairs(a, b) -> np.ndarray:
+    """Element-wise km between the i-th points of `a` and `b`."""
+    a, b = _latlon(a), _latlon(b)
+    return _haversine(a[:, 0], a[:, 1], b[:, 0], b[:, 1])
+
+
+def haversine_to_many(p: Tuple[float, float], points) -> np.ndarray:
+    """km from `p` to every point of `points`."""
+    q = _latlon(points)
+    return _haversine(float(p[0]), float(p[1]), q[:, 0], q[:, 1])
+
+
+def haversine_matrix(a, b) -> np.ndarray:
+    """(len(a), len(b)) matrix of km between every point of `a` and every point of `b`."""
+    a, b = _latlon(a), _latlon(b)
+    return _haversine(a[:, 0, None], a[:, 1, None], b[None, :, 0], b[None, :, 1])
+
+
+def path_length_km(coords) -> float:
+    """Length of a polyline of lat/lon points, e.g. a stored ride track."""
+    c = _latlon(coords)
+    if len(c) < 2:
+        return 0.0
+    return float(_haversine(c[:-1, 0], c[:-1, 1], c[1:, 0], c[1:, 1]).sum())
+
+
 def interpolate_line(a: Tuple[float, float], b: Tuple[float, float], steps: int = 50) -> List[Tuple[float, float]]:
     lat1, lon1 = a
     lat2, lon2 = b
@@ -61,13 +249,41 @@ def interpolate_line(a: Tuple[float, float], b: Tuple[float, float], steps: int
 
 
 def estimate_route(p1: Tuple[float, float], p2: Tuple[float, float]):
-    r = route_osrm(p1, p2)
+    # route_osrm still answers from cache while the OSRM breaker is open; the
+    # remote call itself returns immediately in that state.
+    # The simplified geometry is stored as is: track_idx measures distance along
+    # it (utils.helper.track_position), so uneven vertices do not change the speed.
+    r = route_osrm(p1, p2) if ROUTER_BACKEND != "local" else None
     if r:
         return r
+    if ROUTER_BACKEND != "osrm":
+        graph = road_graph()
+        r = graph.route(p1, p2) if graph is not None else None
+    if r:
+        km, minutes, coords = r
+        return km, minutes, douglas_peucker(coords, ROUTE_SIMPLIFY_M)
     km = haversine_km(p1, p2)
     minutes = max(5.0, (km / max(5.0, AVERAGE_SPEED_KMH)) * 60.0)
     coords = interpolate_line(p1, p2, 50)
     return km, minutes, coords
 
 
+def geocode_many(queries: Iterable[str]) -> List[Optional[Tuple[str, float, float]]]:
+    """Geocode several addresses concurrently; results keep the input order."""
+    futures = [executor().submit(geocode, q) for q in queries]
+    return [f.result() for f in futures]
+
+
+def geocode_and_route(pickup: Union[str, Tuple[str, float, float]], dropoff: Union[str, Tuple[str, float, float]]):
+    """Resolve both addresses in parallel, then route between them.
 
+    Either end may already be a (name, lat, lon) place, e.g. a picked
+    autocomplete suggestion; only text is geocoded. Returns (pickup_geo,
+    dropoff_geo, (km, minutes, coords)); the route is None when either address
+    could not be geocoded.
+    """
+    found = iter(geocode_many([q for q in (pickup, dropoff) if isinstance(q, str)]))
+    gp, gd = (next(found) if isinstance(q, str) else q for q in (pickup, dropoff))
+    if not gp or not gd:
+        return gp, gd, None
+    return gp, gd, estimate_route((gp[1], gp[2]), (gd[1], gd[2]))
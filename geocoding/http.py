@@ -0,0 +1,156 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.constants import (
+    BREAKER_FAILURES, BREAKER_RESET_S, HTTP_POOL_SIZE, NOMINATIM_DEADLINE_S, NOMINATIM_RETRIES,
+    NOMINATIM_TIMEOUT, OSRM_DEADLINE_S, OSRM_RETRIES, OSRM_TIMEOUT, RETRY_BACKOFF_S, USER_AGENT,
+)
+
+log = logging.getLogger(__name__)
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+
+def session() -> requests.Session:
+    """Process-wide keep-alive session shared by the geocoding and routing calls."""
+    global _session
+    with _lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            s.headers.update(USER_AGENT)
+            _session = s
+        return _session
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive errors and lets one probe through every `reset_after` seconds."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_after: float = BREAKER_RESET_S):
+        self.failures = failures
+        self.reset_after = reset_after
+        self._errors = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None and time.monotonic() - self._opened_at < self.reset_after
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._errors = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._errors += 1
+            if self._probing or self._errors >= self.failures:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class Endpoint:
+    """One upstream service: its own timeouts, retry budget, per-call deadline and circuit breaker."""
+
+    def __init__(self, name: str, timeout: Tuple[float, float], retries: int, deadline: float,
+                 backoff: float = RETRY_BACKOFF_S, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.deadline = deadline
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+
+    @property
+    def healthy(self) -> bool:
+        return not self.breaker.is_open
+
+    def get_json(self, url: str, params: Optional[dict] = None) -> Optional[Any]:
+        """GET `url` and decode JSON; None when the call fails or the breaker is open.
+
+        Attempts and the sleeps between them share `deadline` seconds: each
+        attempt's timeouts are cut to the time left, and a retry whose backoff
+        would run past the deadline is not made. requests applies the read
+        timeout per socket read, so a server trickling bytes can still overrun
+        it by up to one read timeout.
+
+        Every call that gets past the breaker ends in exactly one record_success
+        or record_failure, even if something unexpected is raised, so a
+        half-open probe can never leave the breaker stuck.
+        """
+        if not self.breaker.allow():
+            return None
+        give_up_at = time.monotonic() + self.deadline
+        recorded = False
+        try:
+            for attempt in range(self.retries + 1):
+                delay = self.backoff * (2 ** attempt)
+                wait = 0.0
+                left = give_up_at - time.monotonic()
+                try:
+                    if left <= 0:
+                        raise requests.Timeout(f"{self.name} deadline of {self.deadline:g}s exceeded")
+                    timeout = (min(self.timeout[0], left), min(self.timeout[1], left))
+                    r = session().get(url, params=params, timeout=timeout)
+                    if r.status_code in RETRY_STATUS:
+                        retry_after = r.headers.get("Retry-After", "")
+                        if retry_after.isdigit():
+                            wait = min(float(retry_after), 5.0)
+                        raise requests.HTTPError(f"{r.status_code} from {self.name}", response=r)
+                    r.raise_for_status()
+                except requests.RequestException as e:
+                    status = getattr(e.response, "status_code", None)
+                    if status is not None and status not in RETRY_STATUS:
+                        # The request itself is bad; the upstream is fine
+                        self.breaker.record_success()
+                        recorded = True
+                        log.warning("%s rejected request: %s", self.name, e)
+                        return None
+                    # Jittered backoff, but never sooner than the server's Retry-After
+                    pause = max(random.uniform(0, delay), wait)
+                    if attempt == self.retries or time.monotonic() + pause >= give_up_at:
+                        self.breaker.record_failure()
+                        recorded = True
+                        log.warning("%s unavailable after %d attempts: %s", self.name, attempt + 1, e)
+                        return None
+                    time.sleep(pause)
+                    continue
+                self.breaker.record_success()
+                recorded = True
+                try:
+                    return r.json()
+                except ValueError as e:
+                    log.warning("%s returned invalid JSON: %s", self.name, e)
+                    return None
+            return None
+        finally:
+            if not recorded:
+                self.breaker.record_failure()
+
+
+NOMINATIM = Endpoint("nominatim", NOMINATIM_TIMEOUT, NOMINATIM_RETRIES, NOMINATIM_DEADLINE_S)
+OSRM = Endpoint("osrm", OSRM_TIMEOUT, OSRM_RETRIES, OSRM_DEADLINE_S)
@@ -0,0 +1,41 @@
+from typing import List, Sequence, Tuple
+
+
+def encode(coords: Sequence[Sequence[float]], precision: int = 5) -> str:
+    """Encode (lat, lon) pairs with the Google encoded polyline algorithm."""
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lon = 0
+    for lat, lon in coords:
+        ilat, ilon = int(round(lat * factor)), int(round(lon * factor))
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            v = ~(delta << 1) if delta < 0 else delta << 1
+            while v >= 0x20:
+                out.append(chr((0x20 | (v & 0x1F)) + 63))
+                v >>= 5
+            out.append(chr(v + 63))
+        prev_lat, prev_lon = ilat, ilon
+    return "".join(out)
+
+
+def decode(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    factor = float(10 ** precision)
+    coords = []
+    i = lat = lon = 0
+    n = len(encoded)
+    while i < n:
+        vals = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[i]) - 63
+                i += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            vals.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += vals[0]
+        lon += vals[1]
+        coords.append((lat / factor, lon / factor))
+    return coords
@@ -0,0 +1,529 @@
+"""Local router over a preprocessed road graph.
+
+    python -m geocoding.roadgraph build city.osm [--out roads.graph]
+    python -m geocoding.roadgraph route 24.86,67.00 24.92,67.10 [--graph roads.graph]
+
+The build reads an OSM XML extract (.osm, optionally .gz/.bz2), keeps the
+drivable ways, collapses the nodes between junctions into edge geometry and
+contracts the graph into a hierarchy stored as CSR adjacency arrays. Queries
+run a bidirectional search over the memory-mapped file.
+"""
+import argparse
+import bz2
+import gzip
+import heapq
+import math
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.constants import AVERAGE_SPEED_KMH, ROAD_GRAPH_PATH, ROUTER_MAX_SNAP_M
+from geocoding.binfile import SectionFile, write_sections
+from geocoding.simplify import M_PER_DEG, segment_lengths_m
+from services.worker import PathRegistry
+
+Route = Tuple[float, float, List[Tuple[float, float]]]
+
+KIND = "roadgraph"
+# Witness searches during contraction settle at most this many nodes; a lower limit
+# builds faster but adds shortcuts that a longer search would have ruled out
+WITNESS_SETTLE_LIMIT = 60
+# Side of the grid buckets nearest() searches the nodes in
+NODE_CELL_M = 250.0
+# Rings nearest() walks before it falls back to scoring every node
+NODE_RINGS = 8
+
+# Free-flow speed per OSM highway class when a way has no usable maxspeed (km/h)
+HIGHWAY_KMH = {
+    "motorway": 90, "trunk": 70, "primary": 50, "secondary": 40, "tertiary": 35,
+    "unclassified": 30, "residential": 25, "road": 30, "service": 15, "living_street": 10,
+}
+
+
+def _speed_kmh(tags: Dict[str, str]) -> Optional[float]:
+    highway = tags.get("highway", "")
+    base = HIGHWAY_KMH.get(highway.removesuffix("_link"))
+    if base is None or tags.get("area") == "yes" or tags.get("access") in ("no", "private"):
+        return None
+    raw = tags.get("maxspeed", "").strip().lower()
+    try:
+        if raw.endswith("mph"):
+            return float(raw[:-3]) * 1.609344
+        return float(raw.removesuffix("km/h").strip())
+    except ValueError:
+        return float(base)
+
+
+def _direction(tags: Dict[str, str]) -> int:
+    """1 if the way is one-way along its nodes, -1 if against them, 0 if two-way."""
+    oneway = tags.get("oneway", "").lower()
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway == "-1":
+        return -1
+    if oneway == "no":
+        return 0
+    return 1 if tags.get("highway") == "motorway" or tags.get("junction") in ("roundabout", "circular") else 0
+
+
+def read_osm(path: str) -> Tuple[Dict[int, Tuple[float, float]], List[Tuple[List[int], float, int]]]:
+    """Node coordinates and drivable ways (node ids, km/h, direction) of an OSM XML extract."""
+    opener = gzip.open if path.endswith(".gz") else bz2.open if path.endswith(".bz2") else open
+    nodes: Dict[int, Tuple[float, float]] = {}
+    ways: List[Tuple[List[int], float, int]] = []
+    with opener(path, "rb") as f:
+        for _, el in ET.iterparse(f, events=("end",)):
+            if el.tag == "node":
+                nodes[int(el.get("id"))] = (float(el.get("lat")), float(el.get("lon")))
+            elif el.tag == "way":
+                tags = {t.get("k"): t.get("v") for t in el.iter("tag")}
+                kmh = _speed_kmh(tags)
+                if kmh:
+                    ways.append(([int(nd.get("ref")) for nd in el.iter("nd")], kmh, _direction(tags)))
+            else:
+                continue
+            el.clear()
+    return nodes, ways
+
+
+def _dijkstra(indptr: Sequence[int], adj: Sequence[int], cost: Sequence[float], source: int) -> List[float]:
+    dist = [math.inf] * (len(indptr) - 1)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for e in range(indptr[u], indptr[u + 1]):
+            v = adj[e]
+            nd = d + cost[e]
+            if nd < dist[v]:
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def _csr(n: int, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(indptr, order) of the edges grouped by `src`; `order` sorts edge arrays into CSR order."""
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, order
+
+
+def build(nodes: Dict[int, Tuple[float, float]], ways: List[Tuple[List[int], float, int]], out: str) -> Tuple[int, int]:
+    """Write the routing graph for `ways` to `out`; returns (nodes, edges).
+
+    Only junctions and way ends become graph nodes. The graph is cut down to
+    the strongly connected component around the centre of the extract, so
+    every snapped pair of points has a route.
+    """
+    ways = [([r for r in refs if r in nodes], kmh, direction) for refs, kmh, direction in ways]
+    uses = Counter(r for refs, _, _ in ways for r in refs)
+    for refs, _, _ in ways:
+        if refs:
+            uses[refs[0]] += 1
+            uses[refs[-1]] += 1
+    ids: Dict[int, int] = {}
+    edges = []  # (from, to, metres, seconds, interior points)
+    for refs, kmh, direction in ways:
+        start = 0
+        for k in range(1, len(refs)):
+            if uses[refs[k]] < 2 and k < len(refs) - 1:
+                continue
+            chain = refs[start:k + 1]
+            start = k
+            if chain[0] == chain[-1]:
+                continue
+            coords = np.array([nodes[r] for r in chain], dtype=np.float64)
+            metres = float(segment_lengths_m(coords).sum())
+            seconds = metres / (kmh / 3.6)
+            a, b = (ids.setdefault(r, len(ids)) for r in (chain[0], chain[-1]))
+            if direction >= 0:
+                edges.append((a, b, metres, seconds, coords[1:-1]))
+            if direction <= 0:
+                edges.append((b, a, metres, seconds, coords[-2:0:-1]))
+    if not edges:
+        raise ValueError("no drivable ways in the extract")
+    coords = np.array([nodes[r] for r in ids], dtype=np.float64)
+    src = np.array([e[0] for e in edges], dtype=np.int64)
+    dst = np.array([e[1] for e in edges], dtype=np.int64)
+    cost = np.array([e[3] for e in edges], dtype=np.float64)
+
+    # Strongly connected component of the node nearest the centre
+    n = len(coords)
+    centre = int(np.argmin(np.hypot(*(coords - coords.mean(axis=0)).T)))
+    fwd_ptr, fwd = _csr(n, src, dst)
+    bwd_ptr, bwd = _csr(n, dst, src)
+    reach_from = np.isfinite(_dijkstra(fwd_ptr.tolist(), dst[fwd].tolist(), cost[fwd].tolist(), centre))
+    reach_to = np.isfinite(_dijkstra(bwd_ptr.tolist(), src[bwd].tolist(), cost[bwd].tolist(), centre))
+    keep_node = reach_from & reach_to
+    renumber = np.cumsum(keep_node) - 1
+    keep_edge = np.flatnonzero(keep_node[src] & keep_node[dst])
+    coords = coords[keep_node]
+    n = len(coords)
+    src, dst = renumber[src[keep_edge]], renumber[dst[keep_edge]]
+    _, order = _csr(n, src, dst)
+    kept = [edges[i] for i in keep_edge[order]]
+    src, dst = src[order], dst[order]
+    geo_off = np.zeros(len(kept) + 1, dtype=np.int64)
+    np.cumsum([len(e[4]) for e in kept], out=geo_off[1:])
+    geo = np.concatenate([e[4] for e in kept] + [np.empty((0, 2))]).astype(np.float64)
+    metres = np.array([e[2] for e in kept], dtype=np.float32)
+    # The hierarchy is built from the same float32 costs that are stored
+    seconds = np.array([e[3] for e in kept], dtype=np.float32).astype(np.float64)
+
+    hierarchy = _contract(n, src.tolist(), dst.tolist(), seconds.tolist())
+
+    write_sections(
+        out, KIND,
+        {
+            "lat": coords[:, 0].copy(), "lon": coords[:, 1].copy(),
+            "src": src.astype(np.uint32), "dst": dst.astype(np.uint32), "metres": metres, "seconds": seconds.astype(np.float32),
+            "geo_off": geo_off.astype(np.uint32), "geo": geo,
+            **hierarchy,
+        },
+        nodes=n, edges=len(kept), shortcuts=int((hierarchy["up_mid"] >= 0).sum() + (hierarchy["down_mid"] >= 0).sum()),
+    )
+    return n, len(kept)
+
+
+def _contract(n: int, src: List[int], dst: List[int], cost: List[float]) -> Dict[str, np.ndarray]:
+    """Contraction hierarchy over the edges, as CSR arrays.
+
+    Nodes are contracted cheapest first (edge difference plus contracted
+    neighbours, updated lazily). Contracting v adds a shortcut u->x via v
+    unless a bounded witness search finds a path at least as fast around v.
+    Every edge is stored once, at its lower-ranked end: "up" lists the edges
+    leaving a node towards higher ranks, "down" the edges arriving from them.
+    A shortcut keeps its middle node; an original edge keeps its edge id.
+    """
+    out_adj: List[Dict[int, float]] = [{} for _ in range(n)]
+    in_adj: List[Dict[int, float]] = [{} for _ in range(n)]
+    data: Dict[Tuple[int, int], Tuple[float, int, int]] = {}  # (u, x) -> (seconds, middle node or -1, edge id or -1)
+    for e, (u, x, c) in enumerate(zip(src, dst, cost)):
+        if u != x and ((u, x) not in data or c < data[(u, x)][0]):
+            data[(u, x)] = (c, -1, e)
+            out_adj[u][x] = in_adj[x][u] = c
+
+    def witness(u: int, skip: int, limit: float) -> Dict[int, float]:
+        dist = {u: 0.0}
+        heap = [(0.0, u)]
+        settled = 0
+        while heap and settled < WITNESS_SETTLE_LIMIT:
+            d, y = heapq.heappop(heap)
+            if d > limit:
+                break
+            if d > dist[y]:
+                continue
+            settled += 1
+            for z, c in out_adj[y].items():
+                nd = d + c
+                if z != skip and nd < dist.get(z, math.inf):
+                    dist[z] = nd
+                    heapq.heappush(heap, (nd, z))
+        return dist
+
+    def shortcuts(v: int) -> List[Tuple[int, int, float]]:
+        found = []
+        for u, cu in in_adj[v].items():
+            targets = [(x, cu + cx) for x, cx in out_adj[v].items() if x != u]
+            if not targets:
+                continue
+            dist = witness(u, v, max(c for _, c in targets))
+            found.extend((u, x, c) for x, c in targets if dist.get(x, math.inf) > c)
+        return found
+
+    deleted = [0] * n
+
+    def priority(v: int) -> Tuple[int, List[Tuple[int, int, float]]]:
+        found = shortcuts(v)
+        return len(found) - len(in_adj[v]) - len(out_adj[v]) + deleted[v], found
+
+    up: List[List[Tuple[int, float, int, int]]] = [[] for _ in range(n)]
+    down: List[List[Tuple[int, float, int, int]]] = [[] for _ in range(n)]
+    queue = [(priority(v)[0], v) for v in range(n)]
+    heapq.heapify(queue)
+    while queue:
+        _, v = heapq.heappop(queue)
+        prio, found = priority(v)
+        if queue and prio > queue[0][0]:
+            heapq.heappush(queue, (prio, v))
+            continue
+        up[v] = [(x, *data[(v, x)]) for x in out_adj[v]]
+        down[v] = [(u, *data[(u, v)]) for u in in_adj[v]]
+        for x in out_adj[v]:
+            del in_adj[x][v]
+            deleted[x] += 1
+        for u in in_adj[v]:
+            del out_adj[u][v]
+            deleted[u] += 1
+        out_adj[v], in_adj[v] = {}, {}
+        for u, x, c in found:
+            if c < out_adj[u].get(x, math.inf):
+                out_adj[u][x] = in_adj[x][u] = c
+                data[(u, x)] = (c, v, -1)
+
+    arrays = {}
+    for name, lists in (("up", up), ("down", down)):
+        ptr = np.zeros(n + 1, dtype=np.uint32)
+        np.cumsum([len(entries) for entries in lists], out=ptr[1:])
+        flat = [entry for entries in lists for entry in entries]
+        arrays[f"{name}_ptr"] = ptr
+        arrays[f"{name}_node"] = np.array([f[0] for f in flat], dtype=np.uint32)
+        arrays[f"{name}_cost"] = np.array([f[1] for f in flat], dtype=np.float32)
+        arrays[f"{name}_mid"] = np.array([f[2] for f in flat], dtype=np.int32)
+        arrays[f"{name}_edge"] = np.array([f[3] for f in flat], dtype=np.int32)
+    return arrays
+
+
+class RoadGraph:
+    """Memory-mapped routing graph; `route` answers like route_osrm."""
+
+    def __init__(self, path: str):
+        self.path = path
+        f = SectionFile(path, KIND)
+        self.meta = f.meta
+        self._lat = f.array("lat")
+        self._lon = f.array("lon")
+        self._dst = f.array("dst")
+        self._geo_off = f.array("geo_off")
+        self._geo = f.array("geo")
+        self._metres = f.array("metres")
+        self._seconds = f.array("seconds")
+        # The search loop indexes these element by element; memoryviews hand back plain Python numbers
+        self._up = tuple(f.bytes(f"up_{a}").cast(t) for a, t in (("ptr", "I"), ("node", "I"), ("cost", "f"), ("mid", "i"), ("edge", "i")))
+        self._down = tuple(f.bytes(f"down_{a}").cast(t) for a, t in (("ptr", "I"), ("node", "I"), ("cost", "f"), ("mid", "i"), ("edge", "i")))
+        # Grid buckets for nearest(): node ids sorted by the row-major key of their cell
+        self._cell_deg = NODE_CELL_M / M_PER_DEG
+        self._lon_scale = math.cos(math.radians(float(self._lat.mean())))
+        ci = np.floor(self._lat / self._cell_deg).astype(np.int64)
+        cj = np.floor(self._lon * self._lon_scale / self._cell_deg).astype(np.int64)
+        self._bounds = (int(ci.min()), int(ci.max()), int(cj.min()), int(cj.max()))
+        self._width = self._bounds[3] - self._bounds[2] + 1
+        keys = (ci - self._bounds[0]) * self._width + (cj - self._bounds[2])
+        self._by_cell = np.argsort(keys, kind="stable")
+        self._cell_keys = keys[self._by_cell]
+
+    def __len__(self) -> int:
+        return len(self._lat)
+
+    def _ring(self, ci: int, cj: int, r: int) -> np.ndarray:
+        """Nodes in the cells at Chebyshev distance `r` from (ci, cj), clipped to the grid."""
+        i0, i1, j0, j1 = self._bounds
+        spans = []
+        for i in range(max(ci - r, i0), min(ci + r, i1) + 1):
+            base = (i - i0) * self._width - j0
+            if abs(i - ci) == r:
+                # A whole row of the ring is one run of consecutive keys
+                lo, hi = max(cj - r, j0), min(cj + r, j1)
+                if lo <= hi:
+                    spans.append((base + lo, base + hi))
+            else:
+                spans.extend((base + j, base + j) for j in (cj - r, cj + r) if j0 <= j <= j1)
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        keys = np.array(spans, dtype=np.int64)
+        lo = np.searchsorted(self._cell_keys, keys[:, 0], "left")
+        hi = np.searchsorted(self._cell_keys, keys[:, 1], "right")
+        return np.concatenate([self._by_cell[a:b] for a, b in zip(lo.tolist(), hi.tolist())])
+
+    def nearest(self, p: Tuple[float, float], max_m: Optional[float] = None) -> Optional[Tuple[int, float]]:
+        """(node, metres) of the graph node closest to `p`, or None if there is none within `max_m`.
+
+        Scans rings of grid cells outwards from the cell of `p`, starting at the
+        edge of the grid, and stops once no unvisited cell can hold a closer node.
+        """
+        scale = math.cos(math.radians(p[0]))
+        i0, i1, j0, j1 = self._bounds
+        ci = math.floor(p[0] / self._cell_deg)
+        cj = math.floor(p[1] * self._lon_scale / self._cell_deg)
+        last_ring = max(abs(ci - i0), abs(ci - i1), abs(cj - j0), abs(cj - j1))
+        # Metres a ring step spans at least: a cell is cell_deg of latitude by cell_deg / lon_scale of longitude
+        step_m = 0.99 * NODE_CELL_M * min(1.0, scale / self._lon_scale)
+        best, best_d2 = -1, math.inf
+        first = r = max(i0 - ci, ci - i1, j0 - cj, cj - j1, 0)
+        while r <= last_ring:
+            if max_m is not None and (r - 1) * step_m > max_m:
+                break
+            if r - first >= NODE_RINGS:
+                # Nothing close by: one vectorized pass over every node beats walking more rings
+                idx = np.arange(len(self._lat))
+                r = last_ring
+            else:
+                idx = self._ring(ci, cj, r)
+            if len(idx):
+                d2 = (self._lat[idx] - p[0]) ** 2 + ((self._lon[idx] - p[1]) * scale) ** 2
+                k = int(np.argmin(d2))
+                if d2[k] < best_d2 or (d2[k] == best_d2 and idx[k] < best):
+                    best, best_d2 = int(idx[k]), float(d2[k])
+            # Anything outside rings 0..r is at least r cells away
+            if math.sqrt(best_d2) * M_PER_DEG <= r * step_m:
+                break
+            r += 1
+        if best < 0:
+            return None
+        metres = math.sqrt(best_d2) * M_PER_DEG
+        return None if max_m is not None and metres > max_m else (best, metres)
+
+    def _find(self, side: tuple, v: int, node: int) -> int:
+        ptr, nodes = side[0], side[1]
+        for k in range(ptr[v], ptr[v + 1]):
+            if nodes[k] == node:
+                return k
+        raise ValueError(f"{self.path}: broken hierarchy at node {v}")
+
+    def _unpack(self, u: int, x: int, mid: int, edge: int, out: List[int]):
+        """Append the original edge ids of hierarchy edge u->x (a shortcut via `mid`, or `edge` itself)."""
+        stack = [(u, x, mid, edge)]
+        while stack:
+            u, x, mid, edge = stack.pop()
+            if mid < 0:
+                out.append(edge)
+                continue
+            # u->mid arrived at mid from above, mid->x leaves it upwards
+            a = self._find(self._down, mid, u)
+            b = self._find(self._up, mid, x)
+            stack.append((mid, x, self._up[3][b], self._up[4][b]))
+            stack.append((u, mid, self._down[3][a], self._down[4][a]))
+
+    def shortest_path(self, s: int, t: int) -> Optional[List[int]]:
+        """Edge ids of the fastest path from node `s` to node `t`, or None if there is none.
+
+        Bidirectional Dijkstra that only climbs the hierarchy: forwards from `s`
+        along up edges, backwards from `t` along down edges. A side stops once
+        its queue cannot beat the best meeting point.
+        """
+        if s == t:
+            return []
+        sides = (self._up, self._down)
+        dist: Tuple[Dict[int, float], Dict[int, float]] = ({s: 0.0}, {t: 0.0})
+        parent: Tuple[Dict[int, Tuple[int, int]], Dict[int, Tuple[int, int]]] = ({}, {})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        best, meet = math.inf, -1
+        while True:
+            front = heaps[0][0][0] if heaps[0] else math.inf
+            back = heaps[1][0][0] if heaps[1] else math.inf
+            if min(front, back) >= best:
+                break
+            k = 0 if front <= back else 1
+            d, u = heapq.heappop(heaps[k])
+            if d > dist[k][u]:
+                continue
+            other = dist[1 - k].get(u)
+            if other is not None and d + other < best:
+                best, meet = d + other, u
+            mine = dist[k]
+            # Stall on demand: u is not expanded when a higher node already reaches it faster
+            ptr, nodes, cost = sides[1 - k][0], sides[1 - k][1], sides[1 - k][2]
+            for e in range(ptr[u], ptr[u + 1]):
+                if mine.get(nodes[e], math.inf) + cost[e] < d:
+                    break
+            else:
+                ptr, nodes, cost = sides[k][0], sides[k][1], sides[k][2]
+                for e in range(ptr[u], ptr[u + 1]):
+                    v = nodes[e]
+                    nd = d + cost[e]
+                    if nd < mine.get(v, math.inf):
+                        mine[v] = nd
+                        parent[k][v] = (u, e)
+                        heapq.heappush(heaps[k], (nd, v))
+        if meet < 0:
+            return None
+        hops = []
+        v = meet
+        while v != s:
+            u, e = parent[0][v]
+            hops.append((u, v, self._up[3][e], self._up[4][e]))
+            v = u
+        hops.reverse()
+        v = meet
+        while v != t:
+            x, e = parent[1][v]
+            hops.append((v, x, self._down[3][e], self._down[4][e]))
+            v = x
+        path: List[int] = []
+        for hop in hops:
+            self._unpack(*hop, path)
+        return path
+
+    def route(self, p1: Tuple[float, float], p2: Tuple[float, float]) -> Optional[Route]:
+        """(km, minutes, coords) between two points, or None when either is off the graph.
+
+        The legs from each point to its nearest node are added at AVERAGE_SPEED_KMH.
+        """
+        ends = self.nearest(p1, ROUTER_MAX_SNAP_M), self.nearest(p2, ROUTER_MAX_SNAP_M)
+        if None in ends:
+            return None
+        (s, snap1), (t, snap2) = ends
+        path = self.shortest_path(s, t)
+        if path is None:
+            return None
+        coords = [tuple(p1), (float(self._lat[s]), float(self._lon[s]))]
+        metres, seconds = snap1 + snap2, (snap1 + snap2) / (AVERAGE_SPEED_KMH / 3.6)
+        for e in path:
+            coords.extend(map(tuple, self._geo[self._geo_off[e]:self._geo_off[e + 1]].tolist()))
+            v = self._dst[e]
+            coords.append((float(self._lat[v]), float(self._lon[v])))
+            metres += float(self._metres[e])
+            seconds += float(self._seconds[e])
+        coords.append(tuple(p2))
+        return metres / 1000.0, seconds / 60.0, coords
+
+
+def _load(path: str) -> Optional[RoadGraph]:
+    try:
+        return RoadGraph(path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+_graphs: PathRegistry[Optional[RoadGraph]] = PathRegistry(_load)
+
+
+def road_graph(path: str = ROAD_GRAPH_PATH) -> Optional[RoadGraph]:
+    """The mapped graph at `path`, or None when there is no usable graph there."""
+    return _graphs.get(path)
+
+
+def _point(text: str) -> Tuple[float, float]:
+    lat, lon = text.split(",")
+    return float(lat), float(lon)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m geocoding.roadgraph")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="build the routing graph from an OSM XML extract")
+    p.add_argument("source", help=".osm file, optionally .gz or .bz2")
+    p.add_argument("--out", default=ROAD_GRAPH_PATH, help="graph file (default: %(default)s)")
+    p = sub.add_parser("route", help="route between two lat,lon points on a built graph")
+    p.add_argument("origin", type=_point)
+    p.add_argument("destination", type=_point)
+    p.add_argument("--graph", default=ROAD_GRAPH_PATH, help="graph file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        tmp = args.out + ".tmp"
+        n, m = build(*read_osm(args.source), tmp)
+        os.replace(tmp, args.out)
+        print(f"{args.out}: {n} nodes, {m} edges, {os.path.getsize(args.out) / 1e6:.1f} MB")
+    elif args.command == "route":
+        graph = RoadGraph(args.graph)
+        started = time.perf_counter()
+        r = graph.route(args.origin, args.destination)
+        elapsed = (time.perf_counter() - started) * 1000
+        if r is None:
+            print("no route (a point is off the graph)")
+        else:
+            print(f"{r[0]:.2f} km, {r[1]:.1f} min, {len(r[2])} points")
+        print(f"{elapsed:.2f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import math
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Metres per degree of latitude on the same 6371 km sphere as haversine_km
+M_PER_DEG = 6371000.0 * math.pi / 180.0
+
+
+def _project(c: np.ndarray) -> np.ndarray:
+    """Local equirectangular projection to metres, accurate at city scale."""
+    scale = math.cos(math.radians(float(c[:, 0].mean())))
+    return np.column_stack([c[:, 0] * M_PER_DEG, c[:, 1] * M_PER_DEG * scale])
+
+
+def _as_points(coords: np.ndarray) -> List[Tuple[float, float]]:
+    return [(float(lat), float(lon)) for lat, lon in coords]
+
+
+def douglas_peucker(coords: Sequence[Sequence[float]], tolerance_m: float) -> List[Tuple[float, float]]:
+    """Drop vertices that lie within `tolerance_m` of the simplified line; endpoints are kept."""
+    c = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(c) < 3 or tolerance_m <= 0:
+        return _as_points(c)
+    xy = _project(c)
+    keep = np.zeros(len(c), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(c) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        seg = xy[j] - xy[i]
+        rel = xy[i + 1:j] - xy[i]
+        seg_len = math.hypot(seg[0], seg[1])
+        if seg_len == 0.0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance_m:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+    return _as_points(c[keep])
+
+
+def segment_lengths_m(coords: np.ndarray) -> np.ndarray:
+    """Metres along each segment of an (n, 2) lat/lon array, equirectangular at each segment's mid latitude."""
+    d = np.diff(coords, axis=0)
+    mid_lat = np.radians((coords[1:, 0] + coords[:-1, 0]) / 2)
+    return M_PER_DEG * np.hypot(d[:, 0], d[:, 1] * np.cos(mid_lat))
+
+
+def point_along(coords: Sequence[Sequence[float]], fraction: float) -> Tuple[float, float]:
+    """The point `fraction` (0 to 1) of the way along the line, measured by distance."""
+    c = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(c) < 2:
+        return float(c[0, 0]), float(c[0, 1])
+    dist = np.concatenate([[0.0], np.cumsum(segment_lengths_m(c))])
+    at = min(max(fraction, 0.0), 1.0) * dist[-1]
+    return float(np.interp(at, dist, c[:, 0])), float(np.interp(at, dist, c[:, 1]))
@@ -1,8 +1,12 @@
-
 from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
 
-@dataclass
+
+@dataclass(frozen=True)
 class Vehicle:
+    __slots__ = ("code", "name", "capacity", "base_per_km", "per_min")
     code: str
     name: str
     capacity: int
@@ -15,3 +19,47 @@ VEHICLES = [
     Vehicle("van8", "Van (8 pax)", 8, 80.0, 8.0),
     Vehicle("bus12", "MiniBus (12 pax)", 12, 110.0, 10.0),
 ]
+
+
+class VehicleCatalog:
+    """Immutable snapshot of the vehicles table with O(1) lookups by code and name.
+
+    `version` is the vehicles_version stamp the snapshot was read at. The fare
+    columns hold one entry per vehicle plus a trailing sentinel for unknown codes.
+    """
+
+    __slots__ = ("vehicles", "version", "code_index", "name_index", "base_per_km", "per_min", "capacity")
+
+    def __init__(self, vehicles: Iterable[Vehicle], version: int = 0):
+        vehicles = tuple(vehicles)
+        fields = {
+            "vehicles": vehicles,
+            "version": version,
+            "code_index": {v.code: i for i, v in enumerate(vehicles)},
+            "name_index": {v.name: i for i, v in enumerate(vehicles)},
+            "base_per_km": np.array([v.base_per_km for v in vehicles] + [np.nan]),
+            "per_min": np.array([v.per_min for v in vehicles] + [np.nan]),
+            "capacity": np.array([v.capacity for v in vehicles] + [-np.inf]),
+        }
+        for name, value in fields.items():
+            if isinstance(value, np.ndarray):
+                value.flags.writeable = False
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("VehicleCatalog is immutable")
+
+    def __iter__(self) -> Iterator[Vehicle]:
+        return iter(self.vehicles)
+
+    def __len__(self) -> int:
+        return len(self.vehicles)
+
+    def get(self, code_or_name: str) -> Optional[Vehicle]:
+        i = self.code_index.get(code_or_name)
+        if i is None:
+            i = self.name_index.get(code_or_name)
+        return None if i is None else self.vehicles[i]
+
+    def names(self) -> Tuple[str, ...]:
+        return tuple(v.name for v in self.vehicles)
@@ -1,5 +1,27 @@
+from datetime import date, timedelta
 import streamlit as st
+from config.constants import ROLLUP_INTERVAL_S
 from db.database import DB
+from db.export import driver_ratings_frame, drivers_frame, feedback_frame, rollup_frame, users_frame
+from services.dispatch import driver_index, set_driver_availability
+
+RIDES_PAGE_SIZE = 50
+RIDE_STATUSES = ["Scheduled", "Assigned", "In-Progress", "Completed"]
+RIDES_TABLE_COLUMNS = {
+    "id": "ID", "created_at": "Created", "user_id": "User", "driver_id": "Driver",
+    "pickup_text": "Pickup", "dropoff_text": "Drop", "scheduled_at": "Scheduled", "status": "Status",
+    "vehicle_code": "Vehicle", "fare_tier": "Tier", "pax": "Pax", "est_price": "Price",
+}
+USERS_COLUMNS = {"id": "ID", "name": "Name", "email": "Email"}
+DRIVERS_COLUMNS = {
+    "id": "ID", "name": "Name", "email": "Email", "car": "Car",
+    "is_available": st.column_config.CheckboxColumn("Available"),
+}
+FEEDBACK_COLUMNS = {
+    "id": "ID", "created_at": "When", "user": "User", "driver": "Driver", "ride": "Ride",
+    "rating": st.column_config.NumberColumn("Rating", format="%d ⭐"), "comments": "Comments",
+}
+
 
 def admin_dashboard_page(db: DB):
     import io
@@ -7,64 +29,80 @@ def admin_dashboard_page(db: DB):
     import pandas as pd
 
     st.subheader("Admin Dashboard ")
-    tabs = st.tabs(["Rides", "Users", "Drivers", "Feedback",])
+    tabs = st.tabs(["Rides", "Users", "Drivers", "Feedback", "Trends"])
 
     # Rides tab
 
     with tabs[0]:
         st.markdown("### All Rides")
-        rows = db.list_all_rides()
-        if not rows:
-            st.info("No rides yet.")
+        f1, f2, f3, f4 = st.columns(4)
+        with f1:
+            f_status = st.selectbox("Status", ["All"] + RIDE_STATUSES, key="admin_rides_status")
+        with f2:
+            f_user = st.number_input("User ID", min_value=1, step=1, value=None, key="admin_rides_user")
+        with f3:
+            f_driver = st.number_input("Driver ID", min_value=1, step=1, value=None, key="admin_rides_driver")
+        with f4:
+            f_dates = st.date_input("Created between", value=(), key="admin_rides_dates")
+        filters = {
+            "status": None if f_status == "All" else f_status,
+            "user_id": int(f_user) if f_user else None,
+            "driver_id": int(f_driver) if f_driver else None,
+            "since": f_dates[0].isoformat() if len(f_dates) > 0 else None,
+            "until": (f_dates[-1] + timedelta(days=1)).isoformat() if len(f_dates) > 0 else None,
+        }
+
+        # Keyset cursors of the pages visited so far; a filter change starts over
+        if st.session_state.get("admin_rides_filters") != filters:
+            st.session_state["admin_rides_filters"] = filters
+            st.session_state["admin_rides_cursors"] = [None]
+        cursors = st.session_state["admin_rides_cursors"]
+        page = db.list_rides_page(limit=RIDES_PAGE_SIZE + 1, after=cursors[-1], **filters)
+        has_next = len(page) > RIDES_PAGE_SIZE
+        page = page[:RIDES_PAGE_SIZE]
+
+        if not page:
+            st.info("No rides match." if len(cursors) == 1 else "No more rides.")
         else:
-            rides_table = [
-                {
-                    "ID": r["id"],
-                    "Created": r["created_at"],
-                    "User": r["user_id"],
-                    "Driver": r["driver_id"] or "—",
-                    "Pickup": r["pickup_text"],
-                    "Drop": r["dropoff_text"],
-                    "Scheduled": r["scheduled_at"] or "—",
-                    "Status": r["status"],
-                    "Vehicle": r["vehicle_code"],
-                    "Tier": r["fare_tier"],
-                    "Pax": r["pax"],
-                    "Price": f"Rs {r['est_price']:,.0f}",
-                }
-                for r in rows
-            ]
-            st.dataframe(pd.DataFrame(rides_table), width='stretch')
-
-            st.markdown("---")
-            sel_ride = st.selectbox(
-                "Select ride to manage",
-                [f"#{r['id']} {r['pickup_text']} → {r['dropoff_text']} ({r['status']})" for r in rows],  # Convert rows to a simple list
-                key="admin_sel_ride",
+            st.dataframe(
+                pd.DataFrame.from_records(page, columns=page[0].keys())[list(RIDES_TABLE_COLUMNS)]
+                .astype({"driver_id": "Int64"}).rename(columns=RIDES_TABLE_COLUMNS),
+                hide_index=True, width='stretch',
+                column_config={"Price": st.column_config.NumberColumn(format="Rs %.0f")},
             )
+        p1, p2, p3 = st.columns([1, 1, 4])
+        if p1.button("◀ Newer", disabled=len(cursors) == 1, key="admin_rides_prev"):
+            cursors.pop()
+            st.rerun()
+        if p2.button("Older ▶", disabled=not has_next, key="admin_rides_next"):
+            cursors.append((page[-1]["created_at"], page[-1]["id"]))
+            st.rerun()
+        p3.caption(f"Page {len(cursors)}")
 
-            if sel_ride:
-                selected_ride_id = int(sel_ride.split(' ')[0][1:])
-                sel_ride_full = next(r for r in rows if r["id"] == selected_ride_id)
-                
+        st.markdown("---")
+        ride_id = st.number_input("Ride ID to manage", min_value=1, step=1, value=None, key="admin_ride_id")
+        if ride_id:
+            ride = db.get_ride(int(ride_id))
+            if not ride:
+                st.warning(f"No ride #{int(ride_id)}.")
+            else:
                 st.write("**Ride details**")
-                if st.button(f"Delete Ride #{sel_ride_full['id']}", key=f"admin_delete_ride_{sel_ride_full['id']}"):
-                    db.conn.execute("DELETE FROM rides WHERE id=?", (sel_ride_full["id"],))
-                    db.conn.commit()
+                st.write(f"#{ride['id']} {ride['pickup_text']} → {ride['dropoff_text']} ({ride['status']})")
+                if st.button(f"Delete Ride #{ride['id']}", key=f"admin_delete_ride_{ride['id']}"):
+                    db.delete_ride(ride["id"])
                     st.success("Ride deleted.")
-                    st.experimental_rerun()  
+                    st.rerun()
 
 
     # Users tab
 
     with tabs[1]:
         st.markdown("### Users")
-        users = db.conn.execute("SELECT * FROM users ORDER BY id DESC").fetchall()
-        if not users:
+        users = users_frame(db.conn)
+        if users.empty:
             st.info("No users yet.")
         else:
-            udata = [{"ID": u["id"], "Name": u["name"], "Email": u["email"]} for u in users]
-            st.dataframe(pd.DataFrame(udata), width='stretch')
+            st.dataframe(users, hide_index=True, width='stretch', column_config=USERS_COLUMNS)
 
         st.markdown("#### Add new user")
         with st.form("admin_add_user"):
@@ -79,13 +117,13 @@ def admin_dashboard_page(db: DB):
                 uid = db.create_user(uname or uemail.split("@")[0], uemail, upw)
                 if uid:
                     st.success(f"User '{uemail}' added (id={uid}).")
-                    st.experimental_rerun()  
+                    st.rerun()  
                 else:
                     st.error("Email already registered.")
 
         st.markdown("#### Remove user")
-        if users:
-            user_opts = [f"{u['id']} - {u['name']} ({u['email']})" for u in users]
+        if not users.empty:
+            user_opts = (users["id"].astype("string") + " - " + users["name"].fillna("") + " (" + users["email"].fillna("") + ")").tolist()
             to_del = st.selectbox("Select user to delete", ["—"] + user_opts, key="admin_del_user")
             if st.button("Delete user"):
                 if to_del and to_del != "—":
@@ -93,7 +131,7 @@ def admin_dashboard_page(db: DB):
                     db.conn.execute("DELETE FROM users WHERE id=?", (uid,))
                     db.conn.commit()
                     st.warning("User deleted.")
-                    st.experimental_rerun()  
+                    st.rerun()  
                 else:
                     st.warning("Select a user first.")
 
@@ -101,21 +139,11 @@ def admin_dashboard_page(db: DB):
 
     with tabs[2]:
         st.markdown("### Drivers")
-        drivers = db.conn.execute("SELECT * FROM drivers ORDER BY id DESC").fetchall()
-        if not drivers:
+        drivers = drivers_frame(db.conn)
+        if drivers.empty:
             st.info("No drivers yet.")
         else:
-            ddata = [
-                {
-                    "ID": d["id"],
-                    "Name": d["name"],
-                    "Email": d["email"],
-                    "Car": f"{d['car_make']} {d['car_model']} ({d['car_plate']})",
-                    "Available": bool(d["is_available"]),
-                }
-                for d in drivers
-            ]
-            st.dataframe(pd.DataFrame(ddata), width='stretch')
+            st.dataframe(drivers, hide_index=True, width='stretch', column_config=DRIVERS_COLUMNS)
 
         st.markdown("#### Add new driver")
         with st.form("admin_add_driver"):
@@ -133,13 +161,14 @@ def admin_dashboard_page(db: DB):
                 did = db.create_driver(dname or demail.split("@")[0], demail, dpw, make, model, plate)
                 if did:
                     st.success(f"Driver '{demail}' added (id={did}).")
-                    st.experimental_rerun() 
+                    st.rerun() 
                 else:
                     st.error("Email already registered.")
 
         st.markdown("#### Manage driver availability / delete")
-        if drivers:
-            driver_opts = [f"{d['id']} - {d['name']} ({'available' if d['is_available'] else 'unavailable'})" for d in drivers]
+        if not drivers.empty:
+            availability = drivers["is_available"].map({True: "available", False: "unavailable"}).fillna("unavailable")
+            driver_opts = (drivers["id"].astype("string") + " - " + drivers["name"].fillna("") + " (" + availability + ")").tolist()
             sel = st.selectbox("Select driver", ["—"] + driver_opts, key="admin_manage_driver")
             if sel and sel != "—":
                 did = int(sel.split(" - ")[0])
@@ -147,14 +176,15 @@ def admin_dashboard_page(db: DB):
                 if cur:
                     new_av = st.checkbox("Available", value=bool(cur["is_available"]), key=f"av_{did}")
                     if st.button("Update availability"):
-                        db.set_driver_available(did, bool(new_av))
+                        set_driver_availability(db, did, bool(new_av))
                         st.success("Availability updated.")
-                        st.experimental_rerun()  
+                        st.rerun()  
                     if st.button("Delete driver"):
                         db.conn.execute("DELETE FROM drivers WHERE id=?", (did,))
                         db.conn.commit()
+                        driver_index(db).remove(did)
                         st.warning("Driver deleted.")
-                        st.experimental_rerun() 
+                        st.rerun() 
             else:
                 st.write("Select a driver to manage.")
 
@@ -162,50 +192,69 @@ def admin_dashboard_page(db: DB):
 
     with tabs[3]:
         st.markdown("### Feedback & Ratings")
-        feedback_sql = """
-            SELECT f.id as fid, f.user_id, u.name AS user_name,
-                   f.ride_id, r.pickup_text, r.dropoff_text,
-                   r.driver_id, d.name AS driver_name,
-                   f.rating, f.comments, f.created_at
-            FROM feedback f
-            LEFT JOIN rides r ON f.ride_id = r.id
-            LEFT JOIN drivers d ON r.driver_id = d.id
-            LEFT JOIN users u ON f.user_id = u.id
-            ORDER BY f.created_at DESC
-        """
-        frows = db.conn.execute(feedback_sql).fetchall()
-        if not frows:
+        feedback = feedback_frame(db.conn)
+        if feedback.empty:
             st.info("No feedback yet.")
         else:
-            frecs = []
-            for fr in frows:
-                frecs.append(
-                    {
-                        "ID": fr["fid"],
-                        "When": fr["created_at"],
-                        "User": fr["user_name"] or fr["user_id"],
-                        "Driver": fr["driver_name"] or (fr["driver_id"] or "—"),
-                        "Ride": f"{fr['pickup_text']} → {fr['dropoff_text']}",
-                        "Rating": fr["rating"],
-                        "Comments": fr["comments"],
-                    }
-                )
-            df_feedback = pd.DataFrame(frecs)
-            st.dataframe(df_feedback, width='stretch')
-            avg_sql = """
-                SELECT d.id AS driver_id, d.name AS driver_name, AVG(f.rating) AS avg_rating, COUNT(f.rating) AS count_rating
-                FROM feedback f
-                JOIN rides r ON f.ride_id = r.id
-                JOIN drivers d ON r.driver_id = d.id
-                GROUP BY d.id, d.name
-                ORDER BY avg_rating DESC
-            """
-            avg_rows = db.conn.execute(avg_sql).fetchall()
-            if avg_rows:
-                avg_recs = [{"driver_id": r["driver_id"], "name": r["driver_name"], "avg_rating": float(r["avg_rating"]), "count": r["count_rating"]} for r in avg_rows]
-                df_avg = pd.DataFrame(avg_recs)
+            st.dataframe(feedback, hide_index=True, width='stretch', column_config=FEEDBACK_COLUMNS)
+            ratings = driver_ratings_frame(db.conn)
+            if not ratings.empty:
                 st.markdown("**Average rating per driver**")
-                st.dataframe(df_avg, width='stretch')
-                chart_df = df_avg.set_index("name")[["avg_rating"]]
-                st.bar_chart(chart_df)
+                st.dataframe(
+                    ratings, hide_index=True, width='stretch',
+                    column_config={
+                        "driver_id": "Driver ID", "name": "Name", "count": "Ratings",
+                        "avg_rating": st.column_config.NumberColumn("Avg rating", format="%.2f"),
+                    },
+                )
+                st.bar_chart(ratings.set_index("name")[["avg_rating"]])
 
+    # Trends tab
+
+    with tabs[4]:
+        st.markdown("### Trends")
+        t1, t2 = st.columns([3, 1])
+        with t1:
+            today = date.today()
+            span = st.date_input("Created between", value=(today - timedelta(days=29), today), key="admin_trends_range")
+        with t2:
+            grain = st.radio("Bucket", ["day", "hour"], horizontal=True, key="admin_trends_grain")
+        if len(span) == 2:
+            trends = rollup_frame(db.conn, grain, span[0].isoformat(), (span[1] + timedelta(days=1)).isoformat())
+            if trends.empty:
+                st.info("No rides in this range.")
+            else:
+                trends["bucket"] = pd.to_datetime(trends["bucket"])
+                st.caption(f"Rollups are refreshed every {ROLLUP_INTERVAL_S:.0f}s.")
+
+                st.markdown("**Rides by status**")
+                st.bar_chart(trends.pivot_table(index="bucket", columns="status", values="rides", aggfunc="sum", fill_value=0))
+
+                st.markdown("**Completed revenue (Rs)**")
+                completed = trends[trends["status"] == "Completed"]
+                st.line_chart(completed.groupby("bucket")["price_sum"].sum().rename("Revenue"))
+
+                st.markdown("**Average trip**")
+                per_bucket = trends.groupby("bucket")[["rides", "km_sum", "minutes_sum"]].sum()
+                st.line_chart(pd.DataFrame({
+                    "Avg km": per_bucket["km_sum"] / per_bucket["rides"],
+                    "Avg minutes": per_bucket["minutes_sum"] / per_bucket["rides"],
+                }))
+
+                st.markdown("**By vehicle and tier**")
+                mix = trends.groupby(["vehicle_code", "fare_tier"])[["rides", "price_sum", "km_sum", "minutes_sum"]].sum()
+                revenue = completed.groupby(["vehicle_code", "fare_tier"])["price_sum"].sum()
+                st.dataframe(
+                    pd.DataFrame({
+                        "Rides": mix["rides"],
+                        "Completed revenue": revenue.reindex(mix.index, fill_value=0),
+                        "Avg km": mix["km_sum"] / mix["rides"],
+                        "Avg minutes": mix["minutes_sum"] / mix["rides"],
+                    }).reset_index().rename(columns={"vehicle_code": "Vehicle", "fare_tier": "Tier"}),
+                    hide_index=True, width='stretch',
+                    column_config={
+                        "Completed revenue": st.column_config.NumberColumn(format="Rs %.0f"),
+                        "Avg km": st.column_config.NumberColumn(format="%.1f"),
+                        "Avg minutes": st.column_config.NumberColumn(format="%.0f"),
+                    },
+                )
@@ -1,61 +1,72 @@
-import json
 import streamlit as st
 from db.database import DB
-import streamlit as st
-from streamlit_folium import st_folium
-import folium
+from db.tracks import track_len
 
-from geocoding.geocode import interpolate_line
+from geocoding.geocode import geocode, haversine_km, interpolate_line
+from utils.maps import show_route_map
+from services.dispatch import driver_index, update_driver_location
+from services.simulation import simulation_engine
+from utils.helper import track_position
 
 
 def driver_jobs_page(db: DB):
     d = st.session_state.driver
     st.subheader("Available Jobs")
     st.caption("These are rides that are Assigned but not yet claimed.")
+    with st.form("driver_location"):
+        loc = st.text_input("My location", key="drv_location")
+        loc_btn = st.form_submit_button("Update location")
+    if loc_btn:
+        g = geocode(loc)
+        if g:
+            update_driver_location(db, d["id"], g[1], g[2])
+            st.success(f"Location set to {g[0]}")
+        else:
+            st.error("Could not geocode that address.")
+    here = driver_index(db).position(d["id"])
     queue = db.list_driver_queue()
     if not queue:
         st.info("No jobs right now. Try refreshing in a moment.")
         return
+    if here:
+        queue = sorted(queue, key=lambda r: haversine_km(here, (r["pickup_lat"], r["pickup_lon"])))
     for r in queue:
         with st.container(border=True):
             st.write(f"**Ride #{r['id']}** — {r['pickup_text']} → {r['dropoff_text']}  ")
-            st.caption(f"When: {r['created_at']} • Tier: {r['fare_tier']} • Pax: {r['pax']} • Est: Rs {r['est_price']:,.0f}")
+            away = f" • {haversine_km(here, (r['pickup_lat'], r['pickup_lon'])):.1f} km away" if here else ""
+            st.caption(f"When: {r['created_at']} • Tier: {r['fare_tier']} • Pax: {r['pax']} • Est: Rs {r['est_price']:,.0f}{away}")
             colA, colB = st.columns(2)
             if colA.button(f"Accept #{r['id']}", key=f"acc{r['id']}"):
-                db.set_ride_driver(r["id"], d["id"])  
-                
-                ride = db.get_ride(r["id"])
-                if not ride["tracking_json"]:
-                    coords = interpolate_line((ride["pickup_lat"], ride["pickup_lon"]), (ride["drop_lat"], ride["drop_lon"]))
-                    db.conn.execute("UPDATE rides SET tracking_json=? WHERE id=?", (json.dumps(coords), r["id"]))
-                    db.conn.commit()
-                st.success("Accepted. Going to current job…")
-                st.session_state.page = "driver_current"
-                st.rerun()
+                # Straight-line route, only stored if the ride has none yet
+                coords = interpolate_line((r["pickup_lat"], r["pickup_lon"]), (r["drop_lat"], r["drop_lon"]))
+                if db.claim_ride(r["id"], d["id"], track=coords):
+                    st.success("Accepted. Going to current job…")
+                    st.session_state.page = "driver_current"
+                    st.rerun()
+                else:
+                    st.warning("Another driver already took this ride, or you have an active job.")
             colB.button("Decline", key=f"dec{r['id']}")
 
 def driver_current_page(db: DB):
     d = st.session_state.driver
     st.subheader("Current Job")
-    rows = [r for r in db.list_all_rides() if r["driver_id"] == d["id"] and r["status"] in ("In-Progress", "Assigned")]
-    if not rows:
+    r = db.get_active_ride_for_driver(d["id"])
+    if not r:
         st.info("No active job. Check Available Jobs.")
         return
 
-    r = rows[0]
-    coords = json.loads(r["tracking_json"] or "[]")
-    if not coords:
-        coords = interpolate_line((r["pickup_lat"], r["pickup_lon"]), (r["drop_lat"], r["drop_lon"]))
-        db.conn.execute("UPDATE rides SET tracking_json=? WHERE id=?", (json.dumps(coords), r["id"]))
-        db.conn.commit()
-    new_idx = r["track_idx"]
-    m = folium.Map(location=[r["pickup_lat"], r["pickup_lon"]], zoom_start=11, tiles='OpenStreetMap')
-    folium.Marker([r["pickup_lat"], r["pickup_lon"]], tooltip='Pickup').add_to(m)
-    folium.Marker([r["drop_lat"], r["drop_lon"]], tooltip='Drop-off').add_to(m)
-    folium.PolyLine(coords, weight=5, opacity=0.7, color='green').add_to(m)
-    idx = min(new_idx, len(coords)-1)
-    folium.CircleMarker(coords[idx], radius=7, color='red', fill=True, tooltip='You').add_to(m)
-    st_folium(m, width=700, height=400)
+    blob = db.get_ride_track(r["id"])
+    if not blob:
+        db.set_ride_track(r["id"], interpolate_line((r["pickup_lat"], r["pickup_lon"]), (r["drop_lat"], r["drop_lon"])))
+        blob = db.get_ride_track(r["id"])
+    n_points = track_len(blob)
+    pos = simulation_engine(db.path).position(r["id"])
+    new_idx = pos.track_idx if pos else r["track_idx"]
+    idx = min(new_idx, n_points - 1)
+    show_route_map(
+        f"ride{r['id']}_{n_points}", (r["pickup_lat"], r["pickup_lon"]), (r["drop_lat"], r["drop_lon"]), blob,
+        marker=track_position(blob, idx), marker_tooltip="You",
+    )
     col1, col2 = st.columns(2)
 
     with col1:
@@ -67,7 +78,7 @@ def driver_current_page(db: DB):
 
     with col2:
         if st.button("Complete Ride"):
-            db.update_ride_tracking(r["id"], len(coords)-1, status='Completed')
+            db.update_ride_tracking(r["id"], n_points - 1, status='Completed')
             st.session_state.ride_status = "Completed"
             st.success("Ride completed")
     if "ride_status" in st.session_state:
@@ -77,11 +88,9 @@ def driver_current_page(db: DB):
 def driver_earnings_page(db: DB):
     d = st.session_state.driver
     st.subheader("Earnings")
-    allr = db.list_all_rides()
-    mine = [r for r in allr if r["driver_id"] == d["id"] and r["status"] == 'Completed']
-    total = sum(r["est_price"] for r in mine)
-    st.metric("Completed rides", len(mine))
-    st.metric("Total earnings", f"Rs {total:,.0f}")
+    summary = db.driver_earnings_summary(d["id"])
+    st.metric("Completed rides", summary["rides"])
+    st.metric("Total earnings", f"Rs {summary['earnings']:,.0f}")
 
 
   
\ No newline at end of file
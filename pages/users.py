@@ -1,26 +1,44 @@
 from datetime import datetime, timedelta
-import json
 import streamlit as st
 from config.constants import FARE_TIERS
+from db.catalog import vehicle_catalog
 from db.database import DB
-from geocoding.geocode import estimate_route, geocode, interpolate_line
-from model.vehicle import VEHICLES
-from streamlit_folium import st_folium
-import folium
-from utils.helper import advance_track_idx, calc_fare, get_vehicle, now_ts
-
+from db.tracks import track_len
+from geocoding.geocode import geocode_and_route, interpolate_line, route_key
+from utils.maps import show_route_map
+from services.autocomplete import suggest
+from services.dispatch import nearest_idle_drivers
+from services.simulation import simulation_engine
+from utils.helper import calc_fare, calc_fares, get_vehicle, now_ts, track_position
+
+
+
+def address_input(db: DB, label: str, key: str):
+    """Text input with ranked suggestions; returns the picked (name, lat, lon) place or the typed text."""
+    # A new text starts again from the text as typed, so a suggestion is only used once picked
+    text = st.text_input(label, key=key, on_change=st.session_state.pop, args=(f"{key}_pick", None))
+    hits = suggest(text, db.path)
+    if not hits:
+        return text
+    options = [None] + list(range(len(hits)))
+    pick = st.selectbox(
+        f"{label} suggestions", options, key=f"{key}_pick", label_visibility="collapsed",
+        format_func=lambda i: f"Use \"{text}\" as typed" if i is None else hits[i][0],
+    )
+    return text if pick is None else hits[pick]
 
 
 def user_book_page(db: DB):
     u = st.session_state.user
+    vehicles = vehicle_catalog(db.path)
     st.subheader("Book a Ride")
+    # Outside the form so suggestions refresh as soon as an address is entered
+    ptxt = address_input(db, "Pickup location", "bk_pickup")
+    dtxt = address_input(db, "Drop-off location", "bk_dropoff")
     with st.form("book"):
-        ptxt = st.text_input("Pickup location", key="bk_pickup")
-        dtxt = st.text_input("Drop-off location", key="bk_dropoff")
-
         col1, col2, col3 = st.columns(3)
         with col1:
-            vname = st.selectbox("Vehicle", [v.name for v in VEHICLES], key="bk_vehicle")
+            vname = st.selectbox("Vehicle", vehicles.names(), key="bk_vehicle")
         with col2:
             tier = st.radio("Tier", list(FARE_TIERS.keys()), index=0, horizontal=True, key="bk_tier")
         with col3:
@@ -37,8 +55,7 @@ def user_book_page(db: DB):
         estimate_btn = st.form_submit_button("Estimate")
 
     if estimate_btn:
-        gp = geocode(ptxt)
-        gd = geocode(dtxt)
+        gp, gd, route = geocode_and_route(ptxt, dtxt)
         if not gp or not gd:
             st.error("Could not geocode one or both addresses.")
             st.session_state["pending_estimate"] = None
@@ -47,12 +64,26 @@ def user_book_page(db: DB):
         (p_name, p_lat, p_lon) = (gp[0], gp[1], gp[2])
         (d_name, d_lat, d_lon) = (gd[0], gd[1], gd[2])
 
-        km, minutes, coords = estimate_route((p_lat, p_lon), (d_lat, d_lon))
-        vehicle = get_vehicle(vname)
+        km, minutes, coords = route
+        # Every vehicle x tier for the same route, priced in one call
+        n = len(vehicles) * len(FARE_TIERS)
+        q_prices, q_valid = calc_fares(
+            [v.code for v in vehicles for _ in FARE_TIERS], list(FARE_TIERS) * len(vehicles),
+            [km] * n, [minutes] * n, [pax] * n, catalog=vehicles,
+        )
+        q_prices = q_prices.reshape(len(vehicles), len(FARE_TIERS))
+        q_valid = q_valid.reshape(len(vehicles), len(FARE_TIERS))
+        quotes = [
+            {"Vehicle": v.name, **{t: f"Rs {q_prices[i, j]:,.0f}" if q_valid[i, j] else "—" for j, t in enumerate(FARE_TIERS)}}
+            for i, v in enumerate(vehicles)
+        ]
+
         try:
+            vehicle = get_vehicle(vname, vehicles)
             price = calc_fare(vehicle, tier, km, minutes, pax)
         except ValueError as e:
             st.error(str(e))
+            st.dataframe(quotes, hide_index=True, width='stretch')
             st.session_state["pending_estimate"] = None
             return
 
@@ -63,24 +94,34 @@ def user_book_page(db: DB):
             "vehicle_code": vehicle.code, "vehicle_name": vehicle.name,
             "tier": tier, "pax": int(pax), "price": float(price),
             "schedule_now": bool(schedule_now), "sched_dt": sched_dt,
+            "quotes": quotes,
         }
 
     est = st.session_state.get("pending_estimate")
     if est:
-        m = folium.Map(location=[est["p_lat"], est["p_lon"]], zoom_start=11, tiles="OpenStreetMap")
-        folium.Marker([est["p_lat"], est["p_lon"]], tooltip="Pickup").add_to(m)
-        folium.Marker([est["d_lat"], est["d_lon"]], tooltip="Drop-off").add_to(m)
-        folium.PolyLine(est["coords"], weight=5, opacity=0.7, color="green").add_to(m)
-        st_folium(m, width=700, height=400)
+        pickup, dropoff = (est["p_lat"], est["p_lon"]), (est["d_lat"], est["d_lon"])
+        show_route_map(f"est_{route_key(pickup, dropoff)}_{len(est['coords'])}", pickup, dropoff, est["coords"])
 
         st.markdown(
             f"**Estimate**: <span class='pill'>{est['km']:.1f} km • {est['minutes']:.0f} min • Rs {est['price']:,.0f}</span>",
             unsafe_allow_html=True,
         )
+        with st.expander(f"All fares for {est['pax']} pax"):
+            st.dataframe(est["quotes"], hide_index=True, width='stretch')
+        nearby = nearest_idle_drivers(db, est["p_lat"], est["p_lon"], k=3)
+        if nearby:
+            st.caption(f"Nearest driver is {nearby[0][1]:.1f} km from pickup • {len(nearby)} available nearby")
 
         c1, c2 = st.columns([1, 1])
         with c1:
             if st.button("Book Ride", type="primary", key="book_from_estimate"):
+                # The vehicle may have been removed from the catalog since the estimate
+                try:
+                    get_vehicle(est["vehicle_code"], vehicles)
+                except ValueError as e:
+                    st.error(f"{e}; estimate the ride again.")
+                    st.session_state["pending_estimate"] = None
+                    return
                 sched = None if est["schedule_now"] else est["sched_dt"].strftime("%Y-%m-%d %H:%M")
                 status = "Assigned" if est["schedule_now"] else "Scheduled"
                 ride_id = db.add_ride(
@@ -92,7 +133,7 @@ def user_book_page(db: DB):
                     vehicle_code=est["vehicle_code"], fare_tier=est["tier"], pax=est["pax"],
                     est_km=est["km"], est_minutes=est["minutes"], est_price=est["price"],
                     status=status,
-                    tracking_json=json.dumps(est["coords"] if est["schedule_now"] else []),
+                    track=est["coords"] if est["schedule_now"] else None,
                     track_idx=0,
                     last_update_at=now_ts() if est["schedule_now"] else None,
                 )
@@ -114,33 +155,20 @@ def user_live_page(db: DB):
     if not active:
         st.info("No active ride. Book one!")
         return
-    if active["status"] == "Scheduled" and active["scheduled_at"]:
-        if datetime.now() >= datetime.fromisoformat(active["scheduled_at"] + ":00"):  
-            db.update_ride_tracking(active["id"], active["track_idx"], status='Assigned')
-            active = db.get_ride(active["id"])  
-    if active["tracking_json"]:
-        coords = json.loads(active["tracking_json"])
-    else:
-
-        coords = interpolate_line((active["pickup_lat"], active["pickup_lon"]), (active["drop_lat"], active["drop_lon"]))
-    m = folium.Map(location=[active["pickup_lat"], active["pickup_lon"]], zoom_start=11, tiles='OpenStreetMap')
-    folium.Marker([active["pickup_lat"], active["pickup_lon"]], tooltip='Pickup').add_to(m)
-    folium.Marker([active["drop_lat"], active["drop_lon"]], tooltip='Drop-off').add_to(m)
-    folium.PolyLine(coords, weight=5, opacity=0.7, color='green').add_to(m)
-
-    if active["status"] == "In-Progress" and active["driver_id"]:
-        new_idx = advance_track_idx(active)
-        if new_idx >= len(coords) - 1:
-            db.update_ride_tracking(active["id"], new_idx, status='Completed')
-            st.success("Ride Completed 🎉")
-        else:
-            db.update_ride_tracking(active["id"], new_idx)
-        active = db.get_ride(active["id"]) 
-        coords = json.loads(active["tracking_json"]) or coords
-    idx = min(active["track_idx"], len(coords)-1)
-    folium.CircleMarker(coords[idx], radius=7, color='red', fill=True, tooltip='Driver').add_to(m)
-    st_folium(m, width=700, height=400)
-    st.markdown(f"**Status:** <span class='pill'>{active['status']}</span>", unsafe_allow_html=True)
+    pickup, dropoff = (active["pickup_lat"], active["pickup_lon"]), (active["drop_lat"], active["drop_lon"])
+    route = db.get_ride_track(active["id"]) or interpolate_line(pickup, dropoff)
+    n_points = track_len(route) if isinstance(route, bytes) else len(route)
+
+    # Progress is advanced by the simulation engine; read its latest snapshot
+    pos = simulation_engine(db.path).position(active["id"])
+    status = pos.status if pos else active["status"]
+    pos_idx = pos.track_idx if pos else active["track_idx"]
+    if status == "Completed":
+        st.success("Ride Completed 🎉")
+    idx = min(pos_idx, n_points - 1)
+    marker = track_position(route, idx)
+    show_route_map(f"ride{active['id']}_{n_points}", pickup, dropoff, route, marker=marker, marker_tooltip="Driver")
+    st.markdown(f"**Status:** <span class='pill'>{status}</span>", unsafe_allow_html=True)
     st.caption(f"Estimate: {active['est_km']:.1f} km • {active['est_minutes']:.0f} min • Rs {active['est_price']:,.0f}")
     st.experimental_singleton.clear() if False else None
 
@@ -0,0 +1,195 @@
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config.constants import APP_DB, AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MIN_CHARS, AUTOCOMPLETE_REFRESH_S
+from db.database import connect
+from geocoding.gazetteer import Place, gazetteer, tokenize
+from geocoding.geocode import executor, geocode_cache
+from services.worker import PathRegistry
+
+# Every address a ride started or ended at, with the coordinates of its latest use
+RIDE_ADDRESSES_SQL = """
+    SELECT text, lat, lon, COUNT(*), MAX(created_at) FROM (
+        SELECT pickup_text AS text, pickup_lat AS lat, pickup_lon AS lon, created_at FROM rides
+        UNION ALL
+        SELECT dropoff_text, drop_lat, drop_lon, created_at FROM rides
+    )
+    WHERE text IS NOT NULL AND lat IS NOT NULL AND lon IS NOT NULL
+    GROUP BY text
+"""
+
+# Sorts after every continuation of a prefix
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def _key(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+class AddressIndex:
+    """Prefix index over known addresses.
+
+    Each address is filed under every suffix of its normalized text that
+    starts at a word, so "clif" finds "Block 5, Clifton, Karachi". A lookup is
+    two bisections over the sorted suffixes plus a NumPy ranking of the range:
+    addresses that start with the query first, then the most used.
+    """
+
+    def __init__(self, places: Iterable[Tuple[str, str, float, float, float]]):
+        """`places` are (text, label, lat, lon, weight); rows sharing a label are merged, the first one's coordinates win."""
+        labels: List[str] = []
+        coords: List[Tuple[float, float]] = []
+        weights: List[float] = []
+        by_label: Dict[str, int] = {}
+        texts: Dict[str, int] = {}
+        for text, label, lat, lon, weight in places:
+            label_key = _key(label)
+            if not label_key:
+                continue
+            i = by_label.get(label_key)
+            if i is None:
+                i = by_label[label_key] = len(labels)
+                labels.append(label)
+                coords.append((lat, lon))
+                weights.append(0.0)
+                texts[label_key] = i
+            weights[i] += weight
+            text_key = label_key if text == label else _key(text)
+            if text_key:
+                texts.setdefault(text_key, i)
+        suffixes = []
+        for text_key, i in texts.items():
+            words = text_key.split(" ")
+            for w in range(len(words)):
+                suffixes.append((" ".join(words[w:]), w == 0, i))
+        suffixes.sort()
+        ids = np.array([s[2] for s in suffixes], dtype=np.int64)
+        starts = np.array([s[1] for s in suffixes], dtype=bool)
+        weight = np.array(weights, dtype=np.float64)
+        # Rank of every suffix entry in result order, so a lookup only selects the smallest ranks
+        rank = np.empty(len(ids), dtype=np.int64)
+        rank[np.lexsort((ids, -weight[ids], ~starts))] = np.arange(len(ids))
+        self._labels = labels
+        self._coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
+        self._suffixes = [s[0] for s in suffixes]
+        self._ids = ids
+        self._rank = rank
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def suggest(self, query: str, limit: int = AUTOCOMPLETE_LIMIT) -> List[Place]:
+        q = _key(query)
+        if not q:
+            return []
+        lo = bisect_left(self._suffixes, q)
+        hi = bisect_left(self._suffixes, q + _MAX_CHAR, lo)
+        if lo == hi:
+            return []
+        rank = self._rank[lo:hi]
+        # An address can match at several of its words; over-select, then keep each one's best match
+        take = min(len(rank), 4 * limit)
+        while True:
+            best = np.argpartition(rank, take - 1)[:take] if take < len(rank) else np.arange(len(rank))
+            best = best[np.argsort(rank[best])]
+            ids = self._ids[lo:hi][best]
+            _, first = np.unique(ids, return_index=True)
+            if len(first) >= limit or take == len(rank):
+                break
+            take = min(len(rank), take * 4)
+        ids = ids[np.sort(first)[:limit]]
+        return [(self._labels[i], float(self._coords[i, 0]), float(self._coords[i, 1])) for i in ids]
+
+
+def _known_places(path: str) -> List[Tuple[str, str, float, float, float]]:
+    """Seed rows: addresses of booked rides weighted by use, then geocode cache entries."""
+    places = []
+    try:
+        conn = connect(path)
+        try:
+            places += [(r[0], r[0], r[1], r[2], float(r[3])) for r in conn.execute(RIDE_ADDRESSES_SQL)]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass  # not migrated yet: only the cache seeds the index
+    for key, value in geocode_cache().items():
+        name, lat, lon = value
+        places.append((key, name, lat, lon, 1.0))
+    return places
+
+
+class _IndexSource:
+    """Keeps the AddressIndex for one database, rebuilt in the background once it is `refresh_s` old."""
+
+    def __init__(self, path: str, refresh_s: float):
+        self.path = path
+        self.refresh_s = refresh_s
+        self._index: Optional[AddressIndex] = None
+        self._rebuilding = False
+        self._lock = threading.Lock()
+
+    def _rebuild(self):
+        try:
+            index = AddressIndex(_known_places(self.path))
+            with self._lock:
+                self._index = index
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def get(self) -> AddressIndex:
+        with self._lock:
+            index = self._index
+            stale = index is not None and time.monotonic() - index.built_at >= self.refresh_s
+            if stale and not self._rebuilding:
+                self._rebuilding = True
+                executor().submit(self._rebuild)
+        if index is None:
+            index = AddressIndex(_known_places(self.path))
+            with self._lock:
+                if self._index is None:
+                    self._index = index
+        return index
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+
+_sources: PathRegistry[_IndexSource] = PathRegistry(lambda path: _IndexSource(path, AUTOCOMPLETE_REFRESH_S))
+
+
+def address_index(path: str = APP_DB) -> AddressIndex:
+    """The address index for the database at `path`, built on first use."""
+    return _sources.get(path).get()
+
+
+def invalidate_address_index(path: str = APP_DB):
+    """Rebuild from scratch on the next lookup."""
+    _sources.get(path).invalidate()
+
+
+def suggest(query: str, path: str = APP_DB, limit: int = AUTOCOMPLETE_LIMIT) -> List[Place]:
+    """Ranked (label, lat, lon) completions for a partly typed address.
+
+    Addresses already used for rides or geocoded come first; the offline
+    gazetteer, when one is installed, fills the remaining slots.
+    """
+    if len(query.strip()) < AUTOCOMPLETE_MIN_CHARS:
+        return []
+    hits = address_index(path).suggest(query, limit)
+    if len(hits) < limit:
+        index = gazetteer()
+        if index is not None:
+            seen = {_key(h[0]) for h in hits}
+            for place in index.search(query, limit):
+                if _key(place[0]) not in seen and len(hits) < limit:
+                    hits.append(place)
+                    seen.add(_key(place[0]))
+    return hits
@@ -0,0 +1,192 @@
+import heapq
+import math
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from config.constants import DRIVER_INDEX_CELL_KM
+from db.database import DB
+from geocoding.geocode import haversine_km, haversine_to_many
+
+KM_PER_DEG = 6371.0 * math.pi / 180.0
+
+Cell = Tuple[int, int]
+
+# Which of the given drivers are on a ride; the index tracks availability, not rides
+BUSY_DRIVERS_SQL = """
+    SELECT DISTINCT driver_id FROM rides
+    WHERE status IN ('Assigned', 'In-Progress') AND driver_id IN ({})
+"""
+
+
+class DriverIndex:
+    """Grid-bucket spatial index of available drivers.
+
+    Drivers are hashed into square cells of `cell_km`; a k-nearest query scans
+    rings of cells outwards from the query cell and stops as soon as no
+    unvisited cell can hold anything closer than the current k-th result.
+    """
+
+    def __init__(self, cell_km: float = DRIVER_INDEX_CELL_KM):
+        self.cell_deg = cell_km / KM_PER_DEG
+        self._cells: Dict[Cell, Set[int]] = defaultdict(set)
+        self._pos: Dict[int, Tuple[float, float, Cell]] = {}
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._pos)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def position(self, driver_id: int) -> Optional[Tuple[float, float]]:
+        p = self._pos.get(driver_id)
+        return (p[0], p[1]) if p else None
+
+    def update(self, driver_id: int, lat: float, lon: float):
+        cell = self._cell(lat, lon)
+        with self._lock:
+            old = self._pos.get(driver_id)
+            if old is not None and old[2] != cell:
+                self._discard(driver_id, old[2])
+            self._cells[cell].add(driver_id)
+            self._pos[driver_id] = (lat, lon, cell)
+            i, j = cell
+            if self._bounds is None:
+                self._bounds = (i, i, j, j)
+            else:
+                i0, i1, j0, j1 = self._bounds
+                self._bounds = (min(i0, i), max(i1, i), min(j0, j), max(j1, j))
+
+    def remove(self, driver_id: int):
+        with self._lock:
+            old = self._pos.pop(driver_id, None)
+            if old is not None:
+                self._discard(driver_id, old[2])
+
+    def _discard(self, driver_id: int, cell: Cell):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(driver_id)
+            if not bucket:
+                del self._cells[cell]
+
+    def _ring(self, ci: int, cj: int, r: int):
+        """Cells at Chebyshev distance `r` from (ci, cj) that lie inside the occupied bounds."""
+        i0, i1, j0, j1 = self._bounds
+        lo, hi = max(cj - r, j0), min(cj + r, j1)
+        for i in range(max(ci - r, i0), min(ci + r, i1) + 1):
+            if abs(i - ci) == r:
+                for j in range(lo, hi + 1):
+                    yield i, j
+            else:
+                if j0 <= cj - r <= j1:
+                    yield i, cj - r
+                if j0 <= cj + r <= j1:
+                    yield i, cj + r
+
+    def nearest(self, lat: float, lon: float, k: int = 5, max_km: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Up to `k` (driver_id, km) pairs, closest first."""
+        with self._lock:
+            if not self._pos or k <= 0:
+                return []
+            ci, cj = self._cell(lat, lon)
+            i0, i1, j0, j1 = self._bounds
+            last_ring = max(abs(ci - i0), abs(ci - i1), abs(cj - j0), abs(cj - j1))
+            best: List[Tuple[float, int]] = []  # max-heap of (-km, id)
+            cell_km = self.cell_deg * KM_PER_DEG
+            # Rings closer than the occupied bounding box are empty: start at its edge
+            r = max(i0 - ci, ci - i1, j0 - cj, cj - j1, 0)
+            while r <= last_ring:
+                if 8 * r > len(self._cells):
+                    # Sparse far-away rings: scoring every driver is cheaper than walking empty cells
+                    return self._scan_all(lat, lon, k, max_km)
+                for cell in self._ring(ci, cj, r):
+                    for driver_id in self._cells.get(cell, ()):
+                        dlat, dlon, _ = self._pos[driver_id]
+                        km = haversine_km((lat, lon), (dlat, dlon))
+                        if max_km is not None and km > max_km:
+                            continue
+                        if len(best) < k:
+                            heapq.heappush(best, (-km, driver_id))
+                        elif km < -best[0][0]:
+                            heapq.heapreplace(best, (-km, driver_id))
+                # Anything outside rings 0..r is at least r cells away in lat or lon
+                lat_edge = min(89.9, abs(lat) + (r + 1) * self.cell_deg)
+                bound = 0.99 * r * cell_km * math.cos(math.radians(lat_edge))
+                if max_km is not None and bound > max_km:
+                    break
+                if len(best) == k and -best[0][0] <= bound:
+                    break
+                r += 1
+            return [(driver_id, -neg_km) for neg_km, driver_id in sorted(best, reverse=True)]
+
+    def _scan_all(self, lat: float, lon: float, k: int, max_km: Optional[float]) -> List[Tuple[int, float]]:
+        ids = np.fromiter(self._pos.keys(), dtype=np.int64, count=len(self._pos))
+        km = haversine_to_many((lat, lon), [p[:2] for p in self._pos.values()])
+        if max_km is not None:
+            keep = km <= max_km
+            ids, km = ids[keep], km[keep]
+        order = np.lexsort((ids, km))[:k]
+        return [(int(ids[i]), float(km[i])) for i in order]
+
+
+_indexes: Dict[str, DriverIndex] = {}
+_lock = threading.Lock()
+
+
+def driver_index(db: DB) -> DriverIndex:
+    """Process-wide index for `db`, loaded from the drivers table on first use."""
+    key = os.path.abspath(db.path)
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = DriverIndex()
+            for row in db.list_driver_locations():
+                index.update(row["id"], row["lat"], row["lon"])
+            _indexes[key] = index
+        return index
+
+
+def nearest_idle_drivers(db: DB, lat: float, lon: float, k: int = 5,
+                         max_km: Optional[float] = None) -> List[Tuple[int, float]]:
+    """Up to `k` (driver_id, km) pairs of available drivers with no active ride, closest first.
+
+    Rides are claimed and completed by other sessions and processes, so busy
+    drivers stay in the index; each round asks it for twice as many and drops
+    the ones the rides table shows on a job.
+    """
+    index = driver_index(db)
+    want = k
+    while True:
+        hits = index.nearest(lat, lon, want, max_km)
+        if not hits:
+            return []
+        ids = [driver_id for driver_id, _ in hits]
+        busy = {row[0] for row in db.conn.execute(BUSY_DRIVERS_SQL.format(",".join("?" * len(ids))), ids)}
+        idle = [hit for hit in hits if hit[0] not in busy]
+        if len(idle) >= k or len(hits) < want:
+            return idle[:k]
+        want *= 2
+
+
+def update_driver_location(db: DB, driver_id: int, lat: float, lon: float):
+    db.set_driver_location(driver_id, lat, lon)
+    row = db.conn.execute("SELECT is_available FROM drivers WHERE id=?", (driver_id,)).fetchone()
+    if row and row["is_available"]:
+        driver_index(db).update(driver_id, lat, lon)
+
+
+def set_driver_availability(db: DB, driver_id: int, available: bool):
+    db.set_driver_available(driver_id, available)
+    index = driver_index(db)
+    if not available:
+        index.remove(driver_id)
+        return
+    row = db.conn.execute("SELECT lat, lon FROM drivers WHERE id=?", (driver_id,)).fetchone()
+    if row and row["lat"] is not None:
+        index.update(driver_id, row["lat"], row["lon"])
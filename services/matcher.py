@@ -0,0 +1,226 @@
+import logging
+import math
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from config.constants import APP_DB, MATCH_BUDGET_S, MATCH_CANDIDATES, MATCH_INTERVAL_S, MATCH_MAX_PICKUP_KM
+from db.database import connect
+from geocoding.geocode import haversine_pairs
+from services.worker import PeriodicWorker
+from utils.helper import now_ts
+
+log = logging.getLogger(__name__)
+
+PENDING_SQL = "SELECT id, pickup_lat, pickup_lon FROM rides WHERE status='Assigned' AND driver_id IS NULL"
+IDLE_DRIVERS_SQL = """
+    SELECT d.id, d.lat, d.lon FROM drivers d
+    WHERE d.is_available=1 AND d.lat IS NOT NULL AND d.lon IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM rides r WHERE r.driver_id=d.id AND r.status IN ('Assigned', 'In-Progress')
+      )
+"""
+# Both guards are checked at write time: the ride may have been claimed, or the
+# driver may have taken another ride, while the match was being computed
+ASSIGN_SQL = """
+    UPDATE rides SET driver_id=?, last_update_at=?
+    WHERE id=? AND status='Assigned' AND driver_id IS NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM rides r WHERE r.driver_id=? AND r.status IN ('Assigned', 'In-Progress')
+      )
+"""
+
+
+def nearest_candidates(rides: np.ndarray, drivers: np.ndarray, k: int = MATCH_CANDIDATES,
+                       max_km: float = MATCH_MAX_PICKUP_KM, chunk: int = 512) -> Tuple[np.ndarray, np.ndarray]:
+    """For every ride, its `k` closest drivers within `max_km`: (driver index, km), -1 padded.
+
+    Candidates are picked from a ride x driver matrix of squared equirectangular
+    distances computed in row chunks (memory stays at chunk x len(drivers));
+    only the k survivors per ride are scored with the exact haversine distance.
+    Each chunk is one matrix product: |d|^2 - 2 r.d ranks drivers like
+    |r - d|^2, on coordinates centred first to keep float32 precision.
+    """
+    n, m = len(rides), len(drivers)
+    k = min(k, m)
+    cand = np.full((n, k), -1, dtype=np.int64)
+    cost = np.full((n, k), np.inf)
+    if n == 0 or m == 0:
+        return cand, cost
+    centre = np.concatenate([rides, drivers]).mean(axis=0)
+    scale = np.array([1.0, np.cos(np.radians(centre[0]))])
+    r_xy = ((rides - centre) * scale).astype(np.float32)
+    d_xy = ((drivers - centre) * scale).astype(np.float32)
+    d_norm = (d_xy * d_xy).sum(axis=1)
+    d_xy_t = -2.0 * d_xy.T
+    for s in range(0, n, chunk):
+        r = rides[s:s + chunk]
+        d2 = r_xy[s:s + chunk] @ d_xy_t
+        d2 += d_norm
+        idx = np.argpartition(d2, k - 1, axis=1)[:, :k] if k < m else np.broadcast_to(np.arange(m), d2.shape)
+        km = haversine_pairs(np.repeat(r, idx.shape[1], axis=0), drivers[idx.ravel()]).reshape(idx.shape)
+        ok = km <= max_km
+        cand[s:s + chunk] = np.where(ok, idx, -1)
+        cost[s:s + chunk] = np.where(ok, km, np.inf)
+    return cand, cost
+
+
+def _auction(objs: np.ndarray, benefit: np.ndarray, n_objects: int, eps_start: float, eps_final: float,
+             deadline: float = math.inf) -> Tuple[np.ndarray, float]:
+    """Forward auction with epsilon scaling on a square, sparse assignment problem.
+
+    Row i of `objs`/`benefit` lists the objects person i may take and what each
+    is worth to them (-1 / -inf padding). All bidding persons bid at once each
+    round (Jacobi auction). Returns the object held by every person and the
+    epsilon of the phase that produced it. The first phase always runs to the
+    end; past `deadline` the last complete phase is returned.
+    """
+    n, width = objs.shape
+    safe = np.maximum(objs, 0)
+    spread = np.ptp(benefit[np.isfinite(benefit)]) + 1.0
+    prices = np.zeros(n_objects)
+    owner = np.empty(n_objects, dtype=np.int64)
+    held = np.empty(n, dtype=np.int64)
+    eps = max(eps_start, eps_final)
+    done = None
+    while True:
+        owner[:] = -1
+        held[:] = -1
+        todo = np.arange(n)
+        while todo.size:
+            if done is not None and time.monotonic() > deadline:
+                return done
+            vals = benefit[todo] - prices[safe[todo]]
+            rows = np.arange(len(todo))
+            best = vals.argmax(axis=1)
+            v1 = vals[rows, best]
+            vals[rows, best] = -np.inf
+            v2 = vals.max(axis=1)
+            v2 = np.where(np.isfinite(v2), v2, v1 - spread)
+            target = objs[todo, best]
+            bids = prices[target] + (v1 - v2) + eps
+            # Highest bid per object wins; the previous holder goes back to bidding
+            order = np.lexsort((bids, target))
+            last = np.r_[target[order][1:] != target[order][:-1], True]
+            win = order[last]
+            won, winners = target[win], todo[win]
+            prev = owner[won]
+            held[prev[prev >= 0]] = -1
+            owner[won] = winners
+            held[winners] = won
+            prices[won] = bids[win]
+            todo = np.flatnonzero(held < 0)
+        if eps <= eps_final:
+            return held, eps
+        done = held.copy(), eps
+        eps = max(eps / 4.0, eps_final)
+
+
+def auction_assign(cand: np.ndarray, cost: np.ndarray, skip_cost: float, eps_final: float = 1e-3,
+                   deadline: float = math.inf) -> np.ndarray:
+    """Assignment of rides to drivers with near-minimal total cost; returns the driver index per ride, or -1.
+
+    `cand`/`cost` are the sparse per-ride candidate lists from nearest_candidates.
+    Leaving a ride unmatched costs `skip_cost`. The problem is made square for
+    the auction: every ride gets a private "skip" object, and every candidate
+    driver gets an "idle" person who may keep the driver or take the skip
+    object of any ride listing that driver, both at zero cost.
+
+    The total is within (rides + drivers) * eps of the best assignment that
+    uses only the candidate lists, where eps is that of the last auction phase
+    finished before the `deadline` (time.monotonic()): eps_final if it was
+    reached, else a coarser one. The first phase always completes, so a
+    large instance can overrun the deadline by that phase. With a 0.8 s
+    budget, 5k x 5k uniform rides and drivers land about 12% above that
+    optimum, 1k x 1k within 1%.
+    """
+    n, k = cand.shape
+    if n == 0 or k == 0 or (cand < 0).all():
+        return np.full(n, -1, dtype=np.int64)
+    used = np.unique(cand[cand >= 0])
+    m = len(used)
+    local = np.where(cand >= 0, np.searchsorted(used, np.maximum(cand, 0)), -1)
+
+    # Objects: drivers 0..m-1, then skip objects m..m+n-1. Persons: rides, then idle drivers.
+    ride_objs = np.concatenate([local, (m + np.arange(n))[:, None]], axis=1)
+    ride_benefit = np.concatenate([np.where(local >= 0, -cost, -np.inf), np.full((n, 1), -skip_cost)], axis=1)
+
+    ride_idx, slot = np.nonzero(local >= 0)
+    drv = local[ride_idx, slot]
+    order = np.argsort(drv, kind="stable")
+    drv, listed_by = drv[order], ride_idx[order]
+    counts = np.bincount(drv, minlength=m)
+    starts = np.r_[0, np.cumsum(counts)[:-1]]
+    col = np.arange(len(drv)) - starts[drv] + 1
+    idle_objs = np.full((m, counts.max() + 1), -1, dtype=np.int64)
+    idle_objs[:, 0] = np.arange(m)
+    idle_objs[drv, col] = m + listed_by
+    idle_benefit = np.where(idle_objs >= 0, 0.0, -np.inf)
+
+    width = max(ride_objs.shape[1], idle_objs.shape[1])
+    objs = np.full((n + m, width), -1, dtype=np.int64)
+    benefit = np.full((n + m, width), -np.inf)
+    objs[:n, :k + 1], benefit[:n, :k + 1] = ride_objs, ride_benefit
+    objs[n:, :idle_objs.shape[1]], benefit[n:, :idle_objs.shape[1]] = idle_objs, idle_benefit
+
+    # Start at the scale on which a ride's candidates differ; coarser phases only add bidding rounds
+    finite = np.isfinite(cost)
+    listed = finite.any(axis=1)
+    spread = np.median(np.where(finite, cost, -np.inf).max(axis=1)[listed]
+                       - np.where(finite, cost, np.inf).min(axis=1)[listed])
+    eps_start = min(max(spread / 2.0, eps_final), skip_cost / 4.0)
+    held, eps = _auction(objs, benefit, m + n, eps_start=eps_start, eps_final=eps_final, deadline=deadline)
+    if eps > eps_final:
+        log.debug("auction stopped at eps=%.3g for %d rides x %d drivers", eps, n, m)
+    held = held[:n]
+    return np.where((held >= 0) & (held < m), used[np.clip(held, 0, m - 1)], -1)
+
+
+def match_pending(conn: sqlite3.Connection) -> int:
+    """Assign unclaimed Assigned rides to idle drivers in one transaction; returns the count.
+
+    MATCH_BUDGET_S covers the whole pass, candidate generation included.
+    """
+    deadline = time.monotonic() + MATCH_BUDGET_S
+    rides = conn.execute(PENDING_SQL).fetchall()
+    drivers = conn.execute(IDLE_DRIVERS_SQL).fetchall()
+    if not rides or not drivers:
+        return 0
+    ride_pos = np.array([(r["pickup_lat"], r["pickup_lon"]) for r in rides], dtype=float)
+    driver_pos = np.array([(d["lat"], d["lon"]) for d in drivers], dtype=float)
+    cand, cost = nearest_candidates(ride_pos, driver_pos)
+    match = auction_assign(cand, cost, skip_cost=MATCH_MAX_PICKUP_KM, eps_final=0.01, deadline=deadline)
+    ts = now_ts()
+    updates = [(drivers[j]["id"], ts, rides[i]["id"], drivers[j]["id"])
+               for i, j in enumerate(match.tolist()) if j >= 0]
+    if not updates:
+        return 0
+    assigned = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for row in updates:
+            assigned += conn.execute(ASSIGN_SQL, row).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return assigned
+
+
+class BatchMatcher(PeriodicWorker):
+    def __init__(self, path: str = APP_DB, interval: float = MATCH_INTERVAL_S):
+        super().__init__("batch-matcher", interval)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def tick(self):
+        if self._conn is None:
+            self._conn = connect(self.path)
+        match_pending(self._conn)
+
+
+def batch_matcher(path: str = APP_DB) -> BatchMatcher:
+    """The running matcher for `path`, started on first use."""
+    return BatchMatcher.for_path(path)
@@ -0,0 +1,79 @@
+import sqlite3
+from typing import Optional
+
+from config.constants import APP_DB, ROLLUP_BATCH, ROLLUP_INTERVAL_S
+from db.database import connect
+from services.worker import PeriodicWorker
+
+# Bucket keys are prefixes of created_at ("%Y-%m-%d %H:%M:%S")
+GRAINS = {"rollup_hourly": "substr(created_at, 1, 13) || ':00'", "rollup_daily": "substr(created_at, 1, 10)"}
+
+# Each event adds the ride to its new status and takes it out of the old one
+DELTAS_SQL = """
+    SELECT created_at, vehicle_code, fare_tier, new_status AS status, 1 AS sign, est_price, est_km, est_minutes
+    FROM ride_events WHERE seq > :lo AND seq <= :hi AND new_status IS NOT NULL
+    UNION ALL
+    SELECT created_at, vehicle_code, fare_tier, old_status, -1, est_price, est_km, est_minutes
+    FROM ride_events WHERE seq > :lo AND seq <= :hi AND old_status IS NOT NULL
+"""
+
+
+def apply_rollups(conn: sqlite3.Connection, batch: int = ROLLUP_BATCH) -> int:
+    """Fold ride events past the high-water mark into the rollup tables; returns events consumed.
+
+    One transaction per batch: the rollups, the mark in meta and the pruning of
+    consumed events commit together.
+    """
+    total = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            lo = conn.execute("SELECT value FROM meta WHERE key='rollup_seq'").fetchone()[0]
+            hi, n = conn.execute(
+                "SELECT MAX(seq), COUNT(*) FROM (SELECT seq FROM ride_events WHERE seq > ? ORDER BY seq LIMIT ?)",
+                (lo, batch),
+            ).fetchone()
+            if hi is None:
+                conn.commit()
+                return total
+            for table, bucket in GRAINS.items():
+                conn.execute(
+                    f"""
+                    INSERT INTO {table}(bucket, vehicle_code, fare_tier, status, rides, price_sum, km_sum, minutes_sum)
+                    SELECT {bucket}, COALESCE(vehicle_code, ''), COALESCE(fare_tier, ''), status, SUM(sign),
+                           SUM(sign * COALESCE(est_price, 0)), SUM(sign * COALESCE(est_km, 0)),
+                           SUM(sign * COALESCE(est_minutes, 0))
+                    FROM ({DELTAS_SQL}) WHERE created_at IS NOT NULL
+                    GROUP BY 1, 2, 3, 4
+                    ON CONFLICT(bucket, vehicle_code, fare_tier, status) DO UPDATE SET
+                        rides = rides + excluded.rides,
+                        price_sum = price_sum + excluded.price_sum,
+                        km_sum = km_sum + excluded.km_sum,
+                        minutes_sum = minutes_sum + excluded.minutes_sum
+                    """,
+                    {"lo": lo, "hi": hi},
+                )
+            conn.execute("UPDATE meta SET value=? WHERE key='rollup_seq'", (hi,))
+            conn.execute("DELETE FROM ride_events WHERE seq <= ?", (hi,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        total += n
+
+
+class RollupWorker(PeriodicWorker):
+    def __init__(self, path: str = APP_DB, interval: float = ROLLUP_INTERVAL_S):
+        super().__init__("analytics-rollups", interval)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def tick(self):
+        if self._conn is None:
+            self._conn = connect(self.path)
+        apply_rollups(self._conn)
+
+
+def rollup_worker(path: str = APP_DB) -> RollupWorker:
+    """The running rollup worker for `path`, started on first use."""
+    return RollupWorker.for_path(path)
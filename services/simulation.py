@@ -0,0 +1,97 @@
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from config.constants import APP_DB, SIMULATION_TICK_S
+from db.database import connect, synchronous_full
+from services.worker import PeriodicWorker
+from utils.helper import advance_track_idx, track_pps
+
+ACTIVE_SQL = """
+    SELECT r.id, r.track_idx, r.est_minutes, r.last_update_at, COALESCE(t.n_points, 0) AS track_len
+    FROM rides r LEFT JOIN ride_tracks t ON t.ride_id = r.id
+    WHERE r.status='In-Progress' AND r.driver_id IS NOT NULL
+"""
+MOVE_SQL = "UPDATE rides SET track_idx=?, last_update_at=?, status=? WHERE id=? AND status='In-Progress'"
+
+
+def _ts(dt: datetime) -> str:
+    # Millisecond precision so the fractional part of a step carries over to the next tick
+    return dt.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+@dataclass(frozen=True)
+class RidePosition:
+    ride_id: int
+    status: str
+    track_idx: int
+
+
+class SimulationEngine(PeriodicWorker):
+    """Moves every In-Progress ride along its track once per tick.
+
+    Each tick writes the new track_idx of moving rides in one transaction,
+    then the status transitions (due Scheduled rides become Assigned, rides at
+    the end of their track Completed) in a second one committed with
+    synchronous=FULL. The resulting positions are published as an immutable
+    snapshot so pages can read them without querying SQLite.
+    """
+
+    def __init__(self, path: str = APP_DB, interval: float = SIMULATION_TICK_S):
+        super().__init__("ride-simulation", interval)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._snapshot: Dict[int, RidePosition] = {}
+
+    def snapshot(self) -> Dict[int, RidePosition]:
+        return self._snapshot
+
+    def position(self, ride_id: int) -> Optional[RidePosition]:
+        return self._snapshot.get(ride_id)
+
+    def tick(self):
+        if self._conn is None:
+            self._conn = connect(self.path)
+        conn = self._conn
+        now = datetime.now()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            moves, completed, snapshot = [], [], {}
+            for ride in conn.execute(ACTIVE_SQL).fetchall():
+                idx, status, last = ride["track_idx"], "In-Progress", ride["last_update_at"]
+                if not last:
+                    moves.append((idx, _ts(now), status, ride["id"]))
+                elif ride["track_len"]:
+                    new_idx = advance_track_idx(ride, now)
+                    if new_idx >= ride["track_len"] - 1:
+                        idx, status = new_idx, "Completed"
+                        completed.append((idx, _ts(now), status, ride["id"]))
+                    elif new_idx > idx:
+                        step = timedelta(seconds=(new_idx - idx) / track_pps(ride))
+                        idx = new_idx
+                        moves.append((idx, _ts(datetime.fromisoformat(last) + step), status, ride["id"]))
+                snapshot[ride["id"]] = RidePosition(ride["id"], status, idx)
+            conn.executemany(MOVE_SQL, moves)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        with synchronous_full(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE rides SET status='Assigned', last_update_at=? WHERE status='Scheduled' AND scheduled_at<=?",
+                    (_ts(now), now.strftime("%Y-%m-%d %H:%M")),
+                )
+                conn.executemany(MOVE_SQL, completed)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self._snapshot = snapshot
+
+
+def simulation_engine(path: str = APP_DB) -> SimulationEngine:
+    """The running engine for `path`, started on first use."""
+    return SimulationEngine.for_path(path)
@@ -0,0 +1,70 @@
+import abc
+import logging
+import os
+import threading
+from typing import Callable, Dict, Generic, TypeVar
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PathRegistry(Generic[T]):
+    """One object per file, made by `factory(abspath)` on first use and shared by the whole process.
+
+    Workers, caches and mapped indexes are all per database or index file;
+    relative and absolute spellings of a path share one entry.
+    """
+
+    def __init__(self, factory: Callable[[str], T]):
+        self._factory = factory
+        self._items: Dict[str, T] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> T:
+        key = os.path.abspath(path)
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = self._factory(key)
+            return self._items[key]
+
+
+class PeriodicWorker(threading.Thread, abc.ABC):
+    """Daemon thread that calls `tick()` every `interval` seconds until stopped."""
+
+    _registries: Dict[type, PathRegistry] = {}
+    _registries_lock = threading.Lock()
+
+    def __init__(self, name: str, interval: float):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    @classmethod
+    def for_path(cls, path: str):
+        """The running worker of this class for the database at `path`, started on first use."""
+        with PeriodicWorker._registries_lock:
+            registry = PeriodicWorker._registries.get(cls)
+            if registry is None:
+                registry = PeriodicWorker._registries[cls] = PathRegistry(cls._started)
+        return registry.get(path)
+
+    @classmethod
+    def _started(cls, path: str):
+        worker = cls(path)
+        worker.start()
+        return worker
+
+    @abc.abstractmethod
+    def tick(self):
+        """One unit of work; exceptions are logged and the next tick runs as usual."""
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.tick()
+            except Exception:
+                log.exception("%s tick failed", self.name)
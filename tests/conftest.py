@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The app imports its packages from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def _keep_main_module():
+    """AppTest leaves its temporary script as __main__, which spawned processes would then re-run."""
+    main = sys.modules["__main__"]
+    yield
+    sys.modules["__main__"] = main
@@ -0,0 +1,78 @@
+import pytest
+
+from config.constants import AUTOCOMPLETE_MIN_CHARS
+from geocoding.gazetteer import Gazetteer, build
+from services import autocomplete
+from services.autocomplete import AddressIndex
+
+
+def place(label, weight=1.0, text=None, lat=24.86, lon=67.01):
+    return (text or label, label, lat, lon, weight)
+
+
+@pytest.fixture
+def index():
+    return AddressIndex([
+        place("Block 5, Clifton, Karachi", 3),
+        place("Clifton Bridge", 1),
+        place("Clifton Beach", 7),
+        place("Cliftonville Road", 2),
+        place("Saddar, Karachi", 10),
+        place("Tariq Road", 4),
+        place("Tariq Road", 1, lat=0.0, lon=0.0),
+        place("Gulshan Chowrangi", 1, text="gulshan chowk"),
+    ])
+
+
+def labels(hits):
+    return [h[0] for h in hits]
+
+
+def test_matches_start_at_word_boundaries(index):
+    assert labels(index.suggest("karachi")) == ["Saddar, Karachi", "Block 5, Clifton, Karachi"]
+    assert labels(index.suggest("road")) == ["Tariq Road", "Cliftonville Road"]
+    # Inside a word is not a match
+    assert index.suggest("ifton") == []
+    assert index.suggest("arachi") == []
+
+
+def test_prefix_matches_rank_first_then_by_use(index):
+    assert labels(index.suggest("clif")) == [
+        "Clifton Beach", "Cliftonville Road", "Clifton Bridge", "Block 5, Clifton, Karachi",
+    ]
+    assert labels(index.suggest("clifton b")) == ["Clifton Beach", "Clifton Bridge"]
+    assert labels(index.suggest("clif", limit=2)) == ["Clifton Beach", "Cliftonville Road"]
+
+
+def test_labels_merge_and_keep_their_first_coordinates(index):
+    assert index.suggest("tariq") == [("Tariq Road", 24.86, 67.01)]
+    # The original query text finds the label it was geocoded to
+    assert labels(index.suggest("gulshan ch")) == ["Gulshan Chowrangi"]
+
+
+def test_suggest_below_min_chars_is_empty(index, monkeypatch):
+    monkeypatch.setattr(autocomplete, "address_index", lambda path: index)
+    monkeypatch.setattr(autocomplete, "gazetteer", lambda: None)
+    assert autocomplete.suggest("s" * (AUTOCOMPLETE_MIN_CHARS - 1), "unused.db") == []
+    assert autocomplete.suggest("  ", "unused.db") == []
+    assert labels(autocomplete.suggest("saddar"[:AUTOCOMPLETE_MIN_CHARS], "unused.db")) == ["Saddar, Karachi"]
+
+
+def test_gazetteer_fills_the_remaining_slots(index, tmp_path, monkeypatch):
+    out = str(tmp_path / "gazetteer.idx")
+    build([
+        ("Saddar, Karachi", 24.8556, 67.0234, 0.9),
+        ("Saddar Bazaar, Rawalpindi", 33.5973, 73.0479, 0.6),
+        ("Saddar Town", 24.85, 67.02, 0.5),
+    ], out)
+    monkeypatch.setattr(autocomplete, "address_index", lambda path: index)
+    monkeypatch.setattr(autocomplete, "gazetteer", lambda: Gazetteer(out))
+    # Known addresses first, gazetteer places after them without duplicates
+    assert labels(autocomplete.suggest("saddar", "unused.db", limit=3)) == [
+        "Saddar, Karachi", "Saddar Bazaar, Rawalpindi", "Saddar Town",
+    ]
+    assert labels(autocomplete.suggest("saddar", "unused.db", limit=2)) == [
+        "Saddar, Karachi", "Saddar Bazaar, Rawalpindi",
+    ]
+    # A full page of known addresses leaves nothing to fill
+    assert labels(autocomplete.suggest("clif", "unused.db", limit=4)) == labels(index.suggest("clif", 4))
@@ -0,0 +1,28 @@
+from geocoding.cache import PersistentCache
+from geocoding.geocode import _decode_route, _encode_route, _route_nbytes
+
+
+def _route(n):
+    return 1.0, 2.0, [(24.8 + i * 1e-3, 67.0 + i * 1e-3) for i in range(n)]
+
+
+def test_memory_budget_counts_decoded_routes(tmp_path):
+    budget = 3 * _route_nbytes(_route(100))
+    cache = PersistentCache("routes", path=str(tmp_path / "cache.db"), max_bytes=budget, sizeof=_route_nbytes,
+                            encode=_encode_route, decode=_decode_route)
+    for i in range(5):
+        cache.put(f"r{i}", _route(100))
+    stats = cache.stats()
+    assert stats["memory_entries"] == 3
+    assert stats["memory_bytes"] <= budget
+    # Evicted entries are still served from disk, and come back in memory
+    assert len(cache.get("r0")[2]) == 100
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_memory_budget_defaults_to_encoded_length(tmp_path):
+    cache = PersistentCache("plain", path=str(tmp_path / "cache.db"), max_bytes=10)
+    cache.put("a", "12345")
+    cache.put("b", "67890")
+    cache.put("c", "x")
+    assert cache.stats()["memory_entries"] == 2
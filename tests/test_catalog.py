@@ -0,0 +1,96 @@
+import datetime
+import time
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from db import catalog
+from db.catalog import invalidate_vehicle_catalog, vehicle_catalog
+from db.database import DB
+from model.vehicle import VEHICLES
+from utils.helper import get_vehicle
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DB(str(tmp_path / "app.db"))
+
+
+def version(db):
+    return db.conn.execute("SELECT value FROM meta WHERE key='vehicles_version'").fetchone()[0]
+
+
+def test_vehicle_changes_bump_the_version(db):
+    v0 = version(db)
+    db.conn.execute("INSERT INTO vehicles VALUES ('tuk3', 'Rickshaw (3 pax)', 3, 30.0, 3.0)")
+    assert version(db) == v0 + 1
+    db.conn.execute("UPDATE vehicles SET per_min = 3.5 WHERE code = 'tuk3'")
+    assert version(db) == v0 + 2
+    db.conn.execute("DELETE FROM vehicles WHERE code = 'tuk3'")
+    assert version(db) == v0 + 3
+    db.conn.execute("SELECT * FROM vehicles").fetchall()
+    assert version(db) == v0 + 3
+
+
+def test_catalog_reloads_after_the_check_interval(db, monkeypatch):
+    monkeypatch.setattr(catalog, "VEHICLE_CATALOG_CHECK_S", 0.05)
+    first = vehicle_catalog(db.path)
+    assert [v.code for v in first] == [v.code for v in VEHICLES]
+    assert first.version == version(db)
+    db.conn.execute("INSERT INTO vehicles VALUES ('tuk3', 'Rickshaw (3 pax)', 3, 30.0, 3.0)")
+    db.conn.commit()
+    # Inside the interval the cached snapshot is served as is
+    assert vehicle_catalog(db.path) is first
+    time.sleep(0.1)
+    fresh = vehicle_catalog(db.path)
+    assert fresh.version == version(db)
+    assert fresh.get("tuk3").name == "Rickshaw (3 pax)"
+    # Nothing changed: the next check keeps the same snapshot
+    invalidate_vehicle_catalog(db.path)
+    assert vehicle_catalog(db.path) is fresh
+
+
+def test_invalidate_reloads_at_once(db):
+    first = vehicle_catalog(db.path)
+    db.conn.execute("UPDATE vehicles SET base_per_km = 55.0 WHERE code = 'eco4'")
+    db.conn.commit()
+    assert vehicle_catalog(db.path) is first
+    invalidate_vehicle_catalog(db.path)
+    assert vehicle_catalog(db.path).get("eco4").base_per_km == 55.0
+
+
+def test_get_vehicle_by_code_or_name_and_unknown(db):
+    vehicles = vehicle_catalog(db.path)
+    assert get_vehicle("sed6", vehicles) is get_vehicle("Sedan (6 pax)", vehicles)
+    for unknown in ("nope", "", None):
+        with pytest.raises(ValueError):
+            get_vehicle(unknown, vehicles)
+
+
+def _book_page(path):
+    from db.database import DB
+    from pages.users import user_book_page
+
+    user_book_page(DB(path))
+
+
+def test_booking_a_removed_vehicle_shows_an_error(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db.conn.execute("DELETE FROM vehicles WHERE code = 'van8'")
+    db.conn.commit()
+    invalidate_vehicle_catalog(db.path)
+    at = AppTest.from_function(_book_page, args=(db.path,), default_timeout=30)
+    at.session_state["user"] = {"id": 1, "name": "u"}
+    at.session_state["pending_estimate"] = {
+        "p_name": "A", "p_lat": 24.86, "p_lon": 67.0, "d_name": "B", "d_lat": 24.9, "d_lon": 67.05,
+        "km": 6.0, "minutes": 15.0, "coords": [(24.86, 67.0), (24.9, 67.05)],
+        "vehicle_code": "van8", "vehicle_name": "Van (8 pax)", "tier": "Basic", "pax": 2, "price": 600.0,
+        "schedule_now": True, "sched_dt": datetime.datetime.now(), "quotes": [],
+    }
+    at.run()
+    assert not at.exception
+    at.button(key="book_from_estimate").click().run()
+    assert not at.exception
+    assert any("Unknown vehicle 'van8'" in e.value for e in at.error)
+    assert at.session_state["pending_estimate"] is None
+    assert db.conn.execute("SELECT COUNT(*) FROM rides").fetchone()[0] == 0
@@ -0,0 +1,65 @@
+import multiprocessing
+import random
+import threading
+from collections import Counter
+
+from db.database import DB
+from utils.helper import now_ts
+
+RIDES = 12
+DRIVERS = 16
+
+
+def _setup(path):
+    db = DB(path)
+    drivers = [db.create_driver(f"d{i}", f"d{i}@x", "p", "m", "m", f"P-{i}") for i in range(DRIVERS)]
+    rides = [db.add_ride(user_id=1, pickup_lat=24.86, pickup_lon=67.0, drop_lat=24.9, drop_lon=67.05,
+                         status="Assigned", created_at=now_ts()) for _ in range(RIDES)]
+    return drivers, rides
+
+
+def _claim_all(path, driver_id, rides, start=None):
+    """Try every ride in a random order; the ids this driver won."""
+    db = DB(path)
+    order = list(rides)
+    random.Random(driver_id).shuffle(order)
+    if start is not None:
+        start.wait()
+    return [ride for ride in order if db.claim_ride(ride, driver_id)]
+
+
+def _check(path, rides, wins):
+    won = Counter(ride for ride_ids in wins for ride in ride_ids)
+    assert sorted(won) == sorted(rides)
+    assert set(won.values()) == {1}
+    assert all(len(ride_ids) <= 1 for ride_ids in wins)
+    active = DB(path).conn.execute(
+        "SELECT driver_id, COUNT(*) FROM rides WHERE status IN ('Assigned', 'In-Progress') GROUP BY driver_id"
+    ).fetchall()
+    assert len(active) == RIDES
+    assert all(row[0] is not None and row[1] == 1 for row in active)
+
+
+def test_threads_claim_each_ride_once(tmp_path):
+    path = str(tmp_path / "app.db")
+    drivers, rides = _setup(path)
+    start = threading.Barrier(DRIVERS)
+    wins = [None] * DRIVERS
+
+    def run(i):
+        wins[i] = _claim_all(path, drivers[i], rides, start)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(DRIVERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _check(path, rides, wins)
+
+
+def test_processes_claim_each_ride_once(tmp_path):
+    path = str(tmp_path / "app.db")
+    drivers, rides = _setup(path)
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        wins = pool.starmap(_claim_all, [(path, d, rides) for d in drivers])
+    _check(path, rides, wins)
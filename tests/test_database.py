@@ -0,0 +1,20 @@
+import os
+
+from db import database
+from db.database import DB
+
+
+def test_every_in_memory_database_is_migrated():
+    for db in (DB(":memory:"), DB(":memory:")):
+        assert db.conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+        assert db.create_driver("d", "d@x", "p", "m", "m", "P-1") == 1
+    assert os.path.abspath(":memory:") not in database._migrated
+
+
+def test_a_file_is_migrated_once_per_process(tmp_path):
+    path = str(tmp_path / "app.db")
+    DB(path)
+    assert os.path.abspath(path) in database._migrated
+    # A later open trusts the cache instead of re-checking the schema
+    DB(path).conn.execute("PRAGMA user_version=0")
+    assert DB(path).conn.execute("PRAGMA user_version").fetchone()[0] == 0
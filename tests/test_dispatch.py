@@ -0,0 +1,49 @@
+import random
+
+from db.database import DB
+from geocoding.geocode import haversine_km
+from services.dispatch import (
+    DriverIndex, driver_index, nearest_idle_drivers, set_driver_availability, update_driver_location,
+)
+from utils.helper import now_ts
+
+
+def test_nearest_matches_brute_force_near_and_far():
+    rng = random.Random(3)
+    index = DriverIndex(cell_km=1.0)
+    drivers = {i: (24.8 + rng.random() * 0.3, 66.9 + rng.random() * 0.4) for i in range(400)}
+    for driver_id, (lat, lon) in drivers.items():
+        index.update(driver_id, lat, lon)
+    # Inside the fleet, just outside it, and far enough that every ring up to the fleet is empty
+    queries = [(24.95, 67.1), (24.7, 66.85), (25.5, 67.1), (34.9, 67.05), (24.9, 77.0)]
+    for lat, lon in queries:
+        expected = sorted(haversine_km((lat, lon), p) for p in drivers.values())[:5]
+        got = [km for _, km in index.nearest(lat, lon, k=5)]
+        assert [round(km, 6) for km in got] == [round(km, 6) for km in expected]
+
+
+def test_nearest_respects_max_km_outside_the_fleet():
+    index = DriverIndex(cell_km=1.0)
+    index.update(1, 24.86, 67.0)
+    assert index.nearest(25.86, 67.0, k=3, max_km=50.0) == []
+    assert [d for d, _ in index.nearest(25.86, 67.0, k=3, max_km=200.0)] == [1]
+
+
+def test_nearest_idle_drivers_skips_drivers_on_a_ride(tmp_path):
+    db = DB(str(tmp_path / "app.db"))
+    drivers = [db.create_driver(f"d{i}", f"d{i}@x", "p", "m", "m", f"P-{i}") for i in range(6)]
+    for i, driver_id in enumerate(drivers):
+        update_driver_location(db, driver_id, 24.86 + 0.01 * i, 67.0)
+    rides = [db.add_ride(user_id=1, pickup_lat=24.86, pickup_lon=67.0, drop_lat=24.9, drop_lon=67.05,
+                         status="Assigned", created_at=now_ts()) for _ in range(4)]
+    # The three closest drivers take rides; one of them finishes
+    for ride, driver_id in zip(rides, drivers[:3]):
+        assert db.claim_ride(ride, driver_id)
+    db.update_ride_tracking(rides[0], 5, "Completed")
+
+    assert [d for d, _ in driver_index(db).nearest(24.86, 67.0, k=3)] == drivers[:3]
+    assert [d for d, _ in nearest_idle_drivers(db, 24.86, 67.0, k=3)] == [drivers[0], drivers[3], drivers[4]]
+    assert [d for d, _ in nearest_idle_drivers(db, 24.86, 67.0, k=10)] == [drivers[0]] + drivers[3:]
+    assert nearest_idle_drivers(db, 24.86, 67.0, k=3, max_km=2.5) == nearest_idle_drivers(db, 24.86, 67.0, k=1)
+    set_driver_availability(db, drivers[0], False)
+    assert [d for d, _ in nearest_idle_drivers(db, 24.86, 67.0, k=1)] == [drivers[3]]
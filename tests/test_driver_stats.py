@@ -0,0 +1,182 @@
+import os
+import random
+
+import pytest
+
+from db import database
+from db.database import DB, rebuild_driver_stats
+from utils.helper import now_ts
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DB(str(tmp_path / "app.db"))
+
+
+def stats(db):
+    """driver_stats as maintained, and as rebuilt from scratch; all-zero rows count as absent."""
+    def rows():
+        return {
+            r[0]: (r[1], round(r[2], 6), r[3], r[4])
+            for r in db.conn.execute("SELECT * FROM driver_stats")
+            if any(r[1:])
+        }
+    kept = rows()
+    db.conn.execute("SAVEPOINT rebuild")
+    rebuild_driver_stats(db.conn.cursor())
+    rebuilt = rows()
+    db.conn.execute("ROLLBACK TO rebuild")
+    db.conn.execute("RELEASE rebuild")
+    return kept, rebuilt
+
+
+def assert_consistent(db):
+    kept, rebuilt = stats(db)
+    assert kept == rebuilt
+
+
+def new_ride(db, price=100.0, **kw):
+    fields = dict(user_id=1, pickup_lat=24.86, pickup_lon=67.0, drop_lat=24.9, drop_lon=67.05,
+                  status="Assigned", created_at=now_ts(), est_price=price)
+    fields.update(kw)
+    return db.add_ride(**fields)
+
+
+def driver(db, i):
+    return db.create_driver(f"d{i}", f"d{i}@x", "p", "m", "m", f"P-{i}")
+
+
+def test_claim_complete_and_feedback(db):
+    d = driver(db, 1)
+    ride = new_ride(db, 250.0)
+    assert db.claim_ride(ride, d)
+    assert_consistent(db)
+    db.update_ride_tracking(ride, 5, "Completed")
+    db.add_feedback(1, ride, 4, "")
+    db.add_feedback(1, ride, None, "no rating")
+    assert db.driver_earnings_summary(d)["rides"] == 1
+    assert db.driver_earnings_summary(d)["earnings"] == 250.0
+    assert_consistent(db)
+
+
+def test_ride_leaving_completed_and_edits_after_completion(db):
+    d1, d2 = driver(db, 1), driver(db, 2)
+    ride = new_ride(db, 300.0)
+    db.claim_ride(ride, d1)
+    db.update_ride_tracking(ride, 5, "Completed")
+    db.add_feedback(1, ride, 5, "")
+    db.conn.execute("UPDATE rides SET est_price=320 WHERE id=?", (ride,))
+    assert_consistent(db)
+    db.conn.execute("UPDATE rides SET driver_id=? WHERE id=?", (d2, ride))
+    assert_consistent(db)
+    db.conn.execute("UPDATE rides SET status='In-Progress' WHERE id=?", (ride,))
+    assert_consistent(db)
+    db.conn.execute("UPDATE rides SET status='Completed', est_price=NULL WHERE id=?", (ride,))
+    assert_consistent(db)
+    db.conn.execute("UPDATE rides SET driver_id=NULL WHERE id=?", (ride,))
+    assert_consistent(db)
+
+
+def test_feedback_edits_and_ride_delete(db):
+    d = driver(db, 1)
+    rides = [new_ride(db, 100.0 + i) for i in range(3)]
+    for ride in rides:
+        db.conn.execute("UPDATE rides SET driver_id=?, status='Completed' WHERE id=?", (d, ride))
+        db.add_feedback(1, ride, 3, "")
+    db.conn.execute("UPDATE feedback SET rating=1 WHERE ride_id=?", (rides[0],))
+    db.conn.execute("UPDATE feedback SET ride_id=? WHERE ride_id=?", (rides[2], rides[1]))
+    assert_consistent(db)
+    db.conn.execute("DELETE FROM feedback WHERE ride_id=?", (rides[0],))
+    assert_consistent(db)
+    db.delete_ride(rides[2])
+    assert_consistent(db)
+
+
+def test_driver_delete(db):
+    d1, d2 = driver(db, 1), driver(db, 2)
+    ride = new_ride(db, 90.0, driver_id=d1, status="Completed")
+    db.add_feedback(1, ride, 2, "")
+    new_ride(db, 80.0, driver_id=d2, status="Completed")
+    db.conn.execute("DELETE FROM drivers WHERE id=?", (d1,))
+    assert_consistent(db)
+    # The deleted driver's rides can still change without bringing its row back
+    db.conn.execute("UPDATE rides SET est_price=95 WHERE id=?", (ride,))
+    db.add_feedback(1, ride, 5, "")
+    assert_consistent(db)
+
+
+def test_random_workload_matches_rebuild(db):
+    rng = random.Random(19)
+    drivers = [driver(db, i) for i in range(5)]
+    rides = [new_ride(db, rng.choice([None, 50.0, 120.5])) for _ in range(30)]
+    statuses = ["Scheduled", "Assigned", "In-Progress", "Completed", "Cancelled"]
+    for _ in range(400):
+        op = rng.randrange(7)
+        ride = rng.choice(rides)
+        if op == 0:
+            db.conn.execute("UPDATE rides SET status=? WHERE id=?", (rng.choice(statuses), ride))
+        elif op == 1:
+            db.conn.execute("UPDATE rides SET driver_id=? WHERE id=?", (rng.choice(drivers + [None]), ride))
+        elif op == 2:
+            db.conn.execute("UPDATE rides SET est_price=? WHERE id=?", (rng.choice([None, 70.0, 99.9]), ride))
+        elif op == 3:
+            db.add_feedback(1, ride, rng.choice([None, 1, 3, 5]), "")
+        elif op == 4:
+            db.conn.execute("UPDATE feedback SET rating=? WHERE id IN (SELECT id FROM feedback ORDER BY random() LIMIT 1)",
+                            (rng.choice([None, 2, 4]),))
+        elif op == 5:
+            db.conn.execute("DELETE FROM feedback WHERE id IN (SELECT id FROM feedback ORDER BY random() LIMIT 1)")
+        elif rng.random() < 0.2:
+            db.delete_ride(ride)
+            rides.remove(ride)
+            rides.append(new_ride(db, 60.0, driver_id=rng.choice(drivers), status=rng.choice(statuses)))
+        assert_consistent(db)
+    db.conn.execute("DELETE FROM drivers WHERE id=?", (drivers[0],))
+    assert_consistent(db)
+
+
+def test_upgrade_replaces_the_old_triggers(tmp_path):
+    path = str(tmp_path / "old.db")
+    db = DB(path)
+    d = driver(db, 1)
+    ride = new_ride(db, 100.0, driver_id=d, status="Completed")
+    # Roll back to a v9 database: the old completion trigger and a drifted stats row
+    for (name,) in db.conn.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE 'trg_driver_stats%'").fetchall():
+        db.conn.execute(f"DROP TRIGGER {name}")
+    db.conn.execute(
+        "CREATE TRIGGER trg_driver_stats_ride_completed AFTER UPDATE OF status ON rides "
+        "WHEN NEW.status = 'Completed' BEGIN SELECT 1; END"
+    )
+    db.conn.execute("UPDATE driver_stats SET rides_completed = 7")
+    db.conn.execute("PRAGMA user_version=9")
+    db.conn.commit()
+    database._migrated.discard(os.path.abspath(path))
+
+    db = DB(path)
+    assert db.conn.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+    names = {r[0] for r in db.conn.execute("SELECT name FROM sqlite_master WHERE type='trigger'")}
+    assert names >= {"trg_driver_stats_ride_reassigned", "trg_driver_stats_feedback_removed"}
+    assert db.driver_earnings_summary(d)["rides"] == 1
+    db.conn.execute("UPDATE rides SET status='Cancelled' WHERE id=?", (ride,))
+    assert_consistent(db)
+
+
+def test_earnings_since_count_by_completion_time(db):
+    d = driver(db, 1)
+    old_booking = new_ride(db, 100.0, driver_id=d, status="In-Progress", created_at="2024-01-01 08:00:00")
+    done_early = new_ride(db, 40.0, driver_id=d, status="In-Progress", created_at="2024-01-03 08:00:00")
+    db.update_ride_tracking(old_booking, 9, "Completed")
+    db.update_ride_tracking(done_early, 9, "Completed")
+    db.conn.execute("UPDATE rides SET last_update_at='2024-01-02 09:00:00' WHERE id=?", (done_early,))
+    db.conn.commit()
+    # A position write after completion does not move the completion time
+    db.update_ride_tracking(done_early, 3)
+
+    since = "2024-01-03 00:00:00"
+    summary = db.driver_earnings_summary(d, since=since)
+    assert (summary["rides"], summary["earnings"]) == (1, 100.0)
+    assert db.driver_earnings_summary(d)["rides"] == 2
+    plan = " ".join(r[3] for r in db.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT COUNT(*), SUM(est_price) FROM rides "
+        "WHERE driver_id=? AND status='Completed' AND last_update_at>=?", (d, since)))
+    assert "COVERING INDEX idx_rides_driver_status_updated" in plan
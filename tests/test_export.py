@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from db import export
+from db.database import DB
+from utils.helper import now_ts
+
+FRAMES = [
+    (export.users_frame, export.USERS_DTYPES),
+    (export.drivers_frame, export.DRIVERS_DTYPES),
+    (export.feedback_frame, export.FEEDBACK_DTYPES),
+    (export.driver_ratings_frame, export.DRIVER_RATINGS_DTYPES),
+    (lambda conn: export.rollup_frame(conn, "hour", "2024-01-01", "2024-01-02"), export.ROLLUP_DTYPES),
+    (lambda conn: export.rollup_frame(conn, "day", "2024-01-01", "2024-01-02"), export.ROLLUP_DTYPES),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DB(str(tmp_path / "app.db"))
+
+
+def dtypes(frame):
+    return {col: str(dt) for col, dt in frame.dtypes.items()}
+
+
+@pytest.mark.parametrize("frame,expected", FRAMES)
+def test_empty_results_keep_the_dtypes(db, frame, expected):
+    df = frame(db.conn)
+    assert df.empty
+    assert dtypes(df) == expected
+
+
+def test_chunked_read_matches_one_chunk(db):
+    for i in range(10):
+        db.create_user(f"u{i}", f"u{i}@x", "p")
+    whole = export.read_frame(db.conn, export.USERS_SQL, export.USERS_DTYPES)
+    for chunk_rows in (1, 3, 10):
+        chunked = export.read_frame(db.conn, export.USERS_SQL, export.USERS_DTYPES, chunk_rows=chunk_rows)
+        pd.testing.assert_frame_equal(chunked, whole)
+    assert whole["id"].tolist() == list(range(10, 0, -1))
+    assert dtypes(whole) == export.USERS_DTYPES
+
+
+def test_drivers_car_label_and_availability(db):
+    db.create_driver("full", "full@x", "p", "Toyota", "Corolla", "ABC-1")
+    db.create_driver("bare", "bare@x", "p", None, None, None)
+    db.conn.execute("UPDATE drivers SET is_available = 0 WHERE name = 'bare'")
+    db.conn.commit()
+    df = export.drivers_frame(db.conn)
+    assert dtypes(df) == export.DRIVERS_DTYPES
+    assert df["car"].tolist() == ["  ()", "Toyota Corolla (ABC-1)"]
+    assert df["is_available"].tolist() == [False, True]
+
+
+def test_feedback_labels_and_nullable_rating(db):
+    user = db.create_user("rider", "rider@x", "p")
+    driver = db.create_driver("dee", "dee@x", "p", "m", "m", "P-1")
+    common = dict(user_id=user, pickup_lat=24.86, pickup_lon=67.0, drop_lat=24.9, drop_lon=67.05,
+                  created_at=now_ts(), est_price=100.0)
+    assigned = db.add_ride(pickup_text="Home", dropoff_text="Work", status="Completed", driver_id=driver, **common)
+    open_ride = db.add_ride(pickup_text="Mall", dropoff_text="Park", status="Requested", **common)
+    db.add_feedback(user, assigned, 4, "fine")
+    db.add_feedback(user, open_ride, None, "never came")
+    db.add_feedback(99, assigned, 2, "ghost")
+    df = export.feedback_frame(db.conn).sort_values("id", ignore_index=True)
+    assert dtypes(df) == export.FEEDBACK_DTYPES
+    assert df["user"].tolist() == ["rider", "rider", "99"]
+    assert df["driver"].tolist() == ["dee", "—", "dee"]
+    assert df["ride"].tolist() == ["Home → Work", "Mall → Park", "Home → Work"]
+    assert df["rating"].isna().tolist() == [False, True, False]
+    assert df["rating"].dropna().tolist() == [4, 2]
+
+    ratings = export.driver_ratings_frame(db.conn)
+    assert dtypes(ratings) == export.DRIVER_RATINGS_DTYPES
+    assert ratings.to_dict("records") == [{"driver_id": driver, "name": "dee", "avg_rating": 3.0, "count": 2}]
+
+
+def test_rollup_window_is_half_open(db):
+    rows = [("2024-01-01T00:00", 1), ("2024-01-01T23:00", 2), ("2024-01-02T00:00", 3)]
+    db.conn.executemany(
+        "INSERT INTO rollup_hourly VALUES (?, 'eco4', 'Basic', 'Completed', ?, 10.0, 2.0, 5.0)", rows
+    )
+    db.conn.commit()
+    df = export.rollup_frame(db.conn, "hour", "2024-01-01", "2024-01-02")
+    assert dtypes(df) == export.ROLLUP_DTYPES
+    assert df["bucket"].tolist() == ["2024-01-01T00:00", "2024-01-01T23:00"]
+    assert df["rides"].tolist() == [1, 2]
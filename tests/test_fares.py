@@ -0,0 +1,63 @@
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from config.constants import FARE_TIERS
+from model.vehicle import VEHICLES, VehicleCatalog
+from utils.helper import calc_fare, calc_fares
+
+CATALOG = VehicleCatalog(VEHICLES, version=1)
+
+
+def scalar(code, tier, km, minutes, pax):
+    """calc_fare's answer for one row: the price, or None where it raises or the code is unknown."""
+    vehicle = CATALOG.get(code) if code in CATALOG.code_index else None
+    if vehicle is None:
+        return None
+    try:
+        return calc_fare(vehicle, tier, km, minutes, pax)
+    except ValueError:
+        return None
+
+
+def test_matches_calc_fare_row_by_row():
+    codes = [v.code for v in VEHICLES] + ["nope", ""]
+    tiers = list(FARE_TIERS) + ["Platinum"]
+    rows = [
+        (code, tier, km, minutes, pax)
+        for code, tier in itertools.product(codes, tiers)
+        for km, minutes, pax in [(0.0, 0.0, 1), (7.3, 18.5, 4), (42.0, 75.0, 6), (3.1, 9.0, 13)]
+    ]
+    prices, valid = calc_fares(*zip(*rows), catalog=CATALOG)
+    assert prices.shape == valid.shape == (len(rows),)
+    for row, price, ok in zip(rows, prices, valid):
+        expected = scalar(*row)
+        if expected is None:
+            assert not ok and math.isnan(price), row
+        else:
+            assert ok and price == pytest.approx(expected, rel=1e-12), row
+
+
+def test_unknown_tier_prices_at_one():
+    v = VEHICLES[0]
+    prices, valid = calc_fares([v.code], ["Platinum"], [10.0], [20.0], [1], catalog=CATALOG)
+    assert valid.tolist() == [True]
+    assert prices[0] == calc_fare(v, "Platinum", 10.0, 20.0, 1) == v.base_per_km * 10 + v.per_min * 20
+
+
+def test_capacity_is_inclusive():
+    v = VEHICLES[0]
+    prices, valid = calc_fares([v.code] * 2, ["Basic"] * 2, [5.0] * 2, [10.0] * 2,
+                               [v.capacity, v.capacity + 1], catalog=CATALOG)
+    assert valid.tolist() == [True, False]
+    assert prices[0] == calc_fare(v, "Basic", 5.0, 10.0, v.capacity)
+    with pytest.raises(ValueError):
+        calc_fare(v, "Basic", 5.0, 10.0, v.capacity + 1)
+
+
+def test_empty_input():
+    prices, valid = calc_fares([], [], [], [], [], catalog=CATALOG)
+    assert prices.shape == valid.shape == (0,)
+    assert prices.dtype == np.float64 and valid.dtype == bool
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from geocoding import gazetteer as gz
+from geocoding.gazetteer import Gazetteer, build, read_places
+
+ROWS = [
+    ("name", "lat", "lon", "importance"),
+    ("Saddar, Karachi", "24.8556", "67.0234", "0.9"),
+    ("Saddar Bazaar, Rawalpindi", "33.5973", "73.0479", "0.6"),
+    ("Clifton, Karachi", "24.8138", "67.0300", "0.8"),
+    ("Clifton Beach, Karachi", "24.7937", "67.0340", "0.7"),
+    ("Gulshan-e-Iqbal, Karachi", "24.9204", "67.0932", "0.5"),
+    ("Gulberg, Lahore", "31.5204", "74.3587", "0.75"),
+    ("Karachi Cantonment", "24.8425", "67.0455", "0.4"),
+    ("Model Town, Lahore", "31.4834", "74.3249", "0.3"),
+    ("no coordinates", "", "", "1.0"),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    src = tmp_path / "places.csv"
+    src.write_text("\n".join(",".join(f'"{c}"' for c in row) for row in ROWS) + "\n", encoding="utf-8")
+    out = str(tmp_path / "gazetteer.idx")
+    assert build(read_places(str(src)), out) == len(ROWS) - 2
+    return Gazetteer(out)
+
+
+def names(hits):
+    return [h[0] for h in hits]
+
+
+def test_exact_match_ranks_by_importance(index):
+    assert names(index.search("karachi", limit=10)) == [
+        "Saddar, Karachi", "Clifton, Karachi", "Clifton Beach, Karachi",
+        "Gulshan-e-Iqbal, Karachi", "Karachi Cantonment",
+    ]
+    assert index.geocode("Model Town") == ("Model Town, Lahore", 31.4834, 74.3249)
+
+
+def test_last_token_is_a_prefix(index):
+    assert names(index.search("gul")) == ["Gulberg, Lahore", "Gulshan-e-Iqbal, Karachi"]
+    # A full-word match beats a place that only completes the token
+    assert names(index.search("clifton b")) == ["Clifton Beach, Karachi"]
+
+
+def test_exact_token_ranks_before_completions(index):
+    assert names(index.search("saddar")) == ["Saddar, Karachi", "Saddar Bazaar, Rawalpindi"]
+
+
+def test_misspelt_token_matches_by_trigrams(index):
+    assert names(index.search("sadar karachi")) == ["Saddar, Karachi"]
+    assert names(index.search("clifon karachi")) == ["Clifton, Karachi", "Clifton Beach, Karachi"]
+
+
+def test_multi_token_query_needs_every_token(index):
+    assert names(index.search("karachi clifton")) == ["Clifton, Karachi", "Clifton Beach, Karachi"]
+    assert names(index.search("lahore town")) == ["Model Town, Lahore"]
+    assert index.search("zzzz lahore") == []
+    assert index.search("   ") == []
+    assert index.search("karachi", limit=0) == []
+
+
+def test_names_keep_rank_order(index):
+    assert [index.place(i)[0] for i in range(len(index))][:3] == [
+        "Saddar, Karachi", "Clifton, Karachi", "Gulberg, Lahore",
+    ]
+
+
+def test_missing_index_is_not_memoized(tmp_path, index):
+    path = str(tmp_path / "later.idx")
+    assert gz.gazetteer(path) is None
+    os.link(index.path, path)
+    found = gz.gazetteer(path)
+    assert found is not None and found.geocode("clifton")[0] == "Clifton, Karachi"
+    assert gz.gazetteer(path) is found
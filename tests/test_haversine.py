@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+import pytest
+
+from geocoding.geocode import (
+    haversine_km, haversine_matrix, haversine_pairs, haversine_to_many, path_length_km,
+)
+
+
+def points(n, seed):
+    rng = random.Random(seed)
+    # Karachi-sized spread plus a few long-haul and antipodal-ish points
+    pts = [(24.86 + rng.uniform(-0.3, 0.3), 67.01 + rng.uniform(-0.3, 0.3)) for _ in range(n)]
+    pts += [(rng.uniform(-89, 89), rng.uniform(-180, 180)) for _ in range(n // 4)]
+    pts += [(0.0, 0.0), (0.0, 179.9), (24.86, 67.01)]
+    return pts
+
+
+def test_pairs_match_scalar():
+    a, b = points(200, 1), points(200, 2)
+    got = haversine_pairs(a, b)
+    assert got.shape == (len(a),)
+    for km, p, q in zip(got, a, b):
+        assert km == pytest.approx(haversine_km(p, q), rel=1e-12, abs=1e-12)
+
+
+def test_to_many_and_matrix_match_scalar():
+    a, b = points(40, 3), points(30, 4)
+    many = haversine_to_many(a[0], b)
+    assert many.tolist() == pytest.approx([haversine_km(a[0], q) for q in b], rel=1e-12, abs=1e-12)
+    m = haversine_matrix(a, b)
+    assert m.shape == (len(a), len(b))
+    for i, p in enumerate(a):
+        assert m[i].tolist() == pytest.approx([haversine_km(p, q) for q in b], rel=1e-12, abs=1e-12)
+
+
+def test_flat_buffers_are_accepted():
+    a = points(10, 5)
+    flat = np.array(a, dtype=np.float64).ravel()
+    assert haversine_to_many(a[0], flat).tolist() == haversine_to_many(a[0], a).tolist()
+    assert path_length_km(flat) == path_length_km(a)
+
+
+def test_path_length_matches_scalar_sum():
+    track = points(50, 6)
+    expected = sum(haversine_km(p, q) for p, q in zip(track, track[1:]))
+    assert path_length_km(track) == pytest.approx(expected, rel=1e-12)
+
+
+def test_path_length_of_degenerate_tracks():
+    assert path_length_km([]) == 0.0
+    assert path_length_km(np.empty(0)) == 0.0
+    assert path_length_km([(24.86, 67.01)]) == 0.0
+    assert path_length_km([(24.86, 67.01), (24.86, 67.01)]) == 0.0
+
+
+def test_empty_inputs_give_empty_results():
+    assert haversine_pairs([], []).shape == (0,)
+    assert haversine_to_many((24.86, 67.01), []).shape == (0,)
+    b = points(3, 7)
+    assert haversine_matrix([], b).shape == (0, len(b))
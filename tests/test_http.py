@@ -0,0 +1,128 @@
+import time
+
+import pytest
+import requests
+
+from geocoding import http
+from geocoding.http import CircuitBreaker, Endpoint
+
+
+class FakeResponse:
+    def __init__(self, status, body=None, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self._body = body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    """Answers GETs from a script of responses (or exceptions), recording each call's timeout."""
+
+    def __init__(self, *script, latency=0.0):
+        self.script = list(script)
+        self.latency = latency
+        self.timeouts = []
+
+    def get(self, url, params=None, timeout=None):
+        self.timeouts.append(timeout)
+        time.sleep(self.latency)
+        step = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def install(*script, latency=0.0):
+        s = FakeSession(*script, latency=latency)
+        monkeypatch.setattr(http, "session", lambda: s)
+        return s
+    return install
+
+
+def endpoint(retries=2, deadline=5.0, **breaker):
+    return Endpoint("test", (1.0, 2.0), retries, deadline, backoff=0.0, breaker=CircuitBreaker(**breaker))
+
+
+def test_breaker_opens_half_opens_and_closes():
+    b = CircuitBreaker(failures=3, reset_after=0.05)
+    for _ in range(2):
+        assert b.allow()
+        b.record_failure()
+    assert not b.is_open
+    b.record_failure()
+    assert b.is_open and not b.allow()
+    time.sleep(0.06)
+    # Half open: exactly one probe goes through
+    assert not b.is_open
+    assert b.allow()
+    assert not b.allow()
+    b.record_failure()
+    assert b.is_open and not b.allow()
+    time.sleep(0.06)
+    assert b.allow()
+    b.record_success()
+    assert not b.is_open
+    assert b.allow() and b.allow()
+
+
+@pytest.mark.parametrize("status", sorted(http.RETRY_STATUS))
+def test_retryable_status_is_retried(fake, status):
+    s = fake(FakeResponse(status), FakeResponse(200, {"ok": 1}))
+    ep = endpoint()
+    assert ep.get_json("http://x") == {"ok": 1}
+    assert len(s.timeouts) == 2
+    assert ep.breaker._errors == 0
+
+
+def test_connection_errors_are_retried_then_recorded(fake):
+    s = fake(requests.ConnectionError("refused"))
+    ep = endpoint(retries=2, failures=1)
+    assert ep.get_json("http://x") is None
+    assert len(s.timeouts) == 3
+    assert ep.breaker.is_open
+    # An open breaker short-circuits without calling out
+    assert ep.get_json("http://x") is None
+    assert len(s.timeouts) == 3
+
+
+def test_client_error_is_not_retried_and_not_a_failure(fake):
+    s = fake(FakeResponse(404))
+    ep = endpoint(failures=1)
+    assert ep.get_json("http://x") is None
+    assert len(s.timeouts) == 1
+    assert not ep.breaker.is_open
+
+
+def test_deadline_caps_attempts_and_timeouts(fake):
+    s = fake(FakeResponse(503), latency=0.1)
+    ep = endpoint(retries=20, deadline=0.25)
+    started = time.monotonic()
+    assert ep.get_json("http://x") is None
+    assert time.monotonic() - started < 0.6
+    assert len(s.timeouts) == 3
+    # Later attempts only get the time that is left
+    assert s.timeouts[0] == pytest.approx((0.25, 0.25), abs=0.01)
+    assert s.timeouts[1][1] < 0.2 and s.timeouts[2][1] < 0.1
+
+
+def test_short_calls_keep_the_configured_timeouts(fake):
+    s = fake(FakeResponse(200, {}))
+    assert endpoint(deadline=5.0).get_json("http://x") == {}
+    assert s.timeouts == [(1.0, 2.0)]
+
+
+def test_retry_after_past_the_deadline_gives_up(fake):
+    s = fake(FakeResponse(429, headers={"Retry-After": "3"}), FakeResponse(200, {}))
+    ep = endpoint(retries=2, deadline=1.0)
+    started = time.monotonic()
+    assert ep.get_json("http://x") is None
+    assert time.monotonic() - started < 0.5
+    assert len(s.timeouts) == 1
@@ -0,0 +1,44 @@
+import json
+
+from streamlit.testing.v1 import AppTest
+
+
+def _app():
+    import streamlit as st
+
+    from utils.maps import show_route_map
+
+    route = [(24.86 + i * 1e-3, 67.0 + i * 1e-3) for i in range(50)]
+    show_route_map("test_moving_marker", route[0], route[-1], route,
+                   marker=st.session_state.get("marker"), marker_tooltip="Driver")
+
+
+def _component_args(at):
+    (map_element,) = at.get("component_instance")
+    assert map_element.proto.component_name == "streamlit_folium.st_folium"
+    return json.loads(map_element.proto.json_args)
+
+
+def test_moving_marker_only_changes_the_feature_group():
+    at = AppTest.from_function(_app)
+    sent = []
+    for marker in [(24.87, 67.01), (24.87, 67.01), (24.88, 67.02), (24.89, 67.03)]:
+        at.session_state["marker"] = marker
+        at.run()
+        assert not at.exception
+        sent.append(_component_args(at))
+    base = [{k: v for k, v in args.items() if k != "feature_group"} for args in sent]
+    assert all(b == base[0] for b in base)
+    groups = [args["feature_group"] for args in sent]
+    assert groups[0] == groups[1] != groups[2] != groups[3]
+    assert "24.89" in groups[3] and "Driver" in groups[3]
+    # The marker lives only in the feature group; no earlier one is baked into the shared map
+    assert not any(lat in sent[-1]["script"] for lat in ("24.87", "24.88", "24.89"))
+
+
+def test_map_without_marker_sends_an_empty_layer():
+    at = AppTest.from_function(_app).run()
+    assert not at.exception
+    args = _component_args(at)
+    assert "circle_marker" not in args["feature_group"]
+    assert "poly_line" in args["script"]
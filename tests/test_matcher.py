@@ -0,0 +1,69 @@
+import itertools
+
+import numpy as np
+
+import services.matcher as matcher
+from db.database import DB
+from utils.helper import now_ts
+
+
+def _ride(db, lat, lon):
+    return db.add_ride(user_id=1, pickup_lat=lat, pickup_lon=lon, drop_lat=lat, drop_lon=lon + 0.01,
+                       status="Assigned", created_at=now_ts())
+
+
+def _active(db, driver_id):
+    return db.conn.execute(
+        "SELECT id FROM rides WHERE driver_id=? AND status IN ('Assigned', 'In-Progress')", (driver_id,)
+    ).fetchall()
+
+
+def test_auction_is_within_its_bound_of_the_optimum():
+    rng = np.random.default_rng(7)
+    rides = np.c_[24.8 + rng.random(6) * 0.1, 67.0 + rng.random(6) * 0.1]
+    drivers = np.c_[24.8 + rng.random(5) * 0.1, 67.0 + rng.random(5) * 0.1]
+    cand, cost = matcher.nearest_candidates(rides, drivers, k=5)
+    skip, eps = 15.0, 0.01
+    match = matcher.auction_assign(cand, cost, skip_cost=skip, eps_final=eps)
+    km = {(i, j): c for i in range(6) for j, c in zip(cand[i], cost[i]) if j >= 0}
+
+    def total(assignment):
+        return sum(km[i, j] if j >= 0 else skip for i, j in enumerate(assignment))
+
+    # Every way of giving the rides distinct drivers or none
+    best = min(total(p) for p in itertools.permutations(list(range(5)) + [-1] * 6, 6))
+    assert len(set(j for j in match if j >= 0)) == sum(match >= 0)
+    assert total(match) <= best + (6 + 5) * eps
+
+
+def test_matches_nearest_driver(tmp_path):
+    db = DB(str(tmp_path / "app.db"))
+    near = db.create_driver("a", "a@x", "p", "m", "m", "A-1")
+    far = db.create_driver("b", "b@x", "p", "m", "m", "B-1")
+    db.set_driver_location(near, 24.86, 67.00)
+    db.set_driver_location(far, 24.90, 67.05)
+    ride = _ride(db, 24.861, 67.001)
+    assert matcher.match_pending(db.conn) == 1
+    assert [r["id"] for r in _active(db, near)] == [ride]
+    assert _active(db, far) == []
+
+
+def test_driver_claiming_mid_match_is_not_assigned_twice(tmp_path, monkeypatch):
+    path = str(tmp_path / "app.db")
+    db = DB(path)
+    driver = db.create_driver("a", "a@x", "p", "m", "m", "A-1")
+    db.set_driver_location(driver, 24.86, 67.00)
+    matched = _ride(db, 24.861, 67.001)
+    claimed = _ride(db, 24.87, 67.01)
+    auction = matcher.auction_assign
+
+    def claim_then_auction(*args, **kw):
+        # The driver takes a ride from the queue after the matcher read the idle drivers
+        assert DB(path).claim_ride(claimed, driver)
+        return auction(*args, **kw)
+
+    monkeypatch.setattr(matcher, "auction_assign", claim_then_auction)
+    assert matcher.match_pending(db.conn) == 0
+    assert [r["id"] for r in _active(db, driver)] == [claimed]
+    row = db.conn.execute("SELECT driver_id FROM rides WHERE id=?", (matched,)).fetchone()
+    assert row["driver_id"] is None
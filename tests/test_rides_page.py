@@ -0,0 +1,71 @@
+import itertools
+import random
+
+import pytest
+
+from db.database import DB
+
+STATUSES = ["Requested", "Assigned", "Completed", "Cancelled"]
+# Few distinct timestamps, so most rides tie on created_at and only the id breaks the tie
+STAMPS = ["2024-01-01 08:00:00", "2024-01-01 09:30:00", "2024-01-02 08:00:00", "2024-01-03 12:00:00"]
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    db = DB(str(tmp_path_factory.mktemp("rides") / "app.db"))
+    for i in (1, 2, 3):
+        db.create_user(f"u{i}", f"u{i}@x", "p")
+    for i in (1, 2):
+        db.create_driver(f"d{i}", f"d{i}@x", "p", "m", "m", f"P-{i}")
+    rng = random.Random(7)
+    for _ in range(60):
+        db.add_ride(user_id=rng.choice([1, 2, 3]), driver_id=rng.choice([None, 1, 2]),
+                    pickup_lat=24.86, pickup_lon=67.0, drop_lat=24.9, drop_lon=67.05,
+                    status=rng.choice(STATUSES), created_at=rng.choice(STAMPS), est_price=100.0)
+    return db
+
+
+def expected(db, status=None, user_id=None, driver_id=None, since=None, until=None):
+    rows = db.conn.execute("SELECT id, created_at, status, user_id, driver_id FROM rides").fetchall()
+    keep = [
+        r for r in rows
+        if (status is None or r["status"] == status)
+        and (user_id is None or r["user_id"] == user_id)
+        and (driver_id is None or r["driver_id"] == driver_id)
+        and (since is None or r["created_at"] >= since)
+        and (until is None or r["created_at"] < until)
+    ]
+    return [r["id"] for r in sorted(keep, key=lambda r: (r["created_at"], r["id"]), reverse=True)]
+
+
+def walk(db, limit, **filters):
+    ids, after = [], None
+    while True:
+        page = db.list_rides_page(limit=limit, after=after, **filters)
+        assert len(page) <= limit
+        ids += [r["id"] for r in page]
+        if len(page) < limit:
+            return ids
+        after = (page[-1]["created_at"], page[-1]["id"])
+
+
+FILTERS = list(itertools.product(
+    [None, "Completed", "Requested"],
+    [None, 2],
+    [None, 1],
+    [(None, None), (STAMPS[1], None), (None, STAMPS[2]), (STAMPS[1], STAMPS[3])],
+))
+
+
+@pytest.mark.parametrize("status,user_id,driver_id,window", FILTERS)
+@pytest.mark.parametrize("limit", [1, 4, 60])
+def test_pages_cover_the_full_ordering(db, limit, status, user_id, driver_id, window):
+    filters = dict(status=status, user_id=user_id, driver_id=driver_id, since=window[0], until=window[1])
+    assert walk(db, limit, **filters) == expected(db, **filters)
+
+
+def test_cursor_inside_a_tie_resumes_after_it(db):
+    ties = expected(db, since=STAMPS[0], until=STAMPS[1])
+    assert len(ties) > 2
+    rest = db.list_rides_page(limit=100, after=(STAMPS[0], ties[1]))
+    assert [r["id"] for r in rest] == ties[2:]
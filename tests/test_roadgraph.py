@@ -0,0 +1,158 @@
+import heapq
+import math
+import random
+
+import numpy as np
+import pytest
+
+from config.constants import ROUTER_MAX_SNAP_M
+from geocoding.binfile import SectionFile, write_sections
+from geocoding.roadgraph import KIND, RoadGraph, build, read_osm
+
+SIDE = 7
+
+
+def _write_osm(path):
+    """A jittered SIDE x SIDE street grid: two-way border, one-way rows and columns inside, one footpath."""
+    rng = random.Random(5)
+    lines = ['<?xml version="1.0"?>', '<osm version="0.6">']
+    for i in range(SIDE):
+        for j in range(SIDE):
+            lat = 24.85 + i * 0.003 + rng.uniform(-6e-4, 6e-4)
+            lon = 67.0 + j * 0.003 + rng.uniform(-6e-4, 6e-4)
+            lines.append(f'<node id="{i * SIDE + j + 1}" lat="{lat:.7f}" lon="{lon:.7f}"/>')
+    classes = ["residential", "secondary", "primary", "tertiary"]
+    way = 0
+
+    def add(refs, **tags):
+        nonlocal way
+        way += 1
+        lines.append(f'<way id="{way}">')
+        lines.extend(f'<nd ref="{r}"/>' for r in refs)
+        lines.extend(f'<tag k="{k}" v="{v}"/>' for k, v in tags.items())
+        lines.append("</way>")
+
+    for i in range(SIDE):
+        row = [i * SIDE + j + 1 for j in range(SIDE)]
+        tags = {"highway": classes[i % 4]}
+        if 0 < i < SIDE - 1:
+            tags["oneway"] = "yes" if i % 2 else "-1"
+        add(row, **tags)
+    for j in range(SIDE):
+        col = [i * SIDE + j + 1 for i in range(SIDE)]
+        tags = {"highway": classes[(j + 1) % 4], "maxspeed": f"{20 + 5 * j}"}
+        if j == 3:
+            tags["oneway"] = "yes"
+        add(col, **tags)
+    add([1, SIDE * SIDE], highway="footway")
+    lines.append("</osm>")
+    path.write_text("\n".join(lines))
+
+
+@pytest.fixture(scope="module")
+def graph_path(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("roads")
+    osm = tmp / "grid.osm"
+    _write_osm(osm)
+    out = str(tmp / "roads.graph")
+    build(*read_osm(str(osm)), out)
+    return out
+
+
+def _dijkstra(f, s):
+    """Plain Dijkstra over the stored (uncontracted) edges: seconds and parent edge per node."""
+    src, dst, seconds = f.array("src"), f.array("dst"), f.array("seconds").astype(np.float64)
+    dist, parent = {s: 0.0}, {}
+    heap = [(0.0, s)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        for e in np.flatnonzero(src == u).tolist():
+            v, nd = int(dst[e]), d + seconds[e]
+            if nd < dist.get(v, math.inf):
+                dist[v], parent[v] = nd, e
+                heapq.heappush(heap, (nd, v))
+    return dist, parent
+
+
+def test_read_osm_keeps_drivable_ways_and_directions(graph_path, tmp_path):
+    osm = tmp_path / "grid.osm"
+    _write_osm(osm)
+    nodes, ways = read_osm(str(osm))
+    assert len(nodes) == SIDE * SIDE
+    assert len(ways) == 2 * SIDE  # the footway is dropped
+    # SIDE - 2 one-way rows and one one-way column
+    assert [d for _, _, d in ways].count(0) == 2 * SIDE - (SIDE - 2) - 1
+    assert {d for _, _, d in ways} == {-1, 0, 1}
+
+
+def test_file_round_trips_through_the_section_file(graph_path):
+    graph = RoadGraph(graph_path)
+    f = SectionFile(graph_path, KIND)
+    assert graph.meta["nodes"] == len(graph) == SIDE * SIDE
+    # Every block edge is there once per direction it can be driven
+    one_way = (SIDE - 2) * (SIDE - 1) + (SIDE - 1)
+    assert graph.meta["edges"] == len(f.array("src")) == 2 * 2 * SIDE * (SIDE - 1) - one_way
+    assert f.array("up_ptr")[-1] == len(f.array("up_node"))
+    assert f.array("down_ptr")[-1] == len(f.array("down_node"))
+
+
+def test_routes_match_plain_dijkstra(graph_path):
+    graph = RoadGraph(graph_path)
+    f = SectionFile(graph_path, KIND)
+    lat, lon, dst = f.array("lat"), f.array("lon"), f.array("dst")
+    metres, seconds = f.array("metres"), f.array("seconds")
+    rng = random.Random(11)
+    for _ in range(150):
+        s, t = rng.randrange(len(graph)), rng.randrange(len(graph))
+        dist, parent = _dijkstra(f, s)
+        expected = []
+        v = t
+        while v != s:
+            expected.append(parent[v])
+            v = int(f.array("src")[parent[v]])
+        expected.reverse()
+        path = graph.shortest_path(s, t)
+        assert path == expected
+        assert [int(dst[e]) for e in path[:-1]] == [int(f.array("src")[e]) for e in path[1:]]
+        km, minutes, coords = graph.route((float(lat[s]), float(lon[s])), (float(lat[t]), float(lon[t])))
+        assert minutes * 60 == pytest.approx(dist[t], rel=1e-9, abs=1e-9)
+        assert km * 1000 == pytest.approx(float(metres[path].astype(np.float64).sum()), rel=1e-9, abs=1e-9)
+        assert minutes * 60 == pytest.approx(float(seconds[path].astype(np.float64).sum()), rel=1e-9, abs=1e-9)
+        assert coords[0] == coords[1] and coords[-1] == coords[-2]
+
+
+def test_nearest_matches_a_full_scan(graph_path):
+    graph = RoadGraph(graph_path)
+    rng = random.Random(2)
+    for _ in range(200):
+        p = (24.84 + rng.random() * 0.04, 66.99 + rng.random() * 0.04)
+        scale = math.cos(math.radians(p[0]))
+        d2 = (graph._lat - p[0]) ** 2 + ((graph._lon - p[1]) * scale) ** 2
+        assert graph.nearest(p)[0] == int(np.argmin(d2))
+    far = (25.5, 67.0)
+    assert graph.nearest(far) is not None
+    assert graph.nearest(far, max_m=ROUTER_MAX_SNAP_M) is None
+
+
+def test_off_graph_points_have_no_route(graph_path):
+    graph = RoadGraph(graph_path)
+    node = (float(graph._lat[0]), float(graph._lon[0]))
+    # Just inside and well outside the snapping radius, measured due south of the south-west corner
+    inside = (node[0] - 0.9 * ROUTER_MAX_SNAP_M / 111_195, node[1])
+    outside = (node[0] - 3 * ROUTER_MAX_SNAP_M / 111_195, node[1])
+    assert graph.route(inside, node) is not None
+    assert graph.route(outside, node) is None
+    assert graph.route(node, outside) is None
+
+
+def test_section_file_rejects_other_kinds(tmp_path):
+    path = str(tmp_path / "x.bin")
+    write_sections(path, "other", {"a": np.arange(3, dtype=np.int16), "b": b"xyz"}, n=3)
+    f = SectionFile(path, "other")
+    assert f.meta == {"n": 3}
+    assert f.array("a").tolist() == [0, 1, 2]
+    assert bytes(f.bytes("b")) == b"xyz"
+    with pytest.raises(ValueError):
+        SectionFile(path, KIND)
@@ -0,0 +1,110 @@
+import random
+import sqlite3
+
+import pytest
+
+from db.database import DB
+from services.rollups import GRAINS, apply_rollups
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DB(str(tmp_path / "app.db"))
+
+
+def rollup(db, table):
+    """Non-empty rollup cells; a cell whose rides all moved on keeps a zero row."""
+    return {
+        tuple(r[:4]): (r[4], round(r[5], 6), round(r[6], 6), round(r[7], 6))
+        for r in db.conn.execute(f"SELECT * FROM {table}")
+        if r[4]
+    }
+
+
+def grouped(db, table):
+    """The same cells computed straight from rides."""
+    return {
+        tuple(r[:4]): (r[4], round(r[5], 6), round(r[6], 6), round(r[7], 6))
+        for r in db.conn.execute(
+            f"""
+            SELECT {GRAINS[table]}, COALESCE(vehicle_code, ''), COALESCE(fare_tier, ''), status, COUNT(*),
+                   SUM(COALESCE(est_price, 0)), SUM(COALESCE(est_km, 0)), SUM(COALESCE(est_minutes, 0))
+            FROM rides WHERE created_at IS NOT NULL AND status IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+            """
+        )
+    }
+
+
+def assert_rolled_up(db):
+    for table in GRAINS:
+        assert rollup(db, table) == grouped(db, table)
+
+
+def seq_mark(db):
+    return db.conn.execute("SELECT value FROM meta WHERE key='rollup_seq'").fetchone()[0]
+
+
+def pending(db):
+    return db.conn.execute("SELECT COUNT(*) FROM ride_events").fetchone()[0]
+
+
+def apply_in_batches(db, batch):
+    """apply_rollups, also counting the batches it committed (one mark update each)."""
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        consumed = apply_rollups(db.conn, batch=batch)
+    finally:
+        db.conn.set_trace_callback(None)
+    return consumed, sum(s.startswith("UPDATE meta SET value") for s in statements)
+
+
+def test_batches_match_group_by_and_advance_the_mark(db):
+    rng = random.Random(20)
+    statuses = ["Scheduled", "Assigned", "In-Progress", "Completed", "Cancelled"]
+    rides = []
+    for _ in range(40):
+        rides.append(db.add_ride(
+            user_id=1, status=rng.choice(statuses[:2]),
+            created_at=f"2026-10-{rng.randint(1, 3):02d} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00",
+            vehicle_code=rng.choice(["MINI", "SEDAN", None]), fare_tier=rng.choice(["Standard", "Premium"]),
+            est_price=rng.choice([None, 150.0, 420.5]), est_km=rng.uniform(1, 20), est_minutes=rng.uniform(5, 60),
+        ))
+    assert pending(db) == 40
+
+    # Small batches: each one commits its share of the rollups, the mark and the pruning together
+    assert apply_in_batches(db, 7) == (40, 6)
+    assert pending(db) == 0
+    mark = seq_mark(db)
+    assert mark >= 40
+    assert_rolled_up(db)
+
+    for ride in rides:
+        for status in statuses[2:rng.randint(2, 4)]:
+            db.conn.execute("UPDATE rides SET status=? WHERE id=?", (status, ride))
+    db.conn.execute("UPDATE rides SET status='Cancelled' WHERE id=?", (rides[0],))
+    db.delete_ride(rides[1])
+    db.delete_ride(rides[2])
+    db.conn.commit()
+    n = pending(db)
+    assert n > 0
+
+    assert apply_in_batches(db, 3) == (n, -(-n // 3))
+    assert pending(db) == 0
+    assert seq_mark(db) == mark + n
+    assert_rolled_up(db)
+
+    # Nothing new: a pass is a no-op
+    assert apply_in_batches(db, 3) == (0, 0)
+    assert seq_mark(db) == mark + n
+
+
+def test_a_failed_batch_leaves_the_mark_and_events(db):
+    db.add_ride(user_id=1, status="Assigned", created_at="2026-10-01 10:00:00", vehicle_code="MINI", fare_tier="Standard")
+    before = seq_mark(db), pending(db)
+    db.conn.execute("DROP TABLE rollup_daily")
+    with pytest.raises(sqlite3.OperationalError):
+        apply_rollups(db.conn, batch=1)
+    assert (seq_mark(db), pending(db)) == before
+    assert db.conn.execute("SELECT COUNT(*) FROM rollup_hourly").fetchone()[0] == 0
@@ -0,0 +1,90 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from db.tracks import pack_track
+from geocoding.simplify import M_PER_DEG, douglas_peucker, point_along
+from utils.helper import track_position
+
+
+def wiggly_route(n=400, seed=21):
+    """A city-scale random walk with small jitter between the turns."""
+    rng = random.Random(seed)
+    lat, lon, heading = 24.86, 67.01, 0.0
+    pts = [(lat, lon)]
+    for i in range(n):
+        if i % 25 == 0:
+            heading += rng.choice([-math.pi / 2, math.pi / 2, 0.3])
+        step = rng.uniform(5, 40) / M_PER_DEG
+        lat += step * math.cos(heading) + rng.gauss(0, 1.5 / M_PER_DEG)
+        lon += step * math.sin(heading) / math.cos(math.radians(lat)) + rng.gauss(0, 1.5 / M_PER_DEG)
+        pts.append((lat, lon))
+    return pts
+
+
+def offset_m(p, line):
+    """Metres from p to the nearest point of the polyline, in the local projection."""
+    scale = math.cos(math.radians(p[0]))
+    xy = np.array([(a * M_PER_DEG, b * M_PER_DEG * scale) for a, b in line])
+    q = np.array([p[0] * M_PER_DEG, p[1] * M_PER_DEG * scale])
+    best = math.inf
+    for a, b in zip(xy[:-1], xy[1:]):
+        ab = b - a
+        t = 0.0 if not ab.any() else min(1.0, max(0.0, float(np.dot(q - a, ab) / np.dot(ab, ab))))
+        best = min(best, float(np.hypot(*(a + t * ab - q))))
+    return best
+
+
+@pytest.mark.parametrize("tolerance", [1.0, 5.0, 25.0])
+def test_douglas_peucker_keeps_endpoints_and_tolerance(tolerance):
+    route = wiggly_route()
+    out = douglas_peucker(route, tolerance)
+    assert out[0] == route[0] and out[-1] == route[-1]
+    assert 2 <= len(out) < len(route)
+    # Kept vertices are original ones, in order
+    kept = iter(route)
+    assert all(p in kept for p in out)
+    # Small slack: the bound is checked in one projection for the whole line, here per point
+    assert max(offset_m(p, out) for p in route) <= tolerance * 1.01
+
+
+def test_douglas_peucker_degenerate_inputs():
+    assert douglas_peucker([], 5.0) == []
+    assert douglas_peucker([(24.86, 67.01)], 5.0) == [(24.86, 67.01)]
+    two = [(24.86, 67.01), (24.87, 67.02)]
+    assert douglas_peucker(two, 5.0) == two
+    same = [(24.86, 67.01)] * 5
+    assert douglas_peucker(same, 5.0) == [(24.86, 67.01)] * 2
+    # Duplicates along a straight line collapse to its ends; a detour through a duplicate is kept
+    line = [(24.86, 67.01), (24.86, 67.01), (24.865, 67.01), (24.87, 67.01), (24.87, 67.01)]
+    assert douglas_peucker(line, 5.0) == [line[0], line[-1]]
+    back = [(24.86, 67.01), (24.87, 67.01), (24.86, 67.01)]
+    assert douglas_peucker(back, 5.0) == back
+    assert douglas_peucker(line, 0.0) == line
+
+
+def test_point_along_measures_distance_not_vertices():
+    # Three vertices, the first leg a tenth of the second
+    line = [(24.86, 67.0), (24.86 + 100 / M_PER_DEG, 67.0), (24.86 + 1100 / M_PER_DEG, 67.0)]
+    assert point_along(line, 0.0) == line[0]
+    assert point_along(line, 1.0) == pytest.approx(line[-1])
+    assert point_along(line, 2.0) == pytest.approx(line[-1])
+    assert point_along(line, 0.5)[0] == pytest.approx(24.86 + 550 / M_PER_DEG)
+    assert point_along([(24.86, 67.0)], 0.7) == (24.86, 67.0)
+    assert point_along([(24.86, 67.0), (24.86, 67.0)], 0.5) == (24.86, 67.0)
+
+
+def test_track_position_moves_evenly_along_uneven_vertices():
+    # A straight north-south route whose vertices bunch up near the start
+    offsets_m = [0, 5, 10, 20, 40, 80, 160, 320, 640, 1280]
+    route = [(24.86 + m / M_PER_DEG, 67.01) for m in offsets_m]
+    blob = pack_track(route)
+    n = len(route)
+    for i in range(n):
+        lat, lon = track_position(blob, i)
+        assert (lat - 24.86) * M_PER_DEG == pytest.approx(1280 * i / (n - 1), abs=0.5)
+        assert lon == pytest.approx(67.01)
+    assert track_position(route, n - 1) == pytest.approx(route[-1])
+    assert track_position(route, 0) == route[0]
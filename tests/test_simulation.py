@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from db.database import DB
+from services.simulation import RidePosition, SimulationEngine
+
+TRACK = [(24.86 + i * 1e-3, 67.0 + i * 1e-3) for i in range(50)]
+
+
+def _ts(seconds_ago):
+    return (datetime.now() - timedelta(seconds=seconds_ago)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _row(db, ride_id):
+    return db.conn.execute("SELECT status, track_idx, last_update_at FROM rides WHERE id=?", (ride_id,)).fetchone()
+
+
+def test_tick_promotes_moves_and_completes(tmp_path):
+    path = str(tmp_path / "app.db")
+    db = DB(path)
+    scheduled = db.add_ride(status="Scheduled", scheduled_at="2000-01-01 08:00", created_at=_ts(0))
+    later = db.add_ride(status="Scheduled", scheduled_at="2999-01-01 08:00", created_at=_ts(0))
+    moving = db.add_ride(track=TRACK, status="In-Progress", driver_id=1, est_minutes=30.0, track_idx=3,
+                         last_update_at=_ts(10), created_at=_ts(0))
+    arriving = db.add_ride(track=TRACK, status="In-Progress", driver_id=2, est_minutes=1.0, track_idx=40,
+                           last_update_at=_ts(3600), created_at=_ts(0))
+    unstarted = db.add_ride(track=TRACK, status="In-Progress", driver_id=3, est_minutes=5.0, created_at=_ts(0))
+
+    engine = SimulationEngine(path)
+    engine.tick()
+
+    assert _row(db, scheduled)["status"] == "Assigned"
+    assert _row(db, later)["status"] == "Scheduled"
+    moved = _row(db, moving)
+    assert moved["status"] == "In-Progress" and 3 < moved["track_idx"] < len(TRACK) - 1
+    assert _row(db, arriving)["status"] == "Completed"
+    assert _row(db, arriving)["track_idx"] == len(TRACK) - 1
+    assert _row(db, unstarted)["last_update_at"] is not None
+
+    snapshot = engine.snapshot()
+    assert set(snapshot) == {moving, arriving, unstarted}
+    assert snapshot[moving] == RidePosition(moving, "In-Progress", moved["track_idx"])
+    assert snapshot[arriving] == RidePosition(arriving, "Completed", len(TRACK) - 1)
+    assert snapshot[unstarted] == RidePosition(unstarted, "In-Progress", 0)
+    # The connection is back to the normal safety level after the status commit
+    assert engine._conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+    engine.tick()
+    assert set(engine.snapshot()) == {moving, unstarted}
+    assert _row(db, arriving)["status"] == "Completed"
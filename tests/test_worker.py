@@ -0,0 +1,52 @@
+import os
+import threading
+
+import pytest
+
+from services.worker import PathRegistry, PeriodicWorker
+
+
+class Ticker(PeriodicWorker):
+    def __init__(self, path, interval=0.01):
+        super().__init__("ticker", interval)
+        self.path = path
+        self.ticks = threading.Event()
+
+    def tick(self):
+        self.ticks.set()
+
+
+class OtherTicker(Ticker):
+    pass
+
+
+def test_registry_shares_one_object_per_file(tmp_path, monkeypatch):
+    made = []
+    registry = PathRegistry(lambda path: made.append(path) or object())
+    monkeypatch.chdir(tmp_path)
+    first = registry.get("app.db")
+    assert registry.get(str(tmp_path / "app.db")) is first
+    assert registry.get("./app.db") is first
+    assert registry.get("other.db") is not first
+    assert made == [str(tmp_path / "app.db"), str(tmp_path / "other.db")]
+
+
+def test_for_path_starts_one_worker_per_class_and_file(tmp_path):
+    path = str(tmp_path / "app.db")
+    worker = Ticker.for_path(path)
+    try:
+        assert Ticker.for_path(os.path.relpath(path)) is worker
+        assert worker.is_alive() and worker.ticks.wait(2)
+        other = OtherTicker.for_path(path)
+        assert other is not worker and isinstance(other, OtherTicker)
+        other.stop()
+    finally:
+        worker.stop()
+
+
+def test_tick_is_abstract():
+    class NoTick(PeriodicWorker):
+        pass
+
+    with pytest.raises(TypeError):
+        NoTick("no-tick", 1.0)
@@ -1,8 +1,18 @@
 from datetime import datetime
-import json
 import sqlite3
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
 from config.constants import FARE_TIERS
-from model.vehicle import VEHICLES, Vehicle
+from db.catalog import vehicle_catalog
+from db.tracks import track_array
+from geocoding.simplify import point_along
+from model.vehicle import Vehicle, VehicleCatalog
+
+# Tier lookup table with a trailing 1.0 for unknown tiers, as in calc_fare
+TIER_INDEX = {t: i for i, t in enumerate(FARE_TIERS)}
+TIER_MULT = np.array(list(FARE_TIERS.values()) + [1.0])
 
 
 def calc_fare(vehicle: Vehicle, tier: str, km: float, minutes: float, pax: int) -> float:
@@ -11,25 +21,61 @@ def calc_fare(vehicle: Vehicle, tier: str, km: float, minutes: float, pax: int)
     mult = FARE_TIERS.get(tier, 1.0)
     return (vehicle.base_per_km * km + vehicle.per_min * minutes) * mult
 
+def _codes_to_index(keys, index: dict) -> np.ndarray:
+    """Position of each key per `index` (-1 if absent), one dict lookup per distinct key."""
+    uniq, inv = np.unique(np.asarray(keys, dtype=str), return_inverse=True)
+    return np.array([index.get(k, -1) for k in uniq.tolist()], dtype=np.int64)[inv.reshape(-1)]
+
+def calc_fares(vehicle_codes, tiers, km, minutes, pax,
+               catalog: Optional[VehicleCatalog] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized calc_fare over column arrays; returns (prices, valid).
+
+    A row is invalid (price NaN) when its vehicle code is unknown or its pax
+    exceed the vehicle capacity; unknown tiers price at 1.0 like calc_fare.
+    """
+    if catalog is None:
+        catalog = vehicle_catalog()
+    vi = _codes_to_index(vehicle_codes, catalog.code_index)
+    ti = _codes_to_index(tiers, TIER_INDEX)
+    km, minutes, pax = (np.asarray(x, dtype=np.float64).reshape(-1) for x in (km, minutes, pax))
+    valid = pax <= catalog.capacity[vi]
+    prices = np.where(valid, (catalog.base_per_km[vi] * km + catalog.per_min[vi] * minutes) * TIER_MULT[ti], np.nan)
+    return prices, valid
+
 def now_ts() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def advance_track_idx(ride: sqlite3.Row) -> int:
-    """Advance track index based on elapsed real time and estimated minutes."""
-    coords = json.loads(ride["tracking_json"] or "[]")
-    if not coords:
+def track_pps(ride: sqlite3.Row) -> float:
+    """Track steps covered per second of real time."""
+    total_pts = max(1, ride["track_len"] - 1)
+    return max(0.5, total_pts / max(1.0, ride["est_minutes"]) / 1.2)
+
+def advance_track_idx(ride: sqlite3.Row, now: Optional[datetime] = None) -> int:
+    """Advance track index based on elapsed real time and estimated minutes.
+
+    A track of n points has n - 1 equal steps by distance (see track_position),
+    so a constant rate of steps is a constant speed along the route.
+    """
+    n_points = ride["track_len"]
+    if not n_points:
         return ride["track_idx"]
     last = ride["last_update_at"]
     if not last:
         return ride["track_idx"]
-    elapsed = (datetime.now() - datetime.fromisoformat(last)).total_seconds()
-    total_pts = max(1, len(coords) - 1)
-    pps = max(0.5, total_pts / max(1.0, ride["est_minutes"]) / 1.2)  
-    advance = int(elapsed * pps)
+    elapsed = ((now or datetime.now()) - datetime.fromisoformat(last)).total_seconds()
+    total_pts = max(1, n_points - 1)
+    advance = int(elapsed * track_pps(ride))
     return min(total_pts, ride["track_idx"] + max(0, advance))
 
-def get_vehicle(code_or_name: str) -> Vehicle:
-    for v in VEHICLES:
-        if v.code == code_or_name or v.name == code_or_name:
-            return v
-    return VEHICLES[0]
\ No newline at end of file
+def track_position(route: Union[bytes, Sequence[Sequence[float]]], idx: int) -> Tuple[float, float]:
+    """Where a ride at track_idx `idx` is: idx / (n - 1) of the way along its n-point route."""
+    coords = track_array(route) if isinstance(route, bytes) else route
+    return point_along(coords, idx / max(1, len(coords) - 1))
+
+def get_vehicle(code_or_name: str, catalog: Optional[VehicleCatalog] = None) -> Vehicle:
+    if catalog is None:
+        catalog = vehicle_catalog()
+    vehicle = catalog.get(code_or_name)
+    if vehicle is None:
+        raise ValueError(f"Unknown vehicle {code_or_name!r}")
+    return vehicle
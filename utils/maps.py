@@ -0,0 +1,60 @@
+import threading
+from typing import Optional, Sequence, Tuple, Union
+
+import folium
+import streamlit as st
+from streamlit_folium import generate_leaflet_string, st_folium
+
+from config.constants import MAP_CACHE_ENTRIES, MAP_SIMPLIFY_M
+from db.tracks import track_points
+from geocoding.simplify import douglas_peucker
+
+LatLon = Tuple[float, float]
+
+# Cached maps are shared by every session showing the same ride; folium render() mutates them
+_render_lock = threading.Lock()
+
+
+@st.cache_resource(max_entries=MAP_CACHE_ENTRIES, show_spinner=False)
+def route_map(key: str, pickup: LatLon, dropoff: LatLon, _route: Union[bytes, Sequence[LatLon]]) -> folium.Map:
+    """Static layers for a route: tiles, pickup/drop-off markers and the simplified polyline.
+
+    Built once per `key`; the route (a packed track or a list of points) is not
+    hashed, so `key` must change whenever the route does.
+    """
+    coords = track_points(_route) if isinstance(_route, (bytes, memoryview)) else list(_route)
+    m = folium.Map(location=list(pickup), zoom_start=11, tiles="OpenStreetMap")
+    folium.Marker(list(pickup), tooltip="Pickup").add_to(m)
+    folium.Marker(list(dropoff), tooltip="Drop-off").add_to(m)
+    if coords:
+        folium.PolyLine(douglas_peucker(coords, MAP_SIMPLIFY_M), weight=5, opacity=0.7, color="green").add_to(m)
+    # Render the HTML root once here; st_folium is then called with render=False. Its
+    # script generation also mutates the map the first time, so run it here too: every
+    # st_folium call then sees the same map and sends identical base arguments
+    m.get_root().render()
+    generate_leaflet_string(m)
+    return m
+
+
+def show_route_map(key: str, pickup: LatLon, dropoff: LatLon, route: Union[bytes, Sequence[LatLon]],
+                   marker: Optional[LatLon] = None, marker_tooltip: str = ""):
+    """Draw the cached route map for `key`, with an optional moving marker as a separate layer.
+
+    The marker travels in its own feature group and the base map's arguments
+    stay identical between reruns, so the browser keeps the mounted map and
+    only swaps that layer. The component message still carries the whole map:
+    Streamlit resends it each time the marker moves, and replaces it with a
+    hash reference only while nothing changed and it is at least 10 kB.
+    """
+    m = route_map(key, pickup, dropoff, route)
+    live = folium.FeatureGroup(name="live")
+    if marker is not None:
+        folium.CircleMarker(list(marker), radius=7, color="red", fill=True, tooltip=marker_tooltip).add_to(live)
+    with _render_lock:
+        try:
+            st_folium(m, key=f"map_{key}", width=700, height=400, feature_group_to_add=live, returned_objects=[],
+                      render=False)
+        finally:
+            # st_folium attaches the layer to the map; left there it would be baked into the
+            # next render of this shared map, so other sessions would see a stale marker
+            m._children.pop(live.get_name(), None)